@@ -0,0 +1,310 @@
+"""
+Benchmarks for ECC, hashing and serialization hot paths.
+
+Usage:
+    python -m benchmarks.bench [--output FILE] [--baseline FILE]
+
+Results are written as JSON. With --baseline, every benchmark is
+compared to the stored run and the exit status is 1 if any of them got
+slower by more than --threshold.
+"""
+import argparse
+from io import BytesIO
+import json
+import platform
+import sys
+import timeit
+
+from py_bitcoin.ecc import (
+    G,
+    N,
+    FieldElement,
+    Point,
+    PrivateKey,
+    S256Field,
+    S256Point,
+    Signature,
+)
+from py_bitcoin.script import Script, p2pkh_script
+from py_bitcoin.transactions import Tx, TxIn, TxOut
+from py_bitcoin.utils import (
+    decode_base58_checksum,
+    encode_base58_checksum,
+    encode_varint,
+    hash256,
+    read_varint,
+    read_varint_from,
+)
+
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """
+    Register a benchmark.
+
+    The decorated function does the setup and returns a callable
+    without arguments which is the operation being timed.
+    """
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+    return register
+
+
+KEY = PrivateKey(12345)
+Z = int.from_bytes(hash256(b'benchmark'), 'big')
+SIG = KEY.sign(Z)
+
+
+@benchmark('field.mul')
+def bench_field_mul():
+    a = S256Field(Z)
+    b = S256Field(KEY.secret)
+    return lambda: a * b
+
+
+@benchmark('field.inv')
+def bench_field_inv():
+    a = S256Field(Z)
+    b = S256Field(KEY.secret)
+    return lambda: a / b
+
+
+@benchmark('point.add.small_curve')
+def bench_point_add_small():
+    prime = 223
+    a = FieldElement(0, prime)
+    b = FieldElement(7, prime)
+    p1 = Point(FieldElement(192, prime), FieldElement(105, prime), a, b)
+    p2 = Point(FieldElement(17, prime), FieldElement(56, prime), a, b)
+    return lambda: p1 + p2
+
+
+@benchmark('point.add.s256')
+def bench_point_add_s256():
+    p1 = KEY.point
+    p2 = G
+    return lambda: p1 + p2
+
+
+@benchmark('point.mul.generator')
+def bench_point_mul_generator():
+    return lambda: Z * G
+
+
+@benchmark('point.mul.variable')
+def bench_point_mul_variable():
+    point = KEY.point
+    return lambda: Z * point
+
+
+@benchmark('private_key.init')
+def bench_private_key_init():
+    return lambda: PrivateKey(Z)
+
+
+@benchmark('private_key.sign')
+def bench_sign():
+    return lambda: KEY.sign(Z)
+
+
+@benchmark('point.verify')
+def bench_verify():
+    point = KEY.point
+    return lambda: point._verify(Z, SIG)
+
+
+@benchmark('point.parse.uncached')
+def bench_parse_uncached():
+    sec = KEY.point.sec(compressed=True)
+    return lambda: S256Point._parse_sec(sec)
+
+
+@benchmark('point.parse.cached')
+def bench_parse_cached():
+    sec = KEY.point.sec(compressed=True)
+    S256Point.parse(sec)
+    return lambda: S256Point.parse(sec)
+
+
+@benchmark('signature.der')
+def bench_der():
+    return SIG.der
+
+
+@benchmark('signature.parse')
+def bench_der_parse():
+    der = SIG.der()
+    return lambda: Signature.parse(der)
+
+
+@benchmark('base58.encode')
+def bench_base58_encode():
+    payload = b'\x00' + KEY.point.hash160()
+    return lambda: encode_base58_checksum(payload)
+
+
+@benchmark('base58.decode')
+def bench_base58_decode():
+    address = KEY.point.address()
+    return lambda: decode_base58_checksum(address)
+
+
+@benchmark('varint.encode')
+def bench_varint_encode():
+    return lambda: encode_varint(0x12345)
+
+
+@benchmark('varint.read_stream')
+def bench_varint_read():
+    raw = encode_varint(0x12345)
+    return lambda: read_varint(BytesIO(raw))
+
+
+@benchmark('varint.read_buffer')
+def bench_varint_read_from():
+    raw = encode_varint(0x12345)
+    return lambda: read_varint_from(raw)
+
+
+def sample_tx(inputs=4, outputs=4):
+    """Build a serialized P2PKH transaction with signature-sized data."""
+    script_sig = Script([SIG.der() + b'\x01', KEY.point.sec()])
+    tx_ins = [
+        TxIn(hash256(bytes([i])), i, script_sig) for i in range(inputs)
+    ]
+    script_pubkey = p2pkh_script(KEY.point.hash160())
+    tx_outs = [TxOut(N % (i + 2), script_pubkey) for i in range(outputs)]
+    return Tx(1, tx_ins, tx_outs, 0).serialize()
+
+
+@benchmark('tx.parse')
+def bench_tx_parse():
+    raw = sample_tx()
+    return lambda: Tx.parse(raw)
+
+
+@benchmark('tx.parse_stream')
+def bench_tx_parse_stream():
+    raw = sample_tx()
+    return lambda: Tx.parse(BytesIO(raw))
+
+
+def measure(func, repeat=5, min_time=0.2):
+    """
+    Time a callable.
+
+    args:
+        func: operation to time
+        repeat: number of timing runs
+        min_time: minimal duration of one run in seconds
+
+    returns:
+        dict with the best time per operation in seconds and the
+        number of operations per run
+    """
+    timer = timeit.Timer(func)
+    number = 1
+    while timer.timeit(number) < min_time:
+        number *= 2
+    best = min(timer.repeat(repeat=repeat, number=number)) / number
+    return {'seconds': best, 'ops_per_sec': 1 / best, 'number': number}
+
+
+def run(names=None, repeat=5, min_time=0.2):
+    """
+    Run benchmarks.
+
+    args:
+        names: substrings selecting benchmarks to run, all if empty
+
+    returns:
+        JSON serializable dict of environment and results
+    """
+    results = {}
+    for name, setup in BENCHMARKS.items():
+        if names and not any(part in name for part in names):
+            continue
+        results[name] = measure(setup(), repeat, min_time)
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'machine': platform.machine(),
+        'results': results,
+    }
+
+
+def compare(current, baseline, threshold=0.1):
+    """
+    Compare a run to a baseline run.
+
+    args:
+        current, baseline: dicts returned by `run`
+        threshold: relative slowdown reported as a regression
+
+    returns:
+        list of (name, baseline seconds, current seconds, ratio,
+        regressed) for benchmarks present in both runs
+    """
+    rows = []
+    for name, result in current['results'].items():
+        if name not in baseline['results']:
+            continue
+        before = baseline['results'][name]['seconds']
+        after = result['seconds']
+        ratio = after / before
+        rows.append((name, before, after, ratio, ratio > 1 + threshold))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('names', nargs='*', help='benchmarks to run')
+    parser.add_argument('--output', help='write JSON results to a file')
+    parser.add_argument('--baseline', help='JSON results to compare to')
+    parser.add_argument('--threshold', type=float, default=0.1)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--min-time', type=float, default=0.2)
+    parser.add_argument('--list', action='store_true')
+    args = parser.parse_args(argv)
+    if args.list:
+        print('\n'.join(BENCHMARKS))
+        return 0
+
+    current = run(args.names, args.repeat, args.min_time)
+    text = json.dumps(current, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    for name, result in current['results'].items():
+        print(
+            f'{name:24} {result["seconds"] * 1e6:12.2f} us',
+            file=sys.stderr,
+        )
+
+    if not args.baseline:
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    status = 0
+    print(file=sys.stderr)
+    for name, before, after, ratio, regressed in compare(
+            current, baseline, args.threshold
+    ):
+        mark = 'REGRESSION' if regressed else ''
+        print(
+            f'{name:24} {before * 1e6:12.2f} -> {after * 1e6:12.2f} us '
+            f'{ratio:6.2f}x {mark}',
+            file=sys.stderr,
+        )
+        if regressed:
+            status = 1
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
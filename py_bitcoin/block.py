@@ -0,0 +1,184 @@
+from concurrent.futures import ProcessPoolExecutor
+import mmap
+import os
+
+from py_bitcoin.transactions import LazyTx
+from py_bitcoin.utils import (
+    hash256,
+    int_to_little_endian,
+    little_endian_to_int,
+    read_varint_from,
+)
+
+
+# Network magic bytes prefixing every block in blk*.dat files.
+MAINNET_MAGIC = bytes.fromhex('f9beb4d9')
+TESTNET_MAGIC = bytes.fromhex('0b110907')
+
+HEADER_SIZE = 80
+
+
+class BlockHeader:
+    """Bitcoin block header."""
+    def __init__(
+            self, version, prev_block, merkle_root, timestamp, bits, nonce
+    ):
+        self.version = version
+        self.prev_block = prev_block
+        self.merkle_root = merkle_root
+        self.timestamp = timestamp
+        self.bits = bits
+        self.nonce = nonce
+
+    def __repr__(self):
+        """Return string representation of block header."""
+        return f'BlockHeader({self.id()})'
+
+    @classmethod
+    def parse(cls, s):
+        """Parses block header from a byte stream."""
+        return cls.parse_from(s.read(HEADER_SIZE))[0]
+
+    @classmethod
+    def parse_from(cls, buf, offset=0):
+        """
+        Parses block header from a bytes-like buffer at a given offset.
+
+        returns:
+            (BlockHeader, offset just past the header)
+        """
+        end = offset + HEADER_SIZE
+        if end > len(buf):
+            raise SyntaxError(f'Unexpected end of data at offset {offset}')
+        header = bytes(buf[offset:end])
+        return cls(
+            little_endian_to_int(header[0:4]),
+            header[4:36][::-1],
+            header[36:68][::-1],
+            little_endian_to_int(header[68:72]),
+            header[72:76],
+            header[76:80],
+        ), end
+
+    def serialize(self):
+        """Serialize block header to 80 bytes."""
+        return b''.join((
+            int_to_little_endian(self.version, 4),
+            self.prev_block[::-1],
+            self.merkle_root[::-1],
+            int_to_little_endian(self.timestamp, 4),
+            self.bits,
+            self.nonce,
+        ))
+
+    def hash(self):
+        """Return binary hash of the block header."""
+        return hash256(self.serialize())[::-1]
+
+    def id(self):
+        """Return human-readable hexadecimal of the block hash."""
+        return self.hash().hex()
+
+
+class Block:
+    """
+    Block over a serialized buffer: the header is parsed on creation,
+    transactions are parsed lazily while iterating over `txs()`.
+    """
+    def __init__(self, buf, offset=0, testnet=False):
+        self.buf = memoryview(buf)
+        self.testnet = testnet
+        self.header, offset = BlockHeader.parse_from(self.buf, offset)
+        self.tx_count, self._txs_offset = read_varint_from(self.buf, offset)
+
+    def __repr__(self):
+        """Return string representation of block."""
+        return f'Block({self.header.id()}, txs: {self.tx_count})'
+
+    def hash(self):
+        """Return binary hash of the block header."""
+        return self.header.hash()
+
+    def id(self):
+        """Return human-readable hexadecimal of the block hash."""
+        return self.header.id()
+
+    def txs(self):
+        """Iterate over the transactions of the block as LazyTx objects."""
+        offset = self._txs_offset
+        for _ in range(self.tx_count):
+            tx = LazyTx(self.buf, offset, testnet=self.testnet)
+            offset = tx.end
+            yield tx
+
+
+def read_block_file(path, magic=MAINNET_MAGIC, testnet=False):
+    """
+    Iterate over the blocks of a Bitcoin Core blk*.dat file.
+
+    The file is memory-mapped rather than read, so only the pages that
+    are actually parsed are loaded. Yielded blocks reference the mapped
+    file, which stays mapped as long as any of them is alive.
+
+    args:
+        path: path to the blk*.dat file
+        magic: network magic bytes prefixing each block
+        testnet: mark parsed transactions as testnet ones
+
+    yields:
+        Block objects in file order
+    """
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    buf = memoryview(mapped)
+    offset = 0
+    while offset + 8 <= len(buf):
+        if buf[offset:offset + 4] != magic:
+            # Bitcoin Core preallocates files, the tail is zero-filled
+            if not any(buf[offset:offset + 4]):
+                return
+            raise SyntaxError(f'Bad network magic at offset {offset}')
+        length = little_endian_to_int(buf[offset + 4:offset + 8])
+        start = offset + 8
+        offset = start + length
+        if offset > len(buf):
+            raise SyntaxError(f'Truncated block at offset {start}')
+        yield Block(buf[start:offset], testnet=testnet)
+
+
+def _scan_block_file(job):
+    """Apply a function to the blocks of one file in a worker process."""
+    path, func, magic, testnet = job
+    return func(read_block_file(path, magic, testnet))
+
+
+def scan_block_files(
+        paths, func, workers=None, magic=MAINNET_MAGIC, testnet=False
+):
+    """
+    Scan several blk*.dat files in parallel worker processes.
+
+    args:
+        paths: paths to blk*.dat files
+        func: function called with an iterator over the blocks of one
+            file; it runs in a worker process, so it must be defined at
+            module level and return a picklable result
+        workers: number of worker processes, defaults to the number
+            of CPUs; 1 scans all files in the current process
+        magic, testnet: as for `read_block_file`
+
+    yields:
+        (path, result of func) pairs, in the order of paths
+    """
+    paths = list(paths)
+    jobs = [(path, func, magic, testnet) for path in paths]
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(jobs))
+    if workers <= 1:
+        yield from zip(paths, map(_scan_block_file, jobs))
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from zip(paths, executor.map(_scan_block_file, jobs))
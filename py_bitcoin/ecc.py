@@ -1,12 +1,33 @@
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
 from io import BytesIO
 import hashlib
 import hmac
+import os
+import secrets
 
-from py_bitcoin.utils import encode_base58_checksum, hash160
+from py_bitcoin.tables import load_point_table
+from py_bitcoin.utils import (
+    LRUCache,
+    encode_base58_checksum,
+    hash160,
+    tagged_hash,
+)
+
+
+def _inverse(num, modulus):
+    """
+    Return the inverse of num modulo a prime (Fermat's little theorem).
+
+    All the modular inversions of the module go through this function,
+    so that instrumentation can count them.
+    """
+    return pow(num, modulus - 2, modulus)
 
 
 class FieldElement:
     """Finite field element."""
+    __slots__ = ('num', 'prime')
 
     def __init__(self, num, prime):
         if num >= prime or num < 0:
@@ -53,7 +74,7 @@ class FieldElement:
         if self.prime != other.prime:
             raise TypeError('Cannot divide two numbers in different Fields')
         num = (
-            self.num * pow(other.num, self.prime-2, self.prime)
+            self.num * _inverse(other.num, self.prime)
         ) % self.prime
         return self.__class__(num, self.prime)
 
@@ -64,6 +85,8 @@ class FieldElement:
 
 class Point:
     """Point on the elliptic curve `y**2 = x**3 + a*x +b`."""
+    __slots__ = ('x', 'y', 'a', 'b')
+
     def __init__(self, x, y, a, b):
         self.a = a
         self.b = b
@@ -157,22 +180,459 @@ GY = 0x483ada7726a3c4655da4fbfc0e1108a8fd17b448a68554199c47d08ffb10d4b8
 N = 0xfffffffffffffffffffffffffffffffebaaedce6af48a03bbfd25e8cd0364141
 
 
+# Internal arithmetic in Jacobian coordinates for secp256k1.
+#
+# A Jacobian point is a tuple of ints (X, Y, Z) representing the affine
+# point (X / Z**2, Y / Z**3). Addition and doubling in this form need no
+# modular inversion, so scalar multiplication only pays for a single
+# inversion when the result is converted back to an affine S256Point.
+# Any tuple with Z == 0 is the point at infinity.
+_INFINITY = (1, 1, 0)
+
+
+def _jacobian_double(p):
+    """Double a Jacobian point on secp256k1 (a = 0)."""
+    x, y, z = p
+    if not y or not z:
+        return _INFINITY
+    ysq = y * y % P
+    s = 4 * x * ysq % P
+    m = 3 * x * x % P
+    nx = (m * m - 2 * s) % P
+    ny = (m * (s - nx) - 8 * ysq * ysq) % P
+    nz = 2 * y * z % P
+    return (nx, ny, nz)
+
+
+def _jacobian_add(p, q):
+    """Add two Jacobian points on secp256k1."""
+    x1, y1, z1 = p
+    x2, y2, z2 = q
+    if not z1:
+        return q
+    if not z2:
+        return p
+    if z2 == 1:
+        return _jacobian_add_affine(p, x2, y2)
+    z1z1 = z1 * z1 % P
+    z2z2 = z2 * z2 % P
+    u1 = x1 * z2z2 % P
+    u2 = x2 * z1z1 % P
+    s1 = y1 * z2 * z2z2 % P
+    s2 = y2 * z1 * z1z1 % P
+    if u1 == u2:
+        # Same x: either p == q (tangent) or p == -q (vertical line).
+        if s1 != s2:
+            return _INFINITY
+        return _jacobian_double(p)
+    h = (u2 - u1) % P
+    r = (s2 - s1) % P
+    h2 = h * h % P
+    h3 = h * h2 % P
+    u1h2 = u1 * h2 % P
+    nx = (r * r - h3 - 2 * u1h2) % P
+    ny = (r * (u1h2 - nx) - s1 * h3) % P
+    nz = h * z1 * z2 % P
+    return (nx, ny, nz)
+
+
+def _jacobian_add_affine(p, x2, y2):
+    """
+    Add an affine point (x2, y2) to a Jacobian point (mixed addition).
+
+    Cheaper than `_jacobian_add` because the second point has Z == 1.
+    """
+    x1, y1, z1 = p
+    if not z1:
+        return (x2, y2, 1)
+    z1z1 = z1 * z1 % P
+    u2 = x2 * z1z1 % P
+    s2 = y2 * z1 * z1z1 % P
+    if x1 == u2:
+        if y1 != s2:
+            return _INFINITY
+        return _jacobian_double(p)
+    h = (u2 - x1) % P
+    r = (s2 - y1) % P
+    h2 = h * h % P
+    h3 = h * h2 % P
+    u1h2 = x1 * h2 % P
+    nx = (r * r - h3 - 2 * u1h2) % P
+    ny = (r * (u1h2 - nx) - y1 * h3) % P
+    nz = h * z1 % P
+    return (nx, ny, nz)
+
+
+def _jacobian_multiply(p, coef):
+    """Left-to-right double-and-add multiplication of a Jacobian point."""
+    result = _INFINITY
+    for bit in bin(coef)[2:]:
+        result = _jacobian_double(result)
+        if bit == '1':
+            result = _jacobian_add(result, p)
+    return result
+
+
+def _wnaf(coef, width):
+    """
+    Return the width-w non-adjacent form of coef, least significant first.
+
+    Every non-zero digit is odd and lies in (-2**(w-1), 2**(w-1)), and any
+    w consecutive digits contain at most one non-zero digit.
+    """
+    digits = []
+    modulus = 1 << width
+    half = modulus >> 1
+    while coef:
+        if coef & 1:
+            digit = coef % modulus
+            if digit >= half:
+                digit -= modulus
+            coef -= digit
+        else:
+            digit = 0
+        digits.append(digit)
+        coef >>= 1
+    return digits
+
+
+def _odd_multiples(p, width):
+    """Return [P, 3P, 5P, ..., (2**(w-1) - 1)P] for a Jacobian point P."""
+    multiples = [p]
+    double = _jacobian_double(p)
+    for _ in range((1 << (width - 2)) - 1):
+        multiples.append(_jacobian_add(multiples[-1], double))
+    return multiples
+
+
+def _jacobian_multiply_wnaf(p, coef, width=5):
+    """Multiply a Jacobian point by coef using its width-w NAF."""
+    if not p[2]:
+        return _INFINITY
+    multiples = _odd_multiples(p, width)
+    result = _INFINITY
+    for digit in reversed(_wnaf(coef, width)):
+        result = _jacobian_double(result)
+        if digit > 0:
+            result = _jacobian_add(result, multiples[digit >> 1])
+        elif digit < 0:
+            x, y, z = multiples[-digit >> 1]
+            result = _jacobian_add(result, (x, P - y, z))
+    return result
+
+
+def _jacobian_multi_multiply(terms):
+    """
+    Return the sum of several scalar multiplications (Strauss' algorithm).
+
+    terms is a list of (odd multiples, wNAF digits) pairs, as returned by
+    `_odd_multiples` and `_wnaf`. All the products share a single chain
+    of doublings, so u*P + v*Q costs about as many doublings as u*P alone.
+    """
+    length = max((len(digits) for _, digits in terms), default=0)
+    result = _INFINITY
+    for i in range(length - 1, -1, -1):
+        result = _jacobian_double(result)
+        for multiples, digits in terms:
+            if i >= len(digits):
+                continue
+            digit = digits[i]
+            if digit > 0:
+                result = _jacobian_add(result, multiples[digit >> 1])
+            elif digit < 0:
+                x, y, z = multiples[-digit >> 1]
+                result = _jacobian_add(result, (x, P - y, z))
+    return result
+
+
+# GLV endomorphism of secp256k1: phi(x, y) = (BETA*x, y) equals
+# LAMBDA * (x, y), where BETA and LAMBDA are cube roots of unity modulo
+# P and N respectively. A scalar k is split as k1 + k2*LAMBDA with k1 and
+# k2 of about 128 bits, so k*P = k1*P + k2*phi(P) needs half the doublings.
+BETA = 0x7ae96a2b657c07106e64479eac3434e99cf0497512f58995c1396c28719501ee
+LAMBDA = 0x5363ad4cc05c30e0a5261c028812645a122e22ea20816678df02967c1b23bd72
+# Short basis (a1, b1), (a2, b2) of the lattice {(x, y): x + y*LAMBDA = 0}.
+_GLV_A1 = 0x3086d221a7d46bcde86c90e49284eb15
+_GLV_B1 = -0xe4437ed6010e88286f547fa90abfe4c3
+_GLV_A2 = 0x114ca50f7a8e2f3f657c1108d9d44cfd8
+_GLV_B2 = _GLV_A1
+
+
+def _glv_split(coef):
+    """Return (k1, k2) such that k1 + k2*LAMBDA == coef (mod N)."""
+    c1 = (_GLV_B2 * coef + N // 2) // N
+    c2 = (-_GLV_B1 * coef + N // 2) // N
+    k1 = coef - c1 * _GLV_A1 - c2 * _GLV_A2
+    k2 = -c1 * _GLV_B1 - c2 * _GLV_B2
+    return k1, k2
+
+
+def _glv_terms(multiples, coef, width):
+    """
+    Return the two Strauss terms for coef * P using the endomorphism.
+
+    multiples are the odd multiples of P, as returned by `_odd_multiples`.
+    """
+    k1, k2 = _glv_split(coef)
+    endo = [(BETA * x % P, y, z) for x, y, z in multiples]
+    terms = []
+    for points, k in ((multiples, k1), (endo, k2)):
+        if k < 0:
+            # k*P == (-k)*(-P)
+            points = [(x, P - y, z) for x, y, z in points]
+            k = -k
+        terms.append((points, _wnaf(k, width)))
+    return terms
+
+
+def _jacobian_multiply_glv(p, coef, width=5):
+    """Multiply a Jacobian point by coef using the GLV endomorphism."""
+    if not p[2]:
+        return _INFINITY
+    terms = _glv_terms(_odd_multiples(p, width), coef % N, width)
+    return _jacobian_multi_multiply(terms)
+
+
+def _to_jacobian(point):
+    """Convert an affine S256Point to Jacobian coordinates."""
+    if point.x is None:
+        return _INFINITY
+    return (point.x.num, point.y.num, 1)
+
+
+def _from_jacobian(p):
+    """Convert a Jacobian point back to an affine S256Point."""
+    x, y, z = p
+    if not z:
+        return S256Point(None, None)
+    z_inv = _inverse(z, P)
+    z_inv2 = z_inv * z_inv % P
+    return S256Point._new(x * z_inv2 % P, y * z_inv2 * z_inv % P)
+
+
+def _batch_invert(nums, modulus):
+    """
+    Invert many integers modulo a prime with Montgomery's trick.
+
+    Costs one modular exponentiation and about 3n multiplications instead
+    of n exponentiations. Zeros are left as zeros (like `pow(0, p-2, p)`).
+    """
+    # prefix[i] is the product of all non-zero nums before index i
+    prefix = []
+    acc = 1
+    for num in nums:
+        prefix.append(acc)
+        if num:
+            acc = acc * num % modulus
+    inv = _inverse(acc, modulus)
+    result = [0] * len(nums)
+    for i in range(len(nums) - 1, -1, -1):
+        num = nums[i]
+        if num:
+            result[i] = inv * prefix[i] % modulus
+            inv = inv * num % modulus
+    return result
+
+
+def _normalize_jacobian(points):
+    """
+    Convert many Jacobian points to affine (x, y) integer pairs at once,
+    using a single field inversion. Points at infinity become None.
+    """
+    z_invs = _batch_invert([z for _, _, z in points], P)
+    affine = []
+    for (x, y, z), z_inv in zip(points, z_invs):
+        if not z:
+            affine.append(None)
+            continue
+        z_inv2 = z_inv * z_inv % P
+        affine.append((x * z_inv2 % P, y * z_inv2 * z_inv % P))
+    return affine
+
+
+def _batch_from_jacobian(points):
+    """Convert many Jacobian points to affine S256Points at once."""
+    return [
+        S256Point(None, None) if xy is None else S256Point._new(*xy)
+        for xy in _normalize_jacobian(points)
+    ]
+
+
+# Fixed-base precomputation for the generator point G.
+#
+# The scalar is split into 4-bit windows; entry [i * 15 + j - 1] of the
+# table is the affine point j * 16**i * G for j in 1..15. A multiplication
+# by G is then the sum of one table entry per window: 64 mixed additions
+# and no doublings at all. The tables of G are persisted by
+# py_bitcoin.tables, so processes load them instead of rebuilding, and
+# decoded once per process into lists of integer coordinates (see
+# `_generator_table` for why the mapped pages are not used directly).
+_G_WINDOW_BITS = 4
+_G_WINDOWS = 256 // _G_WINDOW_BITS
+_G_ROW_SIZE = (1 << _G_WINDOW_BITS) - 1
+_G_TABLE = None
+
+
+def _build_generator_table():
+    """Return the fixed-base table of multiples of G as affine points."""
+    table = []
+    base = (GX, GY, 1)
+    for _ in range(_G_WINDOWS):
+        current = base
+        for _ in range(_G_ROW_SIZE):
+            table.append(current)
+            current = _jacobian_add(current, base)
+        # current is now 16 * base, the base of the next window
+        base = current
+    # normalize all the entries with a single inversion
+    return _normalize_jacobian(table)
+
+
+def _generator_table():
+    """Return the fixed-base table for G, loading it on first use."""
+    global _G_TABLE
+    if _G_TABLE is None:
+        table = load_point_table(
+            f'secp256k1_g_window{_G_WINDOW_BITS}', _build_generator_table
+        )
+        # Decoded once into a private list instead of decoding 64 bytes of
+        # the mapped file on every lookup: the 64 lookups of a k*G take
+        # about 30 us of its 400 us when decoded, under 1 us from the
+        # list. The price is about 160 KB of integers per process, where
+        # the mapped file (60 KB) would have been shared. Processes still
+        # share the persisted file, so none of them rebuilds the table.
+        _G_TABLE = list(table)
+    return _G_TABLE
+
+
+def _generator_multiply(coef):
+    """Return coef * G as a Jacobian point using the fixed-base table."""
+    table = _generator_table()
+    mask = (1 << _G_WINDOW_BITS) - 1
+    result = _INFINITY
+    coef %= N
+    row = -1
+    while coef:
+        digit = coef & mask
+        if digit:
+            x, y = table[row + digit]
+            result = _jacobian_add_affine(result, x, y)
+        coef >>= _G_WINDOW_BITS
+        row += _G_ROW_SIZE
+    return result
+
+
+# Odd multiples of G for the wNAF digits of the G term in `verify`.
+# A wider window than for variable points pays off because the table is
+# built once, and entries are kept affine (Z == 1) for mixed additions.
+_G_WNAF_WIDTH = 8
+_G_ODD_MULTIPLES = None
+
+
+def _build_generator_odd_multiples():
+    """Return affine odd multiples of G for wNAF digits."""
+    return _normalize_jacobian(_odd_multiples((GX, GY, 1), _G_WNAF_WIDTH))
+
+
+def _generator_odd_multiples():
+    """Return affine odd multiples of G, loading them on first use."""
+    global _G_ODD_MULTIPLES
+    if _G_ODD_MULTIPLES is None:
+        multiples = load_point_table(
+            f'secp256k1_g_odd{_G_WNAF_WIDTH}', _build_generator_odd_multiples
+        )
+        # decoded once: the table is small and read on every verify
+        _G_ODD_MULTIPLES = [(x, y, 1) for x, y in multiples]
+    return _G_ODD_MULTIPLES
+
+
 class S256Field(FieldElement):
     """Field specific to secp256k1 elliptic curve."""
+    __slots__ = ()
+
     def __init__(self, num, prime=None):
-        super().__init__(num=num, prime=P)
+        if num >= P or num < 0:
+            error = f'Num {num} not in field range 0 to {P - 1}'
+            raise ValueError(error)
+        self.num = num
+        self.prime = P
+
+    @classmethod
+    def _new(cls, num):
+        """
+        Create a field element without the range check.
+
+        Internal fast path: num must already be reduced modulo P.
+        """
+        element = object.__new__(cls)
+        element.num = num
+        element.prime = P
+        return element
 
     def __repr__(self):
         return '{:x}'.format(self.num).zfill(64)
 
+    # Arithmetic below skips the validating constructor, since results
+    # are always reduced modulo P.
+    def __add__(self, other):
+        if other.prime != P:
+            raise TypeError('Cannot add two numbers in different Fields')
+        return self._new((self.num + other.num) % P)
+
+    def __sub__(self, other):
+        if other.prime != P:
+            raise TypeError('Cannot substract two numbers in different Fields')
+        return self._new((self.num - other.num) % P)
+
+    def __mul__(self, other):
+        if other.prime != P:
+            raise TypeError('Cannot multiply two numbers in different Fields')
+        return self._new(self.num * other.num % P)
+
+    def __pow__(self, exponent):
+        return self._new(pow(self.num, exponent % (P - 1), P))
+
+    def __truediv__(self, other):
+        if other.prime != P:
+            raise TypeError('Cannot divide two numbers in different Fields')
+        return self._new(self.num * _inverse(other.num, P) % P)
+
+    def __rmul__(self, coefficient):
+        return self._new(self.num * coefficient % P)
+
     def sqrt(self):
         return self**((P + 1) // 4)
 
 
+def batch_invert(elements):
+    """
+    Invert many S256Field elements with a single field inversion.
+
+    args:
+        elements: sequence of S256Field elements
+
+    returns:
+        list of S256Field inverses, in the same order; as with division,
+        the inverse of zero is zero
+    """
+    for element in elements:
+        if element.prime != P:
+            raise TypeError('Cannot batch invert numbers from other Fields')
+    inverses = _batch_invert([element.num for element in elements], P)
+    return [S256Field._new(num) for num in inverses]
+
+
+# Curve coefficients shared by every S256Point.
+_S256_A = S256Field(A)
+_S256_B = S256Field(B)
+
+
 class S256Point(Point):
     """A point on secp256k1 elliptic curve."""
+    __slots__ = ()
+
     def __init__(self, x, y, a=None, b=None):
-        a, b = S256Field(A), S256Field(B)
+        a, b = _S256_A, _S256_B
         if type(x) == int:
             super().__init__(x=S256Field(x), y=S256Field(y), a=a, b=b)
         else:
@@ -180,16 +640,89 @@ class S256Point(Point):
             # pass x and y directly instead of using S256Field class.
             super().__init__(x=x, y=y, a=a, b=b)
 
+    @classmethod
+    def _new(cls, x, y):
+        """
+        Create a point from integer coordinates without any checks.
+
+        Internal fast path for points computed by this module, which
+        are known to be on the curve.
+        """
+        point = object.__new__(cls)
+        point.x = S256Field._new(x)
+        point.y = S256Field._new(y)
+        point.a = _S256_A
+        point.b = _S256_B
+        return point
+
     def __repr__(self):
         if self.x is None:
             return 'S256Point(infinity)'
         else:
             return 'S256Point({}, {})'.format(self.x, self.y)
 
+    # Default algorithm used by `coefficient * point` for points
+    # other than G: 'binary' (double-and-add), 'wnaf' (width-w NAF)
+    # or 'glv' (width-w NAF over the GLV endomorphism split).
+    MULTIPLY_METHOD = 'glv'
+    WNAF_WIDTH = 5
+
+    def __add__(self, other):
+        """Add two points on secp256k1 using integer arithmetic."""
+        if not isinstance(other, S256Point):
+            return super().__add__(other)
+        if self.x is None:
+            return other
+        if other.x is None:
+            return self
+        x1, y1 = self.x.num, self.y.num
+        x2, y2 = other.x.num, other.y.num
+        if x1 == x2:
+            # Vertical line (p1 == -p2, or p1 == p2 with y == 0)
+            if y1 != y2 or y1 == 0:
+                return self.__class__(None, None)
+            s = 3 * x1 * x1 * _inverse(2 * y1, P) % P
+        else:
+            s = (y2 - y1) * _inverse(x2 - x1, P) % P
+        x3 = (s * s - x1 - x2) % P
+        y3 = (s * (x1 - x3) - y1) % P
+        return self._new(x3, y3)
+
     def __rmul__(self, coefficient):
+        return self.multiply(coefficient)
+
+    def multiply(self, coefficient, method=None, width=None):
+        """
+        Scalar multiplication of the point.
+
+        args:
+            coefficient: integer scalar
+            method: 'binary', 'wnaf' or 'glv', defaults to MULTIPLY_METHOD
+            width: window width for 'wnaf' and 'glv', defaults to WNAF_WIDTH
+
+        returns:
+            S256Point
+        """
         # We can mod by n because nG = 0
         coef = coefficient % N
-        return super().__rmul__(coef)
+        # Multiples of the generator come from the precomputed table.
+        if self.x is not None and self.x.num == GX and self.y.num == GY:
+            return _from_jacobian(_generator_multiply(coef))
+        # Multiply in Jacobian coordinates and convert back to affine
+        # only once, instead of inverting on every point addition.
+        method = method or self.MULTIPLY_METHOD
+        width = width or self.WNAF_WIDTH
+        if method in ('wnaf', 'glv') and width < 2:
+            raise ValueError(f'wNAF width must be at least 2: {width}')
+        if method == 'binary':
+            result = _jacobian_multiply(_to_jacobian(self), coef)
+        elif method == 'wnaf':
+            result = _jacobian_multiply_wnaf(_to_jacobian(self), coef, width)
+        elif method == 'glv':
+            result = _jacobian_multiply_glv(_to_jacobian(self), coef, width)
+        else:
+            raise ValueError(f'Unknown scalar multiplication method: {method}')
+        return _from_jacobian(result)
 
     def verify(self, z, sig):
         """
@@ -203,11 +736,35 @@ class S256Point(Point):
             True: signature is valid
             False: signature is invalid
         """
-        s_inv = pow(sig.s, N - 2, N)
+        cache = self.signature_cache
+        if cache is None or self.x is None:
+            return self._verify(z, sig)
+        key = cache.key(self.sec(), z % N, sig.der())
+        if cache.contains(key):
+            return True
+        valid = self._verify(z, sig)
+        if valid:
+            cache.add(key)
+        return valid
+
+    def _verify(self, z, sig):
+        """Verify secp256k1 signature, bypassing the signature cache."""
+        s_inv = _inverse(sig.s, N)
         u = z * s_inv % N
         v = sig.r * s_inv % N
-        total = u * G + v * self
-        return total.x.num == sig.r
+        # u*G + v*self computed with one shared chain of doublings,
+        # both scalars split in ~128-bit halves with the endomorphism.
+        width = self.WNAF_WIDTH
+        terms = _glv_terms(_generator_odd_multiples(), u, _G_WNAF_WIDTH)
+        terms += _glv_terms(
+            _odd_multiples(_to_jacobian(self), width), v, width
+        )
+        x, _, z = _jacobian_multi_multiply(terms)
+        if not z or not 0 <= sig.r < P:
+            return False
+        # Compare in Jacobian coordinates: x/z**2 == r <=> x == r*z**2,
+        # which saves the inversion of converting back to affine.
+        return x == sig.r * z * z % P
 
     def sec(self, compressed=True):
         """Serialize S256Point in binary version of SEC format."""
@@ -221,12 +778,98 @@ class S256Point(Point):
         return b'\x04' + self.x.num.to_bytes(32, 'big') \
             + self.y.num.to_bytes(32, 'big')
 
+    def xonly(self):
+        """Serialize S256Point as a 32-byte BIP340 x-only public key."""
+        return self.x.num.to_bytes(32, 'big')
+
     @classmethod
-    def parse(self, sec_bin):
-        """Returns a S256Point object parsed from SEC binary (not hex)."""
+    def parse_xonly(cls, xonly_bin):
+        """
+        Returns the S256Point with even y for a BIP340 x-only public key.
+
+        raises:
+            SyntaxError: if the key is not 32 bytes or not on the curve
+        """
+        if len(xonly_bin) != 32:
+            raise SyntaxError('x-only public key must be 32 bytes')
+        xy = _lift_x(int.from_bytes(xonly_bin, 'big'))
+        if xy is None:
+            raise SyntaxError('x-only public key is not on the curve')
+        return cls._new(*xy)
+
+    def verify_schnorr(self, msg, sig):
+        """
+        Verify BIP340 Schnorr signature.
+
+        The point is used as an x-only key: only its x coordinate
+        matters, as if it had an even y.
+
+        args:
+            msg: signed message in binary format
+            sig: SchnorrSignature
+
+        returns:
+            True: signature is valid
+            False: signature is invalid
+        """
+        if self.x is None or not (sig.r < P and sig.s < N):
+            return False
+        px, py = self.x.num, self.y.num
+        if py % 2:
+            py = P - py
+        e = _schnorr_challenge(sig.r, px, msg)
+        # s*G - e*P with one shared chain of doublings
+        width = self.WNAF_WIDTH
+        terms = _glv_terms(
+            _generator_odd_multiples(), sig.s, _G_WNAF_WIDTH
+        )
+        terms += _glv_terms(
+            _odd_multiples((px, py, 1), width), -e % N, width
+        )
+        r = _jacobian_multi_multiply(terms)
+        x, _, z = r
+        if not z or x != sig.r * z * z % P:
+            return False
+        _, y = _normalize_jacobian([r])[0]
+        return y % 2 == 0
+
+    # Cache of parsed points keyed by SEC bytes, see `parse`.
+    parse_cache = LRUCache(maxsize=4096)
+    # Cache of valid signatures used by `verify`: set it to a
+    # py_bitcoin.sigcache.SignatureCache to enable it.
+    signature_cache = None
+
+    @classmethod
+    def parse(cls, sec_bin, trusted=False):
+        """
+        Returns a S256Point object parsed from SEC binary (not hex).
+
+        Parsed points are kept in `S256Point.parse_cache`, so parsing the
+        same public key again skips the square root and curve checks.
+        Only checked points are cached: trusted parses read the cache
+        but never add unchecked points to it.
+
+        args:
+            sec_bin: point in binary SEC format
+            trusted: skip the on-curve check, only for SEC data this
+                library produced itself
+        """
+        sec_bin = bytes(sec_bin)
+        point = cls.parse_cache.get(sec_bin)
+        if point is None:
+            point = cls._parse_sec(sec_bin, trusted)
+            if not trusted:
+                cls.parse_cache.put(sec_bin, point)
+        return point
+
+    @classmethod
+    def _parse_sec(cls, sec_bin, trusted=False):
+        """Parse SEC binary to S256Point, bypassing the cache."""
         if sec_bin[0] == 4:
             x = int.from_bytes(sec_bin[1:33], 'big')
             y = int.from_bytes(sec_bin[33:65], 'big')
+            if trusted:
+                return S256Point._new(x, y)
             return S256Point(x=x, y=y)
         is_even = sec_bin[0] == 2
         x = S256Field(int.from_bytes(sec_bin[1:], 'big'))
@@ -240,10 +883,23 @@ class S256Point(Point):
         else:
             even_beta = S256Field(P - beta.num)
             odd_beta = beta
-        if is_even:
-            return S256Point(x, even_beta)
+        y = even_beta if is_even else odd_beta
+        if trusted:
+            return S256Point._new(x.num, y.num)
+        return S256Point(x, y)
+
+    @classmethod
+    def configure_parse_cache(cls, maxsize):
+        """Set the maximum number of cached points, 0 disables the cache."""
+        cls.parse_cache.resize(maxsize)
+
+    @classmethod
+    def invalidate_parsed(cls, sec_bin=None):
+        """Drop one SEC key from the parse cache, or all of them if None."""
+        if sec_bin is None:
+            cls.parse_cache.clear()
         else:
-            return S256Point(x, odd_beta)
+            cls.parse_cache.invalidate(bytes(sec_bin))
 
     def hash160(self, compressed=True):
         """
@@ -327,6 +983,38 @@ class Signature:
         return cls(r, s)
 
 
+class SchnorrSignature:
+    """BIP340 Schnorr signature: x of the nonce point R and s."""
+    def __init__(self, r, s):
+        self.r = r
+        self.s = s
+
+    def __repr__(self):
+        return 'SchnorrSignature({:x},{:x})'.format(self.r, self.s)
+
+    def __eq__(self, other):
+        return self.r == other.r and self.s == other.s
+
+    def serialize(self):
+        """Serialize SchnorrSignature in the 64-byte BIP340 format."""
+        return self.r.to_bytes(32, 'big') + self.s.to_bytes(32, 'big')
+
+    @classmethod
+    def parse(cls, signature_bin):
+        """
+        Parse 64-byte BIP340 signature to SchnorrSignature object.
+
+        Out of range r and s are not rejected here, they make the
+        verification fail.
+        """
+        if len(signature_bin) != 64:
+            raise SyntaxError('Schnorr signature must be 64 bytes')
+        return cls(
+            int.from_bytes(signature_bin[:32], 'big'),
+            int.from_bytes(signature_bin[32:], 'big'),
+        )
+
+
 class PrivateKey:
     """
     Private key used for signing messages and transactions.
@@ -352,24 +1040,8 @@ class PrivateKey:
         Generate unique deterministic random number
         according to RFC 6979 specification.
         """
-        k = b'\x00' * 32
-        v = b'\x01' * 32
-        if z > N:
-            z -= N
-        z_bytes = z.to_bytes(32, 'big')
         secret_bytes = self.secret.to_bytes(32, 'big')
-        s256 = hashlib.sha256
-        k = hmac.new(k, v + b'\x00' + secret_bytes + z_bytes, s256).digest()
-        v = hmac.new(k, v, s256).digest()
-        k = hmac.new(k, v + b'\x01' + secret_bytes + z_bytes, s256).digest()
-        v = hmac.new(k, v, s256).digest()
-        while True:
-            v = hmac.new(k, v, s256).digest()
-            candidate = int.from_bytes(v, 'big')
-            if candidate >= 1 and candidate < N:
-                return candidate
-            k = hmac.new(k, v + b'\x00', s256).digest()
-            v = hmac.new(k, v, s256).digest()
+        return _rfc6979_k(_rfc6979_prefix(secret_bytes), secret_bytes, z)
 
     def sign(self, z):
         """
@@ -383,12 +1055,79 @@ class PrivateKey:
         """
         k = self.deterministic_k(z)
         r = (k*G).x.num
-        k_inv = pow(k, N - 2, N)
+        k_inv = _inverse(k, N)
         s = (z + r * self.secret) * k_inv % N
         if s > N / 2:
             s = N - s
         return Signature(r, s)
 
+    def sign_many(self, z_list, workers=1, chunksize=256):
+        """
+        Sign many messages or transactions with a private key.
+
+        Gives the same signatures as `sign`, but shares the work that
+        depends only on the secret, computes the nonce points with the
+        fixed-base table of G and does one inversion mod P and one mod N
+        per chunk instead of one of each per signature.
+
+        args:
+            z_list: iterable of signature hashes
+            workers: number of worker processes; 1, the default, signs
+                everything in the current process, None uses one process
+                per CPU. Worker processes receive the secret.
+            chunksize: number of signatures computed by a worker at a time
+
+        returns:
+            list of signatures, in the order of z_list
+        """
+        if chunksize < 1:
+            raise ValueError(f'chunksize must be positive: {chunksize}')
+        z_list = list(z_list)
+        chunks = [
+            (self.secret, z_list[i:i + chunksize])
+            for i in range(0, len(z_list), chunksize)
+        ]
+        if workers is None:
+            workers = os.cpu_count() or 1
+        workers = min(workers, len(chunks))
+        if workers <= 1:
+            chunk_results = map(_sign_chunk, chunks)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                chunk_results = list(executor.map(_sign_chunk, chunks))
+        return [
+            Signature(r, s) for chunk in chunk_results for r, s in chunk
+        ]
+
+    def sign_schnorr(self, msg, aux_rand=None):
+        """
+        Sign a message with a private key using BIP340 Schnorr.
+
+        args:
+            msg: message in binary format, usually a 32-byte hash
+            aux_rand: 32 bytes of auxiliary randomness mixed into the
+                nonce, fresh random bytes by default
+
+        returns:
+            SchnorrSignature
+        """
+        if aux_rand is None:
+            aux_rand = os.urandom(32)
+        d = self.secret
+        if self.point.y.num % 2:
+            d = N - d
+        px = self.point.xonly()
+        t = d ^ int.from_bytes(tagged_hash('BIP0340/aux', aux_rand), 'big')
+        nonce = tagged_hash('BIP0340/nonce', t.to_bytes(32, 'big') + px + msg)
+        k = int.from_bytes(nonce, 'big') % N
+        if not k:
+            raise ValueError('Schnorr nonce is zero')
+        rx, ry = _normalize_jacobian([_generator_multiply(k)])[0]
+        if ry % 2:
+            k = N - k
+        e = _schnorr_challenge(rx, self.point.x.num, msg)
+        return SchnorrSignature(rx, (k + e * d) % N)
+
     def wif(self, compressed=True, testnet=False):
         """Return PrivateKey serialization in WIF format."""
         secret_bytes = self.secret.to_bytes(32, 'big')
@@ -401,3 +1140,256 @@ class PrivateKey:
         else:
             suffix = b''
         return encode_base58_checksum(prefix + secret_bytes + suffix)
+
+
+def _lift_x(x):
+    """Return the affine point (x, y) with even y, None if there is none."""
+    if x >= P:
+        return None
+    alpha = (pow(x, 3, P) + B) % P
+    y = pow(alpha, (P + 1) // 4, P)
+    if y * y % P != alpha:
+        return None
+    return (x, y) if y % 2 == 0 else (x, P - y)
+
+
+def _schnorr_challenge(rx, px, msg):
+    """Return the BIP340 challenge e for R.x, P.x and the message."""
+    e = tagged_hash(
+        'BIP0340/challenge',
+        rx.to_bytes(32, 'big') + px.to_bytes(32, 'big') + msg,
+    )
+    return int.from_bytes(e, 'big') % N
+
+
+def verify_schnorr_batch(items):
+    """
+    Verify many BIP340 Schnorr signatures at once.
+
+    With random weights a_i (a_1 = 1), checks that
+    (sum a_i*s_i)*G - sum a_i*R_i - sum a_i*e_i*P_i is the point at
+    infinity with a single multi-scalar multiplication, which shares one
+    chain of doublings between all the signatures. A forged signature
+    passes only with negligible probability.
+
+    args:
+        items: iterable of (S256Point, message, SchnorrSignature)
+
+    returns:
+        True if all the signatures are valid, False if any is invalid;
+        verify them one by one to find out which
+    """
+    width = S256Point.WNAF_WIDTH
+    s_sum = 0
+    points = []
+    coefs = []
+    for i, (point, msg, sig) in enumerate(items):
+        if point.x is None or not (sig.r < P and sig.s < N):
+            return False
+        r = _lift_x(sig.r)
+        if r is None:
+            return False
+        px, py = point.x.num, point.y.num
+        if py % 2:
+            py = P - py
+        e = _schnorr_challenge(sig.r, px, msg)
+        a = 1 if i == 0 else secrets.randbelow(N - 1) + 1
+        s_sum += a * sig.s
+        points.append(r + (1,))
+        points.append((px, py, 1))
+        coefs.append(N - a)
+        coefs.append(-a * e % N)
+    # odd multiples of all the points made affine with one inversion,
+    # so that every addition of the multi-multiplication is mixed
+    count = 1 << (width - 2)
+    multiples = [
+        multiple for point in points for multiple in
+        _odd_multiples(point, width)
+    ]
+    affine = [(x, y, 1) for x, y in _normalize_jacobian(multiples)]
+    terms = _glv_terms(_generator_odd_multiples(), s_sum % N, _G_WNAF_WIDTH)
+    for i, coef in enumerate(coefs):
+        terms += _glv_terms(affine[i * count:(i + 1) * count], coef, width)
+    return not _jacobian_multi_multiply(terms)[2]
+
+
+def _rfc6979_prefix(secret_bytes):
+    """
+    Return the HMAC state of the first RFC 6979 step before z is added.
+
+    The first HMAC has the constant key 0x00 * 32 and its message starts
+    with the constant V, 0x00 and the secret, so its state can be shared
+    by all signatures of a key and copied for each z.
+    """
+    return hmac.new(
+        b'\x00' * 32, b'\x01' * 32 + b'\x00' + secret_bytes, hashlib.sha256
+    )
+
+
+def _rfc6979_k(prefix, secret_bytes, z):
+    """
+    Generate the RFC 6979 nonce for z.
+
+    args:
+        prefix: HMAC state returned by `_rfc6979_prefix`
+        secret_bytes: private key secret as 32 big endian bytes
+        z: signature hash
+
+    returns:
+        nonce k
+    """
+    if z > N:
+        z -= N
+    z_bytes = z.to_bytes(32, 'big')
+    s256 = hashlib.sha256
+    k = prefix.copy()
+    k.update(z_bytes)
+    k = k.digest()
+    v = hmac.new(k, b'\x01' * 32, s256).digest()
+    k = hmac.new(k, v + b'\x01' + secret_bytes + z_bytes, s256).digest()
+    v = hmac.new(k, v, s256).digest()
+    while True:
+        v = hmac.new(k, v, s256).digest()
+        candidate = int.from_bytes(v, 'big')
+        if candidate >= 1 and candidate < N:
+            return candidate
+        k = hmac.new(k, v + b'\x00', s256).digest()
+        v = hmac.new(k, v, s256).digest()
+
+
+def _sign_chunk(job):
+    """
+    Sign a chunk of signature hashes with one secret.
+
+    args:
+        job: (secret, list of signature hashes)
+
+    returns:
+        list of (r, s) integer pairs
+    """
+    secret, z_list = job
+    secret_bytes = secret.to_bytes(32, 'big')
+    prefix = _rfc6979_prefix(secret_bytes)
+    ks = [_rfc6979_k(prefix, secret_bytes, z) for z in z_list]
+    points = _normalize_jacobian([_generator_multiply(k) for k in ks])
+    k_invs = _batch_invert(ks, N)
+    results = []
+    for z, (r, _), k_inv in zip(z_list, points, k_invs):
+        s = (z + r * secret) * k_inv % N
+        if s > N / 2:
+            s = N - s
+        results.append((r, s))
+    return results
+
+
+def _verify_chunk(chunk):
+    """Verify a chunk of (x, y, z, r, s) tuples in a worker process."""
+    results = []
+    for x, y, z, r, s in chunk:
+        point = S256Point(x, y) if x is not None else S256Point(None, None)
+        results.append(point._verify(z, Signature(r, s)))
+    return results
+
+
+def verify_batch(items, workers=None, chunksize=64):
+    """
+    Verify many secp256k1 signatures using a pool of worker processes.
+
+    args:
+        items: iterable of (S256Point, z, Signature) triples
+        workers: number of worker processes, defaults to the number
+            of CPUs; 1 verifies everything in the current process
+        chunksize: number of signatures sent to a worker at a time
+
+    returns:
+        list of booleans, one per item, in the order of items
+    """
+    if chunksize < 1:
+        raise ValueError(f'chunksize must be positive: {chunksize}')
+    items = list(items)
+    results = [None] * len(items)
+    # signatures found in the signature cache are not sent to workers
+    cache = S256Point.signature_cache
+    keys = {}
+    # Points are sent as plain integers, which are cheaper to pickle
+    # than S256Point objects with their S256Field coordinates.
+    jobs = []
+    pending = []
+    for i, (point, z, sig) in enumerate(items):
+        if point.x is None:
+            jobs.append((None, None, z, sig.r, sig.s))
+            pending.append(i)
+            continue
+        if cache is not None:
+            key = cache.key(point.sec(), z % N, sig.der())
+            if cache.contains(key):
+                results[i] = True
+                continue
+            keys[i] = key
+        jobs.append((point.x.num, point.y.num, z, sig.r, sig.s))
+        pending.append(i)
+    chunks = [
+        jobs[i:i + chunksize] for i in range(0, len(jobs), chunksize)
+    ]
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(chunks))
+    if workers <= 1:
+        chunk_results = map(_verify_chunk, chunks)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            chunk_results = list(executor.map(_verify_chunk, chunks))
+    verified = (result for chunk in chunk_results for result in chunk)
+    for i, valid in zip(pending, verified):
+        results[i] = valid
+        if valid and i in keys:
+            cache.add(keys[i])
+    return results
+
+
+DerivedKey = namedtuple(
+    'DerivedKey', ['secret', 'point', 'sec', 'hash160', 'address']
+)
+
+
+def derive_keys(
+        start, stop, step=1, compressed=True, testnet=False, batch_size=1024
+):
+    """
+    Lazily derive public keys for the secrets in range(start, stop, step).
+
+    Instead of a full scalar multiplication per secret, each point is
+    obtained from the previous one by adding step*G, and points are
+    converted to affine coordinates batch_size at a time with a single
+    field inversion per batch.
+
+    args:
+        start, stop, step: range of secrets, as for the range() builtin
+        compressed: use compressed SEC serialization
+        testnet: produce testnet addresses
+        batch_size: number of points normalized together
+
+    yields:
+        DerivedKey(secret, point, sec, hash160, address)
+    """
+    secret_range = range(start, stop, step)
+    if not secret_range:
+        return
+    if min(secret_range) < 1 or max(secret_range) >= N:
+        raise ValueError('Secrets must be in range 1 to N - 1')
+    if batch_size < 1:
+        raise ValueError(f'batch_size must be positive: {batch_size}')
+    prefix = b'\x6f' if testnet else b'\x00'
+    step_x, step_y = _normalize_jacobian([_generator_multiply(step)])[0]
+    current = _generator_multiply(start)
+    for offset in range(0, len(secret_range), batch_size):
+        batch = secret_range[offset:offset + batch_size]
+        points = []
+        for _ in batch:
+            points.append(current)
+            current = _jacobian_add_affine(current, step_x, step_y)
+        for secret, point in zip(batch, _batch_from_jacobian(points)):
+            sec = point.sec(compressed)
+            h160 = hash160(sec)
+            address = encode_base58_checksum(prefix + h160)
+            yield DerivedKey(secret, point, sec, h160, address)
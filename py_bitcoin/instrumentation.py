@@ -0,0 +1,287 @@
+"""
+Opt-in instrumentation of ECC hot paths.
+
+While no Stats object is enabled the library runs its plain, unwrapped
+functions. Enabling instrumentation replaces the hot-path methods and
+functions of py_bitcoin.ecc by counting or timing wrappers, and
+disabling it restores the originals.
+
+Example:
+    stats = Stats()
+    with instrument(stats):
+        key.sign(z)
+    stats.counters['jacobian.double']
+    stats.histograms['sign'].percentile(0.99)
+"""
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+from functools import update_wrapper
+import threading
+import time
+
+from py_bitcoin import ecc
+
+
+class Histogram:
+    """
+    Histogram of durations in seconds with power of two buckets.
+
+    Bucket i counts durations up to BOUNDS[i], the last bucket counts
+    everything longer than BOUNDS[-1].
+    """
+    BOUNDS = tuple(1e-6 * 2 ** i for i in range(25))
+
+    def __init__(self):
+        self.buckets = [0] * (len(self.BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def __repr__(self):
+        return 'Histogram(count={}, mean={:.6f})'.format(
+            self.count, self.mean()
+        )
+
+    def add(self, seconds):
+        """Record one duration."""
+        self.buckets[bisect_left(self.BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if self.min is None or seconds < self.min:
+            self.min = seconds
+        if self.max is None or seconds > self.max:
+            self.max = seconds
+
+    def mean(self):
+        """Return the mean duration, 0 if nothing was recorded."""
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, q):
+        """
+        Estimate a percentile from the buckets.
+
+        args:
+            q: fraction between 0 and 1
+
+        returns:
+            upper bound of the bucket holding the percentile,
+            capped by the longest recorded duration
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.BOUNDS, self.buckets):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self):
+        """Return the histogram as a JSON serializable dict."""
+        return {
+            'count': self.count,
+            'total': self.total,
+            'min': self.min,
+            'max': self.max,
+            'bounds': list(self.BOUNDS),
+            'buckets': list(self.buckets),
+        }
+
+
+class Stats:
+    """
+    Operation counters and timing histograms.
+
+    args:
+        hook: optional callable(name, seconds) called after every
+            timed operation, e.g. to export metrics
+    """
+    def __init__(self, hook=None):
+        self.counters = Counter()
+        self.histograms = {}
+        self.hooks = [] if hook is None else [hook]
+
+    def __repr__(self):
+        return 'Stats({})'.format(dict(self.counters))
+
+    def count(self, name):
+        self.counters[name] += 1
+
+    def record(self, name, seconds):
+        self.counters[name] += 1
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        histogram.add(seconds)
+        for hook in self.hooks:
+            hook(name, seconds)
+
+    def reset(self):
+        """Clear all counters and histograms."""
+        self.counters.clear()
+        self.histograms.clear()
+
+    def to_dict(self):
+        """Return the statistics as a JSON serializable dict."""
+        return {
+            'counters': dict(self.counters),
+            'histograms': {
+                name: histogram.to_dict()
+                for name, histogram in self.histograms.items()
+            },
+        }
+
+
+_lock = threading.Lock()
+# enabled Stats objects, wrappers report to all of them
+_active = []
+# (owner, attribute, original) of installed wrappers
+_originals = []
+
+
+def _counting(func, name):
+    def wrapper(*args, **kwargs):
+        for stats in _active:
+            stats.count(name)
+        return func(*args, **kwargs)
+    return update_wrapper(wrapper, func)
+
+
+def _counting_full_adds(func, name):
+    # _jacobian_add hands additions of a point with Z == 1 over to
+    # _jacobian_add_affine, which counts them itself
+    def wrapper(p, q):
+        if q[2] != 1:
+            for stats in _active:
+                stats.count(name)
+        return func(p, q)
+    return update_wrapper(wrapper, func)
+
+
+def _timing(func, name):
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            for stats in _active:
+                stats.record(name, elapsed)
+    return update_wrapper(wrapper, func)
+
+
+# (owner, attribute, name, wrapper factory): timed operations are
+# counted and timed, the others only counted. Every modular inversion
+# goes through ecc._inverse and is counted once as 'inversion'.
+TARGETS = (
+    (ecc.FieldElement, '__add__', 'field.add', _counting),
+    (ecc.FieldElement, '__sub__', 'field.sub', _counting),
+    (ecc.FieldElement, '__mul__', 'field.mul', _counting),
+    (ecc.FieldElement, '__pow__', 'field.pow', _counting),
+    (ecc.FieldElement, '__truediv__', 'field.div', _counting),
+    (ecc.S256Field, '__add__', 'field.add', _counting),
+    (ecc.S256Field, '__sub__', 'field.sub', _counting),
+    (ecc.S256Field, '__mul__', 'field.mul', _counting),
+    (ecc.S256Field, '__pow__', 'field.pow', _counting),
+    (ecc.S256Field, '__truediv__', 'field.div', _counting),
+    (ecc, '_inverse', 'inversion', _counting),
+    (ecc, '_batch_invert', 'batch_inversion', _counting),
+    (ecc, '_from_jacobian', 'jacobian.to_affine', _counting),
+    (ecc, '_jacobian_add', 'jacobian.add', _counting_full_adds),
+    (ecc, '_jacobian_add_affine', 'jacobian.add', _counting),
+    (ecc, '_jacobian_double', 'jacobian.double', _counting),
+    (ecc.Point, '__add__', 'point.add', _timing),
+    (ecc.S256Point, '__add__', 'point.add', _timing),
+    (ecc.Point, '__rmul__', 'point.mul', _timing),
+    (ecc.S256Point, 'multiply', 'point.mul', _timing),
+    (ecc.PrivateKey, 'sign', 'sign', _timing),
+    (ecc.PrivateKey, 'sign_many', 'sign_many', _timing),
+    (ecc.S256Point, 'verify', 'verify', _timing),
+    (ecc.PrivateKey, 'sign_schnorr', 'sign_schnorr', _timing),
+    (ecc.S256Point, 'verify_schnorr', 'verify_schnorr', _timing),
+    (ecc.S256Point, '_verify', 'verify.compute', _timing),
+)
+
+
+def _install():
+    for owner, attribute, name, wrap in TARGETS:
+        original = vars(owner)[attribute]
+        setattr(owner, attribute, wrap(original, name))
+        _originals.append((owner, attribute, original))
+
+
+def _uninstall():
+    while _originals:
+        owner, attribute, original = _originals.pop()
+        setattr(owner, attribute, original)
+
+
+def is_enabled():
+    """Return True if instrumentation wrappers are installed."""
+    return bool(_active)
+
+
+def enable(stats=None):
+    """
+    Start collecting statistics.
+
+    args:
+        stats: Stats to report to, a new one by default
+
+    returns:
+        the enabled Stats
+    """
+    if stats is None:
+        stats = Stats()
+    with _lock:
+        if stats not in _active:
+            if not _active:
+                _install()
+            _active.append(stats)
+    return stats
+
+
+def disable(stats=None):
+    """
+    Stop collecting statistics.
+
+    args:
+        stats: Stats to stop reporting to, all of them by default;
+            the original functions are restored once none is left
+    """
+    with _lock:
+        if stats is None:
+            _active.clear()
+        elif stats in _active:
+            _active.remove(stats)
+        if not _active:
+            _uninstall()
+
+
+@contextmanager
+def instrument(stats=None, hook=None):
+    """
+    Collect statistics of the operations run inside a with block.
+
+    args:
+        stats: Stats to report to, a new one by default
+        hook: optional callable(name, seconds) added to the Stats hooks
+            for the duration of the block
+
+    returns:
+        context manager yielding the Stats
+    """
+    if stats is None:
+        stats = Stats()
+    if hook is not None:
+        stats.hooks.append(hook)
+    enable(stats)
+    try:
+        yield stats
+    finally:
+        disable(stats)
+        if hook is not None:
+            stats.hooks.remove(hook)
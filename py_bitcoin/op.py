@@ -0,0 +1,472 @@
+import hashlib
+
+from py_bitcoin.ecc import S256Point, Signature
+from py_bitcoin.utils import hash160, hash256
+
+
+def encode_num(num):
+    """Encode an integer as a script number (little-endian, sign bit)."""
+    if num == 0:
+        return b''
+    abs_num = abs(num)
+    negative = num < 0
+    result = bytearray()
+    while abs_num:
+        result.append(abs_num & 0xff)
+        abs_num >>= 8
+    # the top bit of the last byte is the sign bit
+    if result[-1] & 0x80:
+        result.append(0x80 if negative else 0)
+    elif negative:
+        result[-1] |= 0x80
+    return bytes(result)
+
+
+def decode_num(element):
+    """Decode a script number to an integer."""
+    if element == b'':
+        return 0
+    big_endian = element[::-1]
+    if big_endian[0] & 0x80:
+        negative = True
+        result = big_endian[0] & 0x7f
+    else:
+        negative = False
+        result = big_endian[0]
+    for c in big_endian[1:]:
+        result <<= 8
+        result += c
+    return -result if negative else result
+
+
+def check_sig(sec, sig, z):
+    """
+    Check a DER signature with its trailing hash type byte.
+
+    args:
+        sec: public key in SEC format
+        sig: DER signature followed by the hash type byte
+        z: signature hash, or a function returning it for a hash type
+    """
+    if not sig:
+        return False
+    if callable(z):
+        z = z(sig[-1])
+    try:
+        point = S256Point.parse(sec)
+        signature = Signature.parse(sig[:-1])
+    except (SyntaxError, ValueError, IndexError):
+        return False
+    return point.verify(z, signature)
+
+
+def op_0(stack):
+    stack.append(encode_num(0))
+    return True
+
+
+def op_1negate(stack):
+    stack.append(encode_num(-1))
+    return True
+
+
+def _op_push_num(num):
+    def op(stack):
+        stack.append(encode_num(num))
+        return True
+    op.__name__ = f'op_{num}'
+    return op
+
+
+def op_nop(stack):
+    return True
+
+
+def op_verify(stack):
+    if len(stack) < 1:
+        return False
+    element = stack.pop()
+    if decode_num(element) == 0:
+        return False
+    return True
+
+
+def op_return(stack):
+    return False
+
+
+def op_toaltstack(stack, altstack):
+    if len(stack) < 1:
+        return False
+    altstack.append(stack.pop())
+    return True
+
+
+def op_fromaltstack(stack, altstack):
+    if len(altstack) < 1:
+        return False
+    stack.append(altstack.pop())
+    return True
+
+
+def op_2drop(stack):
+    if len(stack) < 2:
+        return False
+    stack.pop()
+    stack.pop()
+    return True
+
+
+def op_2dup(stack):
+    if len(stack) < 2:
+        return False
+    stack.extend(stack[-2:])
+    return True
+
+
+def op_3dup(stack):
+    if len(stack) < 3:
+        return False
+    stack.extend(stack[-3:])
+    return True
+
+
+def op_2over(stack):
+    if len(stack) < 4:
+        return False
+    stack.extend(stack[-4:-2])
+    return True
+
+
+def op_2swap(stack):
+    if len(stack) < 4:
+        return False
+    stack[-4:] = stack[-2:] + stack[-4:-2]
+    return True
+
+
+def op_ifdup(stack):
+    if len(stack) < 1:
+        return False
+    if decode_num(stack[-1]) != 0:
+        stack.append(stack[-1])
+    return True
+
+
+def op_depth(stack):
+    stack.append(encode_num(len(stack)))
+    return True
+
+
+def op_drop(stack):
+    if len(stack) < 1:
+        return False
+    stack.pop()
+    return True
+
+
+def op_dup(stack):
+    if len(stack) < 1:
+        return False
+    stack.append(stack[-1])
+    return True
+
+
+def op_nip(stack):
+    if len(stack) < 2:
+        return False
+    stack[-2:] = stack[-1:]
+    return True
+
+
+def op_over(stack):
+    if len(stack) < 2:
+        return False
+    stack.append(stack[-2])
+    return True
+
+
+def op_pick(stack):
+    if len(stack) < 1:
+        return False
+    n = decode_num(stack.pop())
+    if n < 0 or len(stack) < n + 1:
+        return False
+    stack.append(stack[-n - 1])
+    return True
+
+
+def op_roll(stack):
+    if len(stack) < 1:
+        return False
+    n = decode_num(stack.pop())
+    if n < 0 or len(stack) < n + 1:
+        return False
+    if n == 0:
+        return True
+    stack.append(stack.pop(-n - 1))
+    return True
+
+
+def op_rot(stack):
+    if len(stack) < 3:
+        return False
+    stack.append(stack.pop(-3))
+    return True
+
+
+def op_swap(stack):
+    if len(stack) < 2:
+        return False
+    stack.append(stack.pop(-2))
+    return True
+
+
+def op_tuck(stack):
+    if len(stack) < 2:
+        return False
+    stack.insert(-2, stack[-1])
+    return True
+
+
+def op_size(stack):
+    if len(stack) < 1:
+        return False
+    stack.append(encode_num(len(stack[-1])))
+    return True
+
+
+def op_equal(stack):
+    if len(stack) < 2:
+        return False
+    element1 = stack.pop()
+    element2 = stack.pop()
+    stack.append(encode_num(1 if element1 == element2 else 0))
+    return True
+
+
+def op_equalverify(stack):
+    return op_equal(stack) and op_verify(stack)
+
+
+def _op_unary(func, name):
+    def op(stack):
+        if len(stack) < 1:
+            return False
+        stack.append(encode_num(func(decode_num(stack.pop()))))
+        return True
+    op.__name__ = name
+    return op
+
+
+def _op_binary(func, name):
+    def op(stack):
+        if len(stack) < 2:
+            return False
+        b = decode_num(stack.pop())
+        a = decode_num(stack.pop())
+        stack.append(encode_num(func(a, b)))
+        return True
+    op.__name__ = name
+    return op
+
+
+op_1add = _op_unary(lambda a: a + 1, 'op_1add')
+op_1sub = _op_unary(lambda a: a - 1, 'op_1sub')
+op_negate = _op_unary(lambda a: -a, 'op_negate')
+op_abs = _op_unary(abs, 'op_abs')
+op_not = _op_unary(lambda a: int(a == 0), 'op_not')
+op_0notequal = _op_unary(lambda a: int(a != 0), 'op_0notequal')
+op_add = _op_binary(lambda a, b: a + b, 'op_add')
+op_sub = _op_binary(lambda a, b: a - b, 'op_sub')
+op_booland = _op_binary(lambda a, b: int(a != 0 and b != 0), 'op_booland')
+op_boolor = _op_binary(lambda a, b: int(a != 0 or b != 0), 'op_boolor')
+op_numequal = _op_binary(lambda a, b: int(a == b), 'op_numequal')
+op_numnotequal = _op_binary(lambda a, b: int(a != b), 'op_numnotequal')
+op_lessthan = _op_binary(lambda a, b: int(a < b), 'op_lessthan')
+op_greaterthan = _op_binary(lambda a, b: int(a > b), 'op_greaterthan')
+op_lessthanorequal = _op_binary(
+    lambda a, b: int(a <= b), 'op_lessthanorequal'
+)
+op_greaterthanorequal = _op_binary(
+    lambda a, b: int(a >= b), 'op_greaterthanorequal'
+)
+op_min = _op_binary(min, 'op_min')
+op_max = _op_binary(max, 'op_max')
+
+
+def op_numequalverify(stack):
+    return op_numequal(stack) and op_verify(stack)
+
+
+def op_within(stack):
+    if len(stack) < 3:
+        return False
+    maximum = decode_num(stack.pop())
+    minimum = decode_num(stack.pop())
+    element = decode_num(stack.pop())
+    stack.append(encode_num(1 if minimum <= element < maximum else 0))
+    return True
+
+
+def _op_hash(func, name):
+    def op(stack):
+        if len(stack) < 1:
+            return False
+        stack.append(func(stack.pop()))
+        return True
+    op.__name__ = name
+    return op
+
+
+op_ripemd160 = _op_hash(
+    lambda s: hashlib.new('ripemd160', s).digest(), 'op_ripemd160'
+)
+op_sha1 = _op_hash(lambda s: hashlib.sha1(s).digest(), 'op_sha1')
+op_sha256 = _op_hash(lambda s: hashlib.sha256(s).digest(), 'op_sha256')
+op_hash160 = _op_hash(hash160, 'op_hash160')
+op_hash256 = _op_hash(hash256, 'op_hash256')
+
+
+def op_checksig(stack, z):
+    if len(stack) < 2:
+        return False
+    sec = stack.pop()
+    sig = stack.pop()
+    stack.append(encode_num(1 if check_sig(sec, sig, z) else 0))
+    return True
+
+
+def op_checksigverify(stack, z):
+    return op_checksig(stack, z) and op_verify(stack)
+
+
+def op_checkmultisig(stack, z):
+    if len(stack) < 1:
+        return False
+    n = decode_num(stack.pop())
+    if n < 0 or len(stack) < n + 1:
+        return False
+    sec_pubkeys = [stack.pop() for _ in range(n)][::-1]
+    m = decode_num(stack.pop())
+    if m < 0 or m > n or len(stack) < m + 1:
+        return False
+    sigs = [stack.pop() for _ in range(m)][::-1]
+    # off-by-one bug of the original implementation: one extra element
+    stack.pop()
+    # signatures must match public keys in order
+    keys = iter(sec_pubkeys)
+    valid = all(any(check_sig(sec, sig, z) for sec in keys) for sig in sigs)
+    stack.append(encode_num(1 if valid else 0))
+    return True
+
+
+def op_checkmultisigverify(stack, z):
+    return op_checkmultisig(stack, z) and op_verify(stack)
+
+
+# Flow control opcodes, handled by the script evaluator itself.
+OP_IF = 99
+OP_NOTIF = 100
+OP_ELSE = 103
+OP_ENDIF = 104
+
+OP_CODE_FUNCTIONS = {
+    0: op_0,
+    79: op_1negate,
+    97: op_nop,
+    105: op_verify,
+    106: op_return,
+    107: op_toaltstack,
+    108: op_fromaltstack,
+    109: op_2drop,
+    110: op_2dup,
+    111: op_3dup,
+    112: op_2over,
+    114: op_2swap,
+    115: op_ifdup,
+    116: op_depth,
+    117: op_drop,
+    118: op_dup,
+    119: op_nip,
+    120: op_over,
+    121: op_pick,
+    122: op_roll,
+    123: op_rot,
+    124: op_swap,
+    125: op_tuck,
+    130: op_size,
+    135: op_equal,
+    136: op_equalverify,
+    139: op_1add,
+    140: op_1sub,
+    143: op_negate,
+    144: op_abs,
+    145: op_not,
+    146: op_0notequal,
+    147: op_add,
+    148: op_sub,
+    154: op_booland,
+    155: op_boolor,
+    156: op_numequal,
+    157: op_numequalverify,
+    158: op_numnotequal,
+    159: op_lessthan,
+    160: op_greaterthan,
+    161: op_lessthanorequal,
+    162: op_greaterthanorequal,
+    163: op_min,
+    164: op_max,
+    165: op_within,
+    166: op_ripemd160,
+    167: op_sha1,
+    168: op_sha256,
+    169: op_hash160,
+    170: op_hash256,
+    172: op_checksig,
+    173: op_checksigverify,
+    174: op_checkmultisig,
+    175: op_checkmultisigverify,
+    # OP_NOP1, OP_CHECKLOCKTIMEVERIFY, OP_CHECKSEQUENCEVERIFY, OP_NOP4-10
+    # are treated as no-ops: locktime checks need the whole transaction
+    176: op_nop,
+    177: op_nop,
+    178: op_nop,
+    179: op_nop,
+    180: op_nop,
+    181: op_nop,
+    182: op_nop,
+    183: op_nop,
+    184: op_nop,
+    185: op_nop,
+}
+for _num in range(1, 17):
+    OP_CODE_FUNCTIONS[80 + _num] = _op_push_num(_num)
+del _num
+
+# Opcodes whose functions also take the alternate stack, or the z.
+ALTSTACK_OPS = {107, 108}
+SIGNATURE_OPS = {172, 173, 174, 175}
+
+OP_CODE_NAMES = {
+    0: 'OP_0',
+    76: 'OP_PUSHDATA1',
+    77: 'OP_PUSHDATA2',
+    78: 'OP_PUSHDATA4',
+    79: 'OP_1NEGATE',
+    97: 'OP_NOP',
+    99: 'OP_IF',
+    100: 'OP_NOTIF',
+    103: 'OP_ELSE',
+    104: 'OP_ENDIF',
+    176: 'OP_NOP1',
+    177: 'OP_CHECKLOCKTIMEVERIFY',
+    178: 'OP_CHECKSEQUENCEVERIFY',
+}
+for _num in range(4, 11):
+    OP_CODE_NAMES[175 + _num] = f'OP_NOP{_num}'
+del _num
+for _code, _func in OP_CODE_FUNCTIONS.items():
+    if _code not in OP_CODE_NAMES:
+        OP_CODE_NAMES[_code] = _func.__name__.upper()
+del _code, _func
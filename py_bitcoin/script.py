@@ -0,0 +1,473 @@
+import hashlib
+
+from py_bitcoin.op import (
+    ALTSTACK_OPS,
+    OP_CODE_FUNCTIONS,
+    OP_CODE_NAMES,
+    OP_ELSE,
+    OP_ENDIF,
+    OP_IF,
+    OP_NOTIF,
+    SIGNATURE_OPS,
+    check_sig,
+    decode_num,
+    encode_num,
+)
+from py_bitcoin.utils import (
+    TrackedList,
+    encode_varint,
+    hash160,
+    int_to_little_endian,
+    little_endian_to_int,
+    read_varint,
+    read_varint_from,
+    track_lists,
+)
+
+
+# Opcodes with special meaning for script parsing.
+OP_PUSHDATA1 = 76
+OP_PUSHDATA2 = 77
+OP_PUSHDATA4 = 78
+# Opcodes pushing a small number, allowed in push-only scripts.
+OP_1NEGATE = 79
+OP_1 = 81
+OP_16 = 96
+
+# Kinds of instructions of a compiled script.
+_PUSH = 0
+_OP = 1
+_ALTSTACK_OP = 2
+_SIGNATURE_OP = 3
+_IF = 4
+_NOTIF = 5
+_ELSE = 6
+_INVALID = 7
+
+# Standard script templates recognized by `Script.template`.
+P2PKH = 'p2pkh'
+P2SH = 'p2sh'
+P2WPKH = 'p2wpkh'
+P2WSH = 'p2wsh'
+
+
+def p2pkh_script(h160):
+    """Return the ScriptPubKey paying to a hash160 (P2PKH)."""
+    return Script([0x76, 0xa9, h160, 0x88, 0xac])
+
+
+def p2sh_script(h160):
+    """Return the ScriptPubKey paying to a redeem script hash (P2SH)."""
+    return Script([0xa9, h160, 0x87])
+
+
+def p2wpkh_script(h160):
+    """Return the ScriptPubKey paying to a witness hash160 (P2WPKH)."""
+    return Script([0, h160])
+
+
+def p2wsh_script(h256):
+    """Return the ScriptPubKey paying to a witness script sha256 (P2WSH)."""
+    return Script([0, h256])
+
+
+def _match_template(raw):
+    """Return (template name, hash) of a raw ScriptPubKey, or (None, None)."""
+    length = len(raw)
+    if length == 25 and raw[0] == 0x76 and raw[1] == 0xa9 \
+            and raw[2] == 20 and raw[23] == 0x88 and raw[24] == 0xac:
+        return P2PKH, bytes(raw[3:23])
+    if length == 23 and raw[0] == 0xa9 and raw[1] == 20 and raw[22] == 0x87:
+        return P2SH, bytes(raw[2:22])
+    if length == 22 and raw[0] == 0 and raw[1] == 20:
+        return P2WPKH, bytes(raw[2:22])
+    if length == 34 and raw[0] == 0 and raw[1] == 32:
+        return P2WSH, bytes(raw[2:34])
+    return None, None
+
+
+def _compile(cmds):
+    """
+    Compile script commands to a list of (kind, value) instructions.
+
+    Opcodes are resolved to their functions, and conditionals to jump
+    targets, so that executing the script needs no lookups.
+    """
+    program = []
+    # [IF instruction index, ELSE instruction index or None]
+    open_ifs = []
+    for cmd in cmds:
+        if type(cmd) != int:
+            program.append([_PUSH, cmd])
+        elif cmd == OP_IF or cmd == OP_NOTIF:
+            open_ifs.append([len(program), None])
+            program.append([_IF if cmd == OP_IF else _NOTIF, None])
+        elif cmd == OP_ELSE:
+            if not open_ifs or open_ifs[-1][1] is not None:
+                raise SyntaxError('unbalanced OP_ELSE')
+            open_ifs[-1][1] = len(program)
+            program.append([_ELSE, None])
+            # the IF jumps just past the ELSE when its branch is not taken
+            program[open_ifs[-1][0]][1] = len(program)
+        elif cmd == OP_ENDIF:
+            if not open_ifs:
+                raise SyntaxError('unbalanced OP_ENDIF')
+            if_index, else_index = open_ifs.pop()
+            if else_index is None:
+                program[if_index][1] = len(program)
+            else:
+                program[else_index][1] = len(program)
+        elif cmd in SIGNATURE_OPS:
+            program.append([_SIGNATURE_OP, OP_CODE_FUNCTIONS[cmd]])
+        elif cmd in ALTSTACK_OPS:
+            program.append([_ALTSTACK_OP, OP_CODE_FUNCTIONS[cmd]])
+        elif cmd in OP_CODE_FUNCTIONS:
+            program.append([_OP, OP_CODE_FUNCTIONS[cmd]])
+        else:
+            program.append([_INVALID, cmd])
+    if open_ifs:
+        raise SyntaxError('unbalanced OP_IF')
+    return [tuple(instruction) for instruction in program]
+
+
+def execute(program, stack, z):
+    """
+    Execute a compiled script on a stack.
+
+    args:
+        program: instructions returned by `Script.compile`
+        stack: list of stack elements, modified in place
+        z: signature hash, or a function returning it for a hash type
+
+    returns:
+        False if the script failed, True otherwise
+    """
+    altstack = []
+    i = 0
+    length = len(program)
+    while i < length:
+        kind, value = program[i]
+        i += 1
+        if kind == _PUSH:
+            stack.append(value)
+        elif kind == _OP:
+            if not value(stack):
+                return False
+        elif kind == _SIGNATURE_OP:
+            if not value(stack, z):
+                return False
+        elif kind == _ALTSTACK_OP:
+            if not value(stack, altstack):
+                return False
+        elif kind == _IF or kind == _NOTIF:
+            if not stack:
+                return False
+            condition = decode_num(stack.pop()) != 0
+            if condition != (kind == _IF):
+                i = value
+        elif kind == _ELSE:
+            i = value
+        else:
+            return False
+    return True
+
+
+class Script:
+    """
+    Bitcoin script: a list of commands, where each command is
+    either an opcode (int) or a data element (bytes).
+
+    The list of commands is copied into a list reporting its changes, so
+    that the cached serialization is dropped when it is modified in
+    place; the list given to the constructor or assigned to `cmds` is
+    not shared with the script.
+    """
+    def __init__(self, cmds=None):
+        self._cmds = TrackedList(cmds or (), self)
+        self._raw = None
+        self._compiled = None
+        self._template = None
+
+    @classmethod
+    def from_raw(cls, raw):
+        """
+        Create a script backed by its raw serialization (without the
+        length prefix). raw may be a memoryview into a larger buffer,
+        commands are only parsed when first accessed.
+        """
+        script = cls.__new__(cls)
+        script._cmds = None
+        script._raw = raw
+        script._compiled = None
+        script._template = None
+        return script
+
+    @property
+    def cmds(self):
+        """List of commands, parsed lazily from the raw serialization."""
+        if self._cmds is None:
+            self._cmds = TrackedList(self._parse_cmds(self._raw), self)
+        return self._cmds
+
+    @cmds.setter
+    def cmds(self, cmds):
+        self._cmds = TrackedList(cmds, self)
+        self._changed()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # compiled programs hold closures, compile again after loading
+        state['_compiled'] = None
+        if isinstance(state['_raw'], memoryview):
+            state['_raw'] = bytes(state['_raw'])
+        return state
+
+    def __setstate__(self, state):
+        track_lists(self, state, ('_cmds',))
+
+    def _changed(self):
+        """Drop the raw serialization and the data derived from it."""
+        self._raw = None
+        self._compiled = None
+        self._template = None
+
+    def __repr__(self):
+        """Return string representation of the script."""
+        result = []
+        for cmd in self.cmds:
+            if type(cmd) == int:
+                result.append(OP_CODE_NAMES.get(cmd, f'OP_[{cmd}]'))
+            else:
+                result.append(cmd.hex())
+        return ' '.join(result)
+
+    def __add__(self, other):
+        """Concatenate commands of two scripts."""
+        return self.__class__(self.cmds + other.cmds)
+
+    @staticmethod
+    def _parse_cmds(raw):
+        """Parse raw script serialization to a list of commands."""
+        cmds = []
+        length = len(raw)
+        count = 0
+        while count < length:
+            current_byte = raw[count]
+            count += 1
+            if 1 <= current_byte <= 75:
+                # the next current_byte bytes are an element
+                data_length = current_byte
+            elif current_byte == OP_PUSHDATA1:
+                data_length = little_endian_to_int(raw[count:count + 1])
+                count += 1
+            elif current_byte == OP_PUSHDATA2:
+                data_length = little_endian_to_int(raw[count:count + 2])
+                count += 2
+            elif current_byte == OP_PUSHDATA4:
+                data_length = little_endian_to_int(raw[count:count + 4])
+                count += 4
+            else:
+                # anything else is an opcode
+                cmds.append(current_byte)
+                continue
+            if count + data_length > length:
+                raise SyntaxError('parsing script failed')
+            cmds.append(bytes(raw[count:count + data_length]))
+            count += data_length
+        if count != length:
+            raise SyntaxError('parsing script failed')
+        return cmds
+
+    @classmethod
+    def parse(cls, s):
+        """Parse length-prefixed script from a byte stream."""
+        length = read_varint(s)
+        raw = s.read(length)
+        if len(raw) != length:
+            raise SyntaxError('parsing script failed')
+        return cls.from_raw(raw)
+
+    @classmethod
+    def parse_from(cls, buf, offset=0):
+        """
+        Parse length-prefixed script from a bytes-like buffer without
+        copying it: the script holds a memoryview of buf, which must not
+        be modified or closed while the script is used.
+
+        returns:
+            (Script, offset just past the script)
+        """
+        length, offset = read_varint_from(buf, offset)
+        end = offset + length
+        if end > len(buf):
+            raise SyntaxError('parsing script failed')
+        return cls.from_raw(memoryview(buf)[offset:end]), end
+
+    def raw_serialize(self):
+        """Serialize the script without the length prefix."""
+        if self._raw is not None:
+            return bytes(self._raw)
+        result = []
+        for cmd in self.cmds:
+            if type(cmd) == int:
+                result.append(int_to_little_endian(cmd, 1))
+                continue
+            length = len(cmd)
+            if length <= 75:
+                result.append(int_to_little_endian(length, 1))
+            elif length < 0x100:
+                result.append(int_to_little_endian(OP_PUSHDATA1, 1))
+                result.append(int_to_little_endian(length, 1))
+            elif length <= 520:
+                result.append(int_to_little_endian(OP_PUSHDATA2, 1))
+                result.append(int_to_little_endian(length, 2))
+            else:
+                raise ValueError('too long a cmd')
+            result.append(cmd)
+        return b''.join(result)
+
+    def serialize(self):
+        """Serialize the script with its length prefix."""
+        result = self.raw_serialize()
+        return encode_varint(len(result)) + result
+
+    def compile(self):
+        """
+        Return the compiled form of the script, see `execute`.
+        The script is compiled once and the result is reused.
+        """
+        if self._compiled is None:
+            self._compiled = _compile(self.cmds)
+        return self._compiled
+
+    def evaluate(self, z, stack=None):
+        """
+        Run the script with the generic stack machine.
+
+        args:
+            z: signature hash, or a function returning it for a hash type
+            stack: initial stack, empty by default
+
+        returns:
+            True if the script succeeds with a true value on the stack
+        """
+        stack = [] if stack is None else stack
+        try:
+            if not execute(self.compile(), stack, z):
+                return False
+        except SyntaxError:
+            return False
+        return bool(stack) and decode_num(stack[-1]) != 0
+
+    def template(self):
+        """Return the standard template name of a ScriptPubKey, or None."""
+        return self._match_template()[0]
+
+    def template_hash(self):
+        """Return the hash a standard ScriptPubKey pays to, or None."""
+        return self._match_template()[1]
+
+    def _match_template(self):
+        if self._template is None:
+            raw = self._raw
+            if raw is None:
+                raw = self.raw_serialize()
+            self._template = _match_template(raw)
+        return self._template
+
+    def is_push_only(self):
+        """
+        Return True if the script only pushes data: data elements, OP_0,
+        OP_1NEGATE and OP_1 to OP_16.
+        """
+        return all(
+            type(cmd) != int or cmd == 0 or cmd == OP_1NEGATE
+            or OP_1 <= cmd <= OP_16
+            for cmd in self.cmds
+        )
+
+
+def _push_value(cmd):
+    """Return the stack element pushed by a command of a push-only script."""
+    if type(cmd) != int:
+        return cmd
+    if cmd == 0:
+        return b''
+    # OP_1NEGATE and OP_1 to OP_16 push -1 and 1 to 16
+    return encode_num(cmd - OP_1 + 1)
+
+
+def _verify_witness_program(program, witness, z):
+    """Verify a P2WPKH or P2WSH witness program."""
+    template, program_hash = program.template(), program.template_hash()
+    if template == P2WPKH:
+        if len(witness) != 2:
+            return False
+        sig, sec = witness
+        return hash160(sec) == program_hash and check_sig(sec, sig, z)
+    if not witness:
+        return False
+    witness_script = witness[-1]
+    if hashlib.sha256(witness_script).digest() != program_hash:
+        return False
+    # the witness script must leave exactly one true element (clean stack)
+    stack = list(witness[:-1])
+    return Script.from_raw(witness_script).evaluate(z, stack) \
+        and len(stack) == 1
+
+
+def verify_script(script_sig, script_pubkey, z, witness=None):
+    """
+    Verify that a ScriptSig (and witness) satisfies a ScriptPubKey.
+
+    P2PKH, P2SH, P2WPKH and P2WSH outputs are checked by specialized
+    code paths; other scripts run on the generic stack machine.
+
+    args:
+        script_sig: Script of the input
+        script_pubkey: Script of the spent output
+        z: signature hash, or a function returning it for a hash type
+            (`Tx.verify_input` passes the right one for each template)
+        witness: list of witness items of the input
+
+    returns:
+        True if the scripts are valid, False otherwise
+    """
+    witness = witness or []
+    try:
+        template = script_pubkey.template()
+        if template == P2PKH:
+            cmds = script_sig.cmds
+            if len(cmds) == 2 and type(cmds[0]) == bytes \
+                    and type(cmds[1]) == bytes:
+                sig, sec = cmds
+                return hash160(sec) == script_pubkey.template_hash() \
+                    and check_sig(sec, sig, z)
+        elif template in (P2WPKH, P2WSH):
+            if script_sig.raw_serialize():
+                return False
+            return _verify_witness_program(script_pubkey, witness, z)
+        elif template == P2SH:
+            cmds = script_sig.cmds
+            if not cmds or not script_sig.is_push_only():
+                return False
+            redeem_script = cmds[-1]
+            if type(redeem_script) != bytes or \
+                    hash160(redeem_script) != script_pubkey.template_hash():
+                return False
+            redeem = Script.from_raw(redeem_script)
+            if redeem.template() in (P2WPKH, P2WSH):
+                # the ScriptSig must be exactly the push of the program,
+                # like the empty ScriptSig of a native witness program
+                if len(cmds) != 1:
+                    return False
+                return _verify_witness_program(redeem, witness, z)
+            stack = [_push_value(cmd) for cmd in cmds[:-1]]
+            return redeem.evaluate(z, stack)
+        # generic path: ScriptSig, then ScriptPubKey on the same stack
+        stack = []
+        if not execute(script_sig.compile(), stack, z):
+            return False
+        return script_pubkey.evaluate(z, stack)
+    except SyntaxError:
+        return False
@@ -0,0 +1,93 @@
+from contextlib import contextmanager
+import hashlib
+import os
+import threading
+
+from py_bitcoin.utils import LRUCache
+
+
+class SignatureCacheMiss(Exception):
+    """Raised by a SignatureCache in lookup-only mode on a miss."""
+
+
+class SignatureCache:
+    """
+    Bounded cache of signatures known to be valid.
+
+    Entries are keyed by a salted sha256 of (SEC public key, z, DER
+    signature), so the cache holds 32-byte keys only, and the random
+    salt keeps other parties from crafting colliding keys. When the
+    memory budget is reached, the least recently used entry is evicted.
+    Only valid signatures are cached: invalid ones are cheap to produce,
+    so caching them would let anyone flush the cache.
+
+    args:
+        max_bytes: approximate memory budget of the cache
+        salt: salt of the keys, random by default
+    """
+    # Approximate memory used by one entry: the 32-byte key object and
+    # its slot in the underlying ordered dict.
+    ENTRY_SIZE = 160
+
+    def __init__(self, max_bytes=32 * 2**20, salt=None):
+        self.max_bytes = max_bytes
+        self.salt = os.urandom(32) if salt is None else salt
+        self._entries = LRUCache(maxsize=max_bytes // self.ENTRY_SIZE)
+        self._local = threading.local()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def key(self, sec, z, der):
+        """
+        Return the cache key of a signature.
+
+        args:
+            sec: SEC public key
+            z: signature hash, reduced modulo N
+            der: DER signature
+        """
+        return hashlib.sha256(
+            self.salt + sec + z.to_bytes(32, 'big') + der
+        ).digest()
+
+    def contains(self, key):
+        """Return True if key is cached, counting a hit or a miss."""
+        found = self._entries.get(key) is not None
+        if not found and getattr(self._local, 'lookup_only', False):
+            raise SignatureCacheMiss()
+        return found
+
+    @contextmanager
+    def lookup_only(self):
+        """
+        Context manager in which a miss in the current thread raises
+        SignatureCacheMiss instead of letting the caller verify the
+        signature, to find out cheaply whether a script check needs any
+        signature verification at all.
+        """
+        previous = getattr(self._local, 'lookup_only', False)
+        self._local.lookup_only = True
+        try:
+            yield
+        finally:
+            self._local.lookup_only = previous
+
+    def add(self, key):
+        """Record a valid signature."""
+        self._entries.put(key, True)
+
+    def clear(self):
+        """Remove all entries and reset the statistics."""
+        self._entries.clear()
+
+    def info(self):
+        """Return statistics as a CacheInfo named tuple."""
+        return self._entries.info()
+
+    @property
+    def hit_rate(self):
+        """Fraction of lookups that found a cached signature."""
+        info = self._entries.info()
+        lookups = info.hits + info.misses
+        return info.hits / lookups if lookups else 0.0
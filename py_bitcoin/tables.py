@@ -0,0 +1,162 @@
+"""
+Precomputed tables of curve points persisted on disk.
+
+A table file is a 44 byte header followed by the payload:
+    magic (4 bytes) b'PBPT'
+    version (1 byte) and 3 reserved zero bytes
+    number of points (4 bytes, big endian)
+    sha256 of the payload (32 bytes)
+    payload: x and y of every point, 32 bytes big endian each
+
+Tables are generated on first use, written atomically into the cache
+directory and memory mapped read-only, so other processes load them
+instead of generating them again. The cache directory is $PY_BITCOIN_CACHE_DIR,
+or py_bitcoin in $XDG_CACHE_HOME or ~/.cache; setting
+PY_BITCOIN_CACHE_DIR to an empty string keeps tables in memory only.
+"""
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+
+
+MAGIC = b'PBPT'
+VERSION = 1
+HEADER = struct.Struct('>4sB3xI32s')
+POINT_SIZE = 64
+_COORDINATE_MASK = (1 << 256) - 1
+
+
+def cache_dir():
+    """Return the directory of table files, None if disabled."""
+    directory = os.environ.get('PY_BITCOIN_CACHE_DIR')
+    if directory is not None:
+        return directory or None
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(
+        os.path.expanduser('~'), '.cache'
+    )
+    return os.path.join(base, 'py_bitcoin')
+
+
+class PointTable:
+    """
+    Read-only sequence of affine (x, y) integer points stored in a
+    buffer in the table file format.
+    """
+    __slots__ = ('_buf', '_count')
+
+    def __init__(self, buf, count):
+        self._buf = buf
+        self._count = count
+
+    def __repr__(self):
+        return f'PointTable({self._count})'
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if not 0 <= index < self._count:
+            raise IndexError('point table index out of range')
+        start = HEADER.size + index * POINT_SIZE
+        xy = int.from_bytes(self._buf[start:start + POINT_SIZE], 'big')
+        return xy >> 256, xy & _COORDINATE_MASK
+
+
+def serialize_points(points):
+    """Serialize a list of affine (x, y) points in the table file format."""
+    payload = b''.join(
+        x.to_bytes(32, 'big') + y.to_bytes(32, 'big') for x, y in points
+    )
+    checksum = hashlib.sha256(payload).digest()
+    return HEADER.pack(MAGIC, VERSION, len(points), checksum) + payload
+
+
+def parse_point_table(buf):
+    """
+    Validate a buffer in the table file format.
+
+    args:
+        buf: bytes-like object, e.g. an mmap of a table file
+
+    returns:
+        PointTable backed by buf
+
+    raises:
+        SyntaxError: if the header, size or checksum is invalid
+    """
+    if len(buf) < HEADER.size:
+        raise SyntaxError('Point table is too short')
+    magic, version, count, checksum = HEADER.unpack_from(buf)
+    if magic != MAGIC:
+        raise SyntaxError(f'Bad point table magic: {magic.hex()}')
+    if version != VERSION:
+        raise SyntaxError(f'Unsupported point table version: {version}')
+    if len(buf) != HEADER.size + count * POINT_SIZE:
+        raise SyntaxError('Point table size does not match its header')
+    if hashlib.sha256(memoryview(buf)[HEADER.size:]).digest() != checksum:
+        raise SyntaxError('Point table checksum mismatch')
+    return PointTable(buf, count)
+
+
+def _map_table(path):
+    with open(path, 'rb') as f:
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        return parse_point_table(buf)
+    except SyntaxError:
+        buf.close()
+        raise
+
+
+def _write_atomic(path, data):
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        # readable by every process sharing the cache directory
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def load_point_table(name, build, directory=None):
+    """
+    Load a table of points, generating and persisting it if needed.
+
+    A missing, truncated or corrupted file is regenerated. If the cache
+    directory is disabled or not writable, the built points are used
+    from memory.
+
+    args:
+        name: file name of the table, without extension; it should
+            change whenever the content of the table changes
+        build: callable returning the list of affine (x, y) points
+        directory: directory of the table files, `cache_dir()` if None
+
+    returns:
+        sequence of affine (x, y) integer points
+    """
+    if directory is None:
+        directory = cache_dir()
+    if directory is None:
+        return build()
+    path = os.path.join(directory, name + '.bin')
+    try:
+        return _map_table(path)
+    except (OSError, ValueError, SyntaxError):
+        # missing, empty (mmap raises ValueError) or invalid file
+        pass
+    points = build()
+    try:
+        _write_atomic(path, serialize_points(points))
+        return _map_table(path)
+    except (OSError, ValueError, SyntaxError):
+        return points
@@ -1,18 +1,203 @@
-from script import Script
+import hashlib
+
+from py_bitcoin.script import (
+    P2SH,
+    P2WPKH,
+    P2WSH,
+    Script,
+    p2pkh_script,
+    verify_script,
+)
 from py_bitcoin.utils import (
+    TrackedList,
+    encode_varint,
     hash256,
+    int_to_little_endian,
     little_endian_to_int,
+    read_varint,
+    read_varint_from,
+    track_lists,
 )
 
 
-class Tx:
+# Signature hash types.
+SIGHASH_ALL = 1
+SIGHASH_NONE = 2
+SIGHASH_SINGLE = 3
+SIGHASH_ANYONECANPAY = 0x80
+
+
+def _read(buf, offset, length):
+    """
+    Return a slice of length bytes of buf at offset without copying,
+    and the offset just past it.
+    """
+    end = offset + length
+    if end > len(buf):
+        raise SyntaxError(f'Unexpected end of data at offset {offset}')
+    return buf[offset:end], end
+
+
+def _skip_script(buf, offset):
+    """Return the offset just past a length-prefixed script."""
+    length, offset = read_varint_from(buf, offset)
+    return _read(buf, offset, length)[1]
+
+
+def _parse_witness(buf, offset):
+    """
+    Parse the witness of one input.
+
+    returns:
+        (list of witness items, offset just past the witness)
+    """
+    num_items, offset = read_varint_from(buf, offset)
+    items = []
+    for _ in range(num_items):
+        length, offset = read_varint_from(buf, offset)
+        item, offset = _read(buf, offset, length)
+        items.append(bytes(item))
+    return items, offset
+
+
+def _skip_witness(buf, offset):
+    """Return the offset just past the witness of one input."""
+    num_items, offset = read_varint_from(buf, offset)
+    for _ in range(num_items):
+        offset = _skip_script(buf, offset)
+    return offset
+
+
+class _CopyingStream:
+    """
+    Stream wrapper that reads exact lengths and keeps a copy of all the
+    bytes read, so an object can be read from a stream field by field
+    and then parsed from the copy.
+    """
+    def __init__(self, s):
+        self.s = s
+        self.data = bytearray()
+
+    def read(self, length):
+        data = self.s.read(length)
+        if len(data) != length:
+            raise SyntaxError('Unexpected end of stream')
+        self.data += data
+        return data
+
+
+def _copy_script(s):
+    s.read(read_varint(s))
+
+
+def _copy_tx_in(s):
+    # previous transaction ID and index, ScriptSig, sequence
+    s.read(36)
+    _copy_script(s)
+    s.read(4)
+
+
+def _copy_tx_out(s):
+    # amount and ScriptPubKey
+    s.read(8)
+    _copy_script(s)
+
+
+def _copy_tx(s):
+    s.read(4)
+    num_inputs = read_varint(s)
+    segwit = num_inputs == 0
+    if segwit:
+        # 0x00 marker, then the flag and the real number of inputs
+        s.read(1)
+        num_inputs = read_varint(s)
+    for _ in range(num_inputs):
+        _copy_tx_in(s)
+    for _ in range(read_varint(s)):
+        _copy_tx_out(s)
+    if segwit:
+        for _ in range(num_inputs):
+            for _ in range(read_varint(s)):
+                _copy_script(s)
+    s.read(4)
+
+
+def _as_buffer(s, copy):
+    """
+    Return a bytes-like object as is, or read exactly the serialized
+    object from a stream with a `_copy_*` function and return its bytes.
+    The stream is left just past the object.
+    """
+    if isinstance(s, (bytes, bytearray, memoryview)):
+        return s
+    stream = _CopyingStream(s)
+    copy(stream)
+    return bytes(stream.data)
+
+
+# Incremented by every modification of a transaction part, so that a Tx
+# only needs to check its parts when something changed since its cached
+# data was computed.
+_generation = 0
+
+
+class _Cached:
+    """
+    Mixin for transaction parts whose serialization is cached by a Tx.
+
+    Every object has a version, incremented when one of its TRACKED
+    attributes is assigned or a list assigned to one of them is modified
+    in place. Lists assigned to TRACKED attributes are copied into
+    TrackedLists reporting their changes: after `tx.tx_ins = tx_ins`,
+    changes to tx_ins are not seen by tx, modify `tx.tx_ins` instead.
+    A Tx compares the versions of itself and its parts with the ones its
+    cached data was computed from, so parts keep no references to the
+    transactions containing them.
+    """
+    TRACKED = ()
+
+    def __setattr__(self, name, value):
+        if name in self.TRACKED:
+            if isinstance(value, list):
+                value = TrackedList(value, self)
+            object.__setattr__(self, name, value)
+            self._changed()
+        else:
+            object.__setattr__(self, name, value)
+
+    def __setstate__(self, state):
+        track_lists(self, state, self.TRACKED)
+
+    def _changed(self):
+        """Called after a tracked attribute or list was modified."""
+        global _generation
+        version = self.__dict__.get('_version')
+        # nothing to invalidate while the object is being initialized
+        if version is not None:
+            self.__dict__['_version'] = version + 1
+            _generation += 1
+
+
+class Tx(_Cached):
     """Bitcoin transaction object."""
-    def __init__(self, version, tx_ins, tx_outs, locktime, testnet=False):
+    TRACKED = ('version', 'tx_ins', 'tx_outs', 'locktime', 'segwit')
+
+    def __init__(
+            self, version, tx_ins, tx_outs, locktime,
+            testnet=False, segwit=False,
+    ):
         self.version = version
         self.tx_ins = tx_ins
         self.tx_outs = tx_outs
         self.locktime = locktime
         self.testnet = testnet
+        self.segwit = segwit
+        self._version = 0
+        # cached serializations and hashes, valid for the versions of the
+        # transaction and its parts in _cache_stamp, see `_cached`
+        self._cache_data = {}
+        self._cache_stamp = self._stamp()
+        self._cache_generation = _generation
 
     def __repr__(self):
         """Return string representation of Bitcoin transaction."""
@@ -28,19 +213,403 @@ class Tx:
             f'tx_outs:\n{tx_outs}' + \
             f'locktime: {self.locktime}'
 
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # slices of a parsed buffer are pickled as bytes, and the
+        # SigHasher is rebuilt when needed
+        state['_cache_data'] = {
+            key: bytes(value) if isinstance(value, memoryview) else value
+            for key, value in self._cache.items() if key != 'sig_hasher'
+        }
+        return state
+
+    def _stamp(self):
+        """Return the versions of the transaction and its parts."""
+        return (
+            self._version,
+            tuple([tx_in._version for tx_in in self.tx_ins]),
+            tuple([tx_out._version for tx_out in self.tx_outs]),
+        )
+
+    @property
+    def _cache(self):
+        """Return the cached data, cleared if the transaction changed."""
+        if self._cache_generation != _generation:
+            stamp = self._stamp()
+            if stamp != self._cache_stamp:
+                self._cache_data.clear()
+                self._cache_stamp = stamp
+            self._cache_generation = _generation
+        return self._cache_data
+
+    def invalidate(self):
+        """
+        Drop the cached serialization and hashes.
+
+        Changes made through attributes of the transaction, its inputs
+        and outputs are detected automatically; this is only needed
+        after modifying a Script object in place.
+        """
+        self._cache_data.clear()
+
     def hash(self):
         """Return binary hash of the legacy serialization."""
-        return hash256(self.serialize())[::-1]
+        tx_hash = self._cache.get('hash')
+        if tx_hash is None:
+            tx_hash = hash256(self.serialize_legacy())[::-1]
+            self._cache['hash'] = tx_hash
+        return tx_hash
 
     def id(self):
         """Return human-readable hexadecimal of the transaction hash."""
         return self.hash().hex()
 
+    @classmethod
+    def parse(cls, s, testnet=False):
+        """
+        Parses transaction from bytes-like object or a byte stream.
+        Returns Tx object.
+
+        Bytes-like objects are parsed in place: scripts of the returned
+        transaction are memoryview slices of the input, not copies.
+        """
+        return cls.parse_from(_as_buffer(s, _copy_tx), 0, testnet=testnet)[0]
+
+    @classmethod
+    def parse_from(cls, buf, offset=0, testnet=False):
+        """
+        Parses transaction from a bytes-like buffer at a given offset.
+
+        The transaction keeps memoryview slices of buf (its raw bytes
+        and its scripts) instead of copies, which keeps buf alive: buf
+        must not be modified or closed while the transaction is used.
+        Pass bytes(buf) when the buffer may change, e.g. a reused
+        bytearray or an mmap closed after parsing. Pickled or copied
+        transactions hold bytes and do not depend on buf.
+
+        returns:
+            (Tx, offset just past the transaction)
+        """
+        buf = memoryview(buf)
+        start = offset
+        version, offset = _read(buf, offset, 4)
+        version = little_endian_to_int(version)
+        # segwit transactions have a 0x00 marker and 0x01 flag here
+        segwit = offset + 1 < len(buf) and buf[offset] == 0 \
+            and buf[offset + 1] == 1
+        if segwit:
+            offset += 2
+        num_inputs, offset = read_varint_from(buf, offset)
+        tx_ins = []
+        for _ in range(num_inputs):
+            tx_in, offset = TxIn.parse_from(buf, offset)
+            tx_ins.append(tx_in)
+        num_outputs, offset = read_varint_from(buf, offset)
+        tx_outs = []
+        for _ in range(num_outputs):
+            tx_out, offset = TxOut.parse_from(buf, offset)
+            tx_outs.append(tx_out)
+        if segwit:
+            for tx_in in tx_ins:
+                tx_in.witness, offset = _parse_witness(buf, offset)
+        locktime, offset = _read(buf, offset, 4)
+        locktime = little_endian_to_int(locktime)
+        tx = cls(version, tx_ins, tx_outs, locktime, testnet, segwit)
+        # keep the raw bytes, so that serialization and txid of a parsed
+        # transaction need no re-serialization
+        tx._cache['raw'] = buf[start:offset]
+        return tx, offset
+
+    @classmethod
+    def parse_lazy(cls, buf, offset=0, testnet=False):
+        """
+        Return a LazyTx over the transaction at offset in buf, which
+        parses inputs and outputs only when iterated over.
+        """
+        return LazyTx(buf, offset, testnet=testnet)
+
+    def serialize(self):
+        """
+        Serialize the transaction, with witness data for segwit
+        transactions.
+        """
+        cache = self._cache
+        serialized = cache.get('serialized')
+        if serialized is not None:
+            return serialized
+        if 'raw' in cache:
+            serialized = bytes(cache['raw'])
+        elif not self.segwit:
+            serialized = self.serialize_legacy()
+        else:
+            result = [int_to_little_endian(self.version, 4), b'\x00\x01']
+            self._serialize_ins_outs(result)
+            for tx_in in self.tx_ins:
+                result.append(tx_in.serialize_witness())
+            result.append(int_to_little_endian(self.locktime, 4))
+            serialized = b''.join(result)
+        cache['serialized'] = serialized
+        return serialized
+
+    def serialize_legacy(self):
+        """Serialize the transaction without witness data."""
+        cache = self._cache
+        serialized = cache.get('legacy')
+        if serialized is not None:
+            return serialized
+        if 'raw' in cache and not self.segwit:
+            serialized = self.serialize()
+        elif 'raw' in cache:
+            # strip the marker, flag and witnesses from the raw bytes
+            serialized = LazyTx(cache['raw']).serialize_legacy()
+        else:
+            result = [int_to_little_endian(self.version, 4)]
+            self._serialize_ins_outs(result)
+            result.append(int_to_little_endian(self.locktime, 4))
+            serialized = b''.join(result)
+        cache['legacy'] = serialized
+        return serialized
+
+    def sig_hasher(self):
+        """
+        Return the SigHasher of the transaction, which shares the
+        precomputed parts of signature hashes across all inputs.
+        """
+        hasher = self._cache.get('sig_hasher')
+        if hasher is None:
+            hasher = SigHasher(self)
+            self._cache['sig_hasher'] = hasher
+        return hasher
+
+    def sig_hash(self, input_index, script_code, hash_type=SIGHASH_ALL):
+        """
+        Return the legacy signature hash of an input as an integer.
+
+        args:
+            input_index: index of the signed input
+            script_code: Script placed in the signed input, usually the
+                ScriptPubKey (or redeem script) of the spent output
+            hash_type: SIGHASH_ALL, SIGHASH_NONE or SIGHASH_SINGLE,
+                optionally combined with SIGHASH_ANYONECANPAY
+        """
+        return self.sig_hasher().legacy(input_index, script_code, hash_type)
+
+    def sig_hash_bip143(
+            self, input_index, script_code, amount, hash_type=SIGHASH_ALL
+    ):
+        """
+        Return the BIP143 (segwit v0) signature hash of an input
+        as an integer.
+
+        args:
+            input_index: index of the signed input
+            script_code: Script code of the input as defined by BIP143
+            amount: amount of the spent output in satoshis
+            hash_type: as for `sig_hash`
+        """
+        return self.sig_hasher().bip143(
+            input_index, script_code, amount, hash_type
+        )
 
-class TxIn:
+    def verify_input(self, input_index, script_pubkey, amount=None):
+        """
+        Verify the scripts and signatures of an input.
+
+        args:
+            input_index: index of the input
+            script_pubkey: Script of the output spent by the input
+            amount: amount of the spent output, needed for segwit inputs
+
+        returns:
+            True if the input is valid, False otherwise
+        """
+        tx_in = self.tx_ins[input_index]
+        template = script_pubkey.template()
+        program = None
+        script_code = script_pubkey
+        if template in (P2WPKH, P2WSH):
+            program = script_pubkey
+        elif template == P2SH:
+            try:
+                cmds = tx_in.script_sig.cmds
+            except SyntaxError:
+                return False
+            if not cmds or type(cmds[-1]) != bytes:
+                return False
+            script_code = Script.from_raw(cmds[-1])
+            if script_code.template() in (P2WPKH, P2WSH):
+                program = script_code
+        if program is not None:
+            if amount is None:
+                raise ValueError('Amount is needed to verify segwit inputs')
+            if program.template() == P2WPKH:
+                script_code = p2pkh_script(program.template_hash())
+            elif tx_in.witness:
+                script_code = Script.from_raw(tx_in.witness[-1])
+
+            def z(hash_type):
+                return self.sig_hash_bip143(
+                    input_index, script_code, amount, hash_type
+                )
+        else:
+            def z(hash_type):
+                return self.sig_hash(input_index, script_code, hash_type)
+        return verify_script(
+            tx_in.script_sig, script_pubkey, z, tx_in.witness
+        )
+
+    def _serialize_ins_outs(self, result):
+        """Append serialized inputs and outputs to the result list."""
+        result.append(encode_varint(len(self.tx_ins)))
+        for tx_in in self.tx_ins:
+            result.append(tx_in.serialize())
+        result.append(encode_varint(len(self.tx_outs)))
+        for tx_out in self.tx_outs:
+            result.append(tx_out.serialize())
+
+
+class LazyTx:
+    """
+    Transaction view over a serialized buffer.
+
+    Only the version is read on creation; inputs and outputs are parsed
+    one at a time while iterating, so large transactions never need to
+    be fully materialized.
+    """
+    def __init__(self, buf, offset=0, testnet=False):
+        self.buf = memoryview(buf)
+        self.start = offset
+        self.testnet = testnet
+        version, offset = _read(self.buf, offset, 4)
+        self.version = little_endian_to_int(version)
+        self.segwit = offset + 1 < len(self.buf) and self.buf[offset] == 0 \
+            and self.buf[offset + 1] == 1
+        if self.segwit:
+            offset += 2
+        self._ins_offset = offset
+        self._outs_offset = None
+        self._witness_offset = None
+        self._locktime_offset = None
+
+    def _scan(self):
+        """Find the offsets of outputs, witnesses and locktime."""
+        if self._locktime_offset is not None:
+            return
+        buf = self.buf
+        num_inputs, offset = read_varint_from(buf, self._ins_offset)
+        for _ in range(num_inputs):
+            # previous output (36 bytes), script_sig and sequence
+            offset = _skip_script(buf, offset + 36) + 4
+        self._outs_offset = offset
+        num_outputs, offset = read_varint_from(buf, offset)
+        for _ in range(num_outputs):
+            offset = _skip_script(buf, offset + 8)
+        self._witness_offset = offset
+        if self.segwit:
+            for _ in range(num_inputs):
+                offset = _skip_witness(buf, offset)
+        _read(buf, offset, 4)
+        self._locktime_offset = offset
+
+    @property
+    def locktime(self):
+        self._scan()
+        offset = self._locktime_offset
+        return little_endian_to_int(self.buf[offset:offset + 4])
+
+    @property
+    def end(self):
+        """Offset just past the transaction in the buffer."""
+        self._scan()
+        return self._locktime_offset + 4
+
+    @property
+    def raw(self):
+        """Serialized transaction as a memoryview of the buffer."""
+        return self.buf[self.start:self.end]
+
+    def tx_ins(self):
+        """Iterate over the transaction inputs, parsing them one by one."""
+        if self.segwit:
+            self._scan()
+            witness_offset = self._witness_offset
+        num_inputs, offset = read_varint_from(self.buf, self._ins_offset)
+        for _ in range(num_inputs):
+            tx_in, offset = TxIn.parse_from(self.buf, offset)
+            if self.segwit:
+                tx_in.witness, witness_offset = _parse_witness(
+                    self.buf, witness_offset
+                )
+            yield tx_in
+
+    def tx_outs(self):
+        """Iterate over the transaction outputs, parsing them one by one."""
+        self._scan()
+        num_outputs, offset = read_varint_from(self.buf, self._outs_offset)
+        for _ in range(num_outputs):
+            tx_out, offset = TxOut.parse_from(self.buf, offset)
+            yield tx_out
+
+    def serialize_legacy(self):
+        """Serialize the transaction without witness data."""
+        if not self.segwit:
+            return bytes(self.raw)
+        self._scan()
+        # version, then inputs and outputs, then locktime
+        return b''.join((
+            self.buf[self.start:self.start + 4],
+            self.buf[self._ins_offset:self._witness_offset],
+            self.buf[self._locktime_offset:self._locktime_offset + 4],
+        ))
+
+    def hash(self):
+        """Return binary hash of the legacy serialization."""
+        return hash256(self.serialize_legacy())[::-1]
+
+    def id(self):
+        """Return human-readable hexadecimal of the transaction hash."""
+        return self.hash().hex()
+
+    def materialize(self):
+        """Return the fully parsed Tx object."""
+        return Tx.parse_from(self.buf, self.start, testnet=self.testnet)[0]
+
+
+def iter_tx_ins(tx):
+    """
+    Iterate over the inputs of a transaction.
+
+    args:
+        tx: Tx, whose inputs are a list, or LazyTx, whose inputs are
+            parsed one by one
+
+    returns:
+        iterator of TxIn
+    """
+    return iter(tx.tx_ins() if isinstance(tx, LazyTx) else tx.tx_ins)
+
+
+def iter_tx_outs(tx):
+    """
+    Iterate over the outputs of a transaction.
+
+    args:
+        tx: Tx, whose outputs are a list, or LazyTx, whose outputs are
+            parsed one by one
+
+    returns:
+        iterator of TxOut
+    """
+    return iter(tx.tx_outs() if isinstance(tx, LazyTx) else tx.tx_outs)
+
+
+class TxIn(_Cached):
     """Class representing a Bitcoin transaction input."""
+    TRACKED = ('prev_tx', 'prev_index', 'script_sig', 'sequence', 'witness')
+
     def __init__(
-            self, prev_tx, prev_index, script_sig=None, sequence=0xffffffff
+            self, prev_tx, prev_index, script_sig=None, sequence=0xffffffff,
+            witness=None,
     ):
         self.prev_tx = prev_tx
         self.prev_index = prev_index
@@ -50,6 +619,12 @@ class TxIn:
         else:
             self.script_sig = script_sig
         self.sequence = sequence
+        # witness items (bytes) for segwit transactions
+        if witness is None:
+            self.witness = []
+        else:
+            self.witness = witness
+        self._version = 0
 
     def __repr__(self):
         """Return string representation of transaction input."""
@@ -59,17 +634,243 @@ class TxIn:
         )
 
     @classmethod
-    def parse(cls, stream):
+    def parse(cls, s):
         """
-        Parses transaction input from a byte stream.
+        Parses transaction input from bytes-like object or a byte stream.
         Returns TxIn object.
         """
+        return cls.parse_from(_as_buffer(s, _copy_tx_in), 0)[0]
+
+    @classmethod
+    def parse_from(cls, buf, offset=0):
+        """
+        Parses transaction input from a bytes-like buffer at a given
+        offset, without copying the ScriptSig: see `Tx.parse_from`
+        for the lifetime of buf.
+
+        returns:
+            (TxIn, offset just past the input)
+        """
         # parsing previous transaction ID
-        prev_tx = stream.read(32)[::-1]
+        prev_tx, offset = _read(buf, offset, 32)
+        prev_tx = bytes(prev_tx)[::-1]
         # parsing previous transaction index
-        prev_index = little_endian_to_int(stream.read(4))
-        # parsing ScriptSig from the stream
-        script_sig = Script.parse(stream)
+        prev_index, offset = _read(buf, offset, 4)
+        prev_index = little_endian_to_int(prev_index)
+        # parsing ScriptSig from the buffer
+        script_sig, offset = Script.parse_from(buf, offset)
         # parsing sequence of the input
-        sequence = little_endian_to_int(stream.read(4))
-        return cls(prev_tx, prev_index, script_sig, sequence)
+        sequence, offset = _read(buf, offset, 4)
+        sequence = little_endian_to_int(sequence)
+        return cls(prev_tx, prev_index, script_sig, sequence), offset
+
+    def serialize(self):
+        """Serialize transaction input (without witness)."""
+        return b''.join((
+            self.prev_tx[::-1],
+            int_to_little_endian(self.prev_index, 4),
+            self.script_sig.serialize(),
+            int_to_little_endian(self.sequence, 4),
+        ))
+
+    def serialize_witness(self):
+        """Serialize the witness of the input."""
+        result = [encode_varint(len(self.witness))]
+        for item in self.witness:
+            result.append(encode_varint(len(item)))
+            result.append(item)
+        return b''.join(result)
+
+
+class TxOut(_Cached):
+    """Class representing a Bitcoin transaction output."""
+    TRACKED = ('amount', 'script_pubkey')
+
+    def __init__(self, amount, script_pubkey):
+        self.amount = amount
+        self.script_pubkey = script_pubkey
+        self._version = 0
+
+    def __repr__(self):
+        """Return string representation of transaction output."""
+        return f'{self.amount}:{self.script_pubkey}'
+
+    @classmethod
+    def parse(cls, s):
+        """
+        Parses transaction output from bytes-like object or a byte stream.
+        Returns TxOut object.
+        """
+        return cls.parse_from(_as_buffer(s, _copy_tx_out), 0)[0]
+
+    @classmethod
+    def parse_from(cls, buf, offset=0):
+        """
+        Parses transaction output from a bytes-like buffer at a given
+        offset, without copying the ScriptPubKey: see `Tx.parse_from`
+        for the lifetime of buf.
+
+        returns:
+            (TxOut, offset just past the output)
+        """
+        amount, offset = _read(buf, offset, 8)
+        amount = little_endian_to_int(amount)
+        script_pubkey, offset = Script.parse_from(buf, offset)
+        return cls(amount, script_pubkey), offset
+
+    def serialize(self):
+        """Serialize transaction output."""
+        return int_to_little_endian(self.amount, 8) + \
+            self.script_pubkey.serialize()
+
+
+class SigHasher:
+    """
+    Signature hash computation for all inputs of a transaction.
+
+    The serialized outpoints, sequences and outputs, and the BIP143
+    hashPrevouts, hashSequence and hashOutputs, are computed once and
+    reused for every input, instead of re-serializing the transaction
+    for each signature hash. Get one with `Tx.sig_hasher()`, which drops
+    it when the transaction changes.
+    """
+    def __init__(self, tx):
+        self.version = int_to_little_endian(tx.version, 4)
+        self.locktime = int_to_little_endian(tx.locktime, 4)
+        self.outpoints = [
+            tx_in.prev_tx[::-1] + int_to_little_endian(tx_in.prev_index, 4)
+            for tx_in in tx.tx_ins
+        ]
+        self.sequences = [
+            int_to_little_endian(tx_in.sequence, 4) for tx_in in tx.tx_ins
+        ]
+        self.outputs = [tx_out.serialize() for tx_out in tx.tx_outs]
+        self._legacy_prefixes = None
+        self._blank_inputs = None
+        self._blank_offsets = None
+        self._all_outputs = None
+        self._hash_prevouts = None
+        self._hash_sequence = None
+        self._hash_outputs = None
+
+    def _prepare_legacy(self):
+        """
+        Precompute inputs with empty scripts, and the sha256 states
+        of the legacy serialization up to each input.
+        """
+        if self._legacy_prefixes is not None:
+            return
+        blanks = [
+            outpoint + b'\x00' + sequence
+            for outpoint, sequence in zip(self.outpoints, self.sequences)
+        ]
+        offsets = [0]
+        for blank in blanks:
+            offsets.append(offsets[-1] + len(blank))
+        prefixes = []
+        h = hashlib.sha256(self.version + encode_varint(len(blanks)))
+        for blank in blanks:
+            prefixes.append(h.copy())
+            h.update(blank)
+        self._blank_inputs = memoryview(b''.join(blanks))
+        self._blank_offsets = offsets
+        self._legacy_prefixes = prefixes
+        self._all_outputs = encode_varint(len(self.outputs)) + \
+            b''.join(self.outputs)
+
+    def legacy(self, input_index, script_code, hash_type=SIGHASH_ALL):
+        """Return the legacy signature hash of an input as an integer."""
+        num_inputs = len(self.outpoints)
+        if not 0 <= input_index < num_inputs:
+            raise IndexError(f'Input index out of range: {input_index}')
+        base_type = hash_type & 0x1f
+        anyone_can_pay = hash_type & SIGHASH_ANYONECANPAY
+        if base_type == SIGHASH_SINGLE and input_index >= len(self.outputs):
+            # consensus quirk: the hash of one, not an error
+            return 1
+        signed_input = self.outpoints[input_index] + \
+            script_code.serialize() + self.sequences[input_index]
+        if anyone_can_pay:
+            h = hashlib.sha256(self.version + b'\x01' + signed_input)
+        elif base_type not in (SIGHASH_NONE, SIGHASH_SINGLE) \
+                or num_inputs == 1:
+            # any other base type is treated as SIGHASH_ALL
+            self._prepare_legacy()
+            h = self._legacy_prefixes[input_index].copy()
+            h.update(signed_input)
+            h.update(self._blank_inputs[self._blank_offsets[input_index + 1]:])
+        else:
+            # SIGHASH_NONE and SIGHASH_SINGLE zero the other sequences
+            h = hashlib.sha256(self.version + encode_varint(num_inputs))
+            for i, outpoint in enumerate(self.outpoints):
+                if i == input_index:
+                    h.update(signed_input)
+                else:
+                    h.update(outpoint + b'\x00' + b'\x00' * 4)
+        if base_type == SIGHASH_NONE:
+            h.update(b'\x00')
+        elif base_type == SIGHASH_SINGLE:
+            h.update(encode_varint(input_index + 1))
+            # outputs before the signed one are blank: -1 amount, no script
+            for _ in range(input_index):
+                h.update(b'\xff' * 8 + b'\x00')
+            h.update(self.outputs[input_index])
+        else:
+            self._prepare_legacy()
+            h.update(self._all_outputs)
+        h.update(self.locktime + int_to_little_endian(hash_type, 4))
+        return int.from_bytes(hashlib.sha256(h.digest()).digest(), 'big')
+
+    @property
+    def hash_prevouts(self):
+        """BIP143 hashPrevouts, shared by all inputs."""
+        if self._hash_prevouts is None:
+            self._hash_prevouts = hash256(b''.join(self.outpoints))
+        return self._hash_prevouts
+
+    @property
+    def hash_sequence(self):
+        """BIP143 hashSequence, shared by all inputs."""
+        if self._hash_sequence is None:
+            self._hash_sequence = hash256(b''.join(self.sequences))
+        return self._hash_sequence
+
+    @property
+    def hash_outputs(self):
+        """BIP143 hashOutputs, shared by all inputs."""
+        if self._hash_outputs is None:
+            self._hash_outputs = hash256(b''.join(self.outputs))
+        return self._hash_outputs
+
+    def bip143(self, input_index, script_code, amount, hash_type=SIGHASH_ALL):
+        """Return the BIP143 signature hash of an input as an integer."""
+        if not 0 <= input_index < len(self.outpoints):
+            raise IndexError(f'Input index out of range: {input_index}')
+        base_type = hash_type & 0x1f
+        anyone_can_pay = hash_type & SIGHASH_ANYONECANPAY
+        zero = b'\x00' * 32
+        hash_prevouts = zero if anyone_can_pay else self.hash_prevouts
+        if anyone_can_pay or base_type in (SIGHASH_NONE, SIGHASH_SINGLE):
+            hash_sequence = zero
+        else:
+            hash_sequence = self.hash_sequence
+        if base_type not in (SIGHASH_NONE, SIGHASH_SINGLE):
+            hash_outputs = self.hash_outputs
+        elif base_type == SIGHASH_SINGLE \
+                and input_index < len(self.outputs):
+            hash_outputs = hash256(self.outputs[input_index])
+        else:
+            hash_outputs = zero
+        preimage = b''.join((
+            self.version,
+            hash_prevouts,
+            hash_sequence,
+            self.outpoints[input_index],
+            script_code.serialize(),
+            int_to_little_endian(amount, 8),
+            self.sequences[input_index],
+            hash_outputs,
+            self.locktime,
+            int_to_little_endian(hash_type, 4),
+        ))
+        return int.from_bytes(hash256(preimage), 'big')
@@ -1,4 +1,7 @@
+from collections import OrderedDict, namedtuple
 import hashlib
+import threading
+import weakref
 
 
 BASE58_ALPHABET = '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
@@ -9,6 +12,45 @@ def hash256(s):
     return hashlib.sha256(hashlib.sha256(s).digest()).digest()
 
 
+_TAG_PREFIXES = {}
+
+
+def tagged_hash(tag, s):
+    """
+    BIP340 tagged hash: sha256(sha256(tag) + sha256(tag) + s).
+
+    args:
+        tag: tag name string, e.g. 'BIP0340/challenge'
+        s: message in binary format
+    """
+    prefix = _TAG_PREFIXES.get(tag)
+    if prefix is None:
+        tag_hash = hashlib.sha256(tag.encode()).digest()
+        prefix = _TAG_PREFIXES[tag] = hashlib.sha256(tag_hash + tag_hash)
+    h = prefix.copy()
+    h.update(s)
+    return h.digest()
+
+
+# Base58 conversion works on groups of 10 digits: 58**10 fits in a machine
+# word, so the big integer is divided ten times less often. Within a group,
+# digits are converted two at a time with a table of the 58**2 digit
+# pairs, and decoding maps characters to digit values with bytes.translate.
+# The conversion of the big integer is still quadratic in its length, which
+# only matters for payloads much longer than keys and addresses. The
+# tables are built once and shared by all calls, including the bulk ones.
+_BASE58_GROUP = 10
+_BASE58_GROUP_DIVISOR = 58**_BASE58_GROUP
+_BASE58_PAIR_DIVISOR = 58**2
+_BASE58_PAIRS = [a + b for a in BASE58_ALPHABET for b in BASE58_ALPHABET]
+BASE58_INDEX = {char: index for index, char in enumerate(BASE58_ALPHABET)}
+# digit value of every ASCII character, for bytes.translate
+_BASE58_INVALID = 0xff
+_BASE58_DIGITS = bytes(
+    BASE58_INDEX.get(chr(c), _BASE58_INVALID) for c in range(256)
+)
+
+
 def encode_base58(s):
     """
     Encodes public key to BASE58 format.
@@ -19,23 +61,48 @@ def encode_base58(s):
     returns:
         private key in encode in BASE58 format.
     """
-    count = 0
-    # looping to determine how many bytes at the front are 0 bytes
-    # to add them back at the end
-    for c in s:
-        if c == 0:
-            count += 1
-        else:
-            break
+    # the number of 0 bytes at the front, added back as '1' at the end
+    count = len(s) - len(s.lstrip(b'\x00'))
     num = int.from_bytes(s, 'big')
-    prefix = '1' * count
-    result = ''
-    # figuring out which BASE58 symbol to use
+    # figuring out which BASE58 symbols to use, least significant first
+    pairs = []
     while num > 0:
-        num, mod = divmod(num, 58)
-        result = BASE58_ALPHABET[mod] + result
+        num, group = divmod(num, _BASE58_GROUP_DIVISOR)
+        for _ in range(_BASE58_GROUP // 2):
+            group, mod = divmod(group, _BASE58_PAIR_DIVISOR)
+            pairs.append(_BASE58_PAIRS[mod])
+    # the last group is padded with zero digits ('1') that must go
+    result = ''.join(reversed(pairs)).lstrip('1')
     # prepend the zeros that we counted at the front
-    return prefix + result
+    return '1' * count + result
+
+
+def decode_base58(s):
+    """
+    Decodes BASE58 string to bytes.
+
+    args:
+        s: BASE58 encoded string.
+
+    returns:
+        decoded bytes, leading '1' characters become 0 bytes.
+    """
+    count = len(s) - len(s.lstrip('1'))
+    try:
+        digits = s.encode('ascii').translate(_BASE58_DIGITS)
+    except UnicodeEncodeError:
+        digits = bytes([_BASE58_INVALID])
+    if _BASE58_INVALID in digits:
+        char = next(c for c in s if c not in BASE58_INDEX)
+        raise ValueError(f'Invalid BASE58 character: {char!r}')
+    num = 0
+    for start in range(0, len(digits), _BASE58_GROUP):
+        chunk = digits[start:start + _BASE58_GROUP]
+        group = 0
+        for digit in chunk:
+            group = group * 58 + digit
+        num = num * 58**len(chunk) + group
+    return b'\x00' * count + num.to_bytes((num.bit_length() + 7) // 8, 'big')
 
 
 def encode_base58_checksum(b):
@@ -43,6 +110,42 @@ def encode_base58_checksum(b):
     return encode_base58(b + hash256(b)[:4])
 
 
+def decode_base58_checksum(s):
+    """
+    Decode BASE58 string with a checksum.
+
+    returns:
+        payload without the 4 checksum bytes.
+
+    raises:
+        ValueError: if the checksum does not match.
+    """
+    data = decode_base58(s)
+    payload, checksum = data[:-4], data[-4:]
+    if len(data) < 4 or hash256(payload)[:4] != checksum:
+        raise ValueError(f'Bad BASE58 checksum: {s}')
+    return payload
+
+
+def encode_base58_checksum_many(payloads):
+    """
+    Encode a list of payloads to BASE58 with checksums, one at a time:
+    only the digit tables are shared between payloads.
+    """
+    return [encode_base58_checksum(payload) for payload in payloads]
+
+
+def decode_base58_checksum_many(strings):
+    """
+    Decode a list of BASE58 strings with checksums, one at a time:
+    only the digit tables are shared between strings.
+
+    raises:
+        ValueError: if any of the checksums does not match.
+    """
+    return [decode_base58_checksum(string) for string in strings]
+
+
 def hash160(s):
     """sha256 followed by ripemd160."""
     return hashlib.new('ripemd160', hashlib.sha256(s).digest()).digest()
@@ -75,6 +178,27 @@ def read_varint(stream):
         return i
 
 
+def read_varint_from(buf, offset=0):
+    """
+    Read variable integer from a bytes-like buffer at a given offset.
+
+    returns:
+        (integer, offset just past the variable integer)
+    """
+    try:
+        i = buf[offset]
+    except IndexError:
+        raise SyntaxError(f'Unexpected end of data at offset {offset}')
+    if i < 0xfd:
+        return i, offset + 1
+    # 0xfd, 0xfe and 0xff mean the next 2, 4 and 8 bytes are the number
+    length = 2 if i == 0xfd else 4 if i == 0xfe else 8
+    end = offset + 1 + length
+    if end > len(buf):
+        raise SyntaxError(f'Unexpected end of data at offset {offset}')
+    return int.from_bytes(buf[offset + 1:end], 'little'), end
+
+
 def encode_varint(i):
     """Encode an integer as a variable integer."""
     if i < 0xfd:
@@ -87,3 +211,173 @@ def encode_varint(i):
         return b'\xff' + int_to_little_endian(i, 8)
     else:
         raise ValueError(f'integer is too large: {i}')
+
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+
+class LRUCache:
+    """
+    Bounded thread-safe mapping that evicts the least recently used entry.
+
+    args:
+        maxsize: maximum number of entries, 0 disables caching
+    """
+    def __init__(self, maxsize=1024):
+        if maxsize < 0:
+            raise ValueError(f'maxsize must not be negative: {maxsize}')
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        """Return the value cached for key, or default on a miss."""
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """Cache value for key, evicting the oldest entry if full."""
+        if not self.maxsize:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key):
+        """Remove key from the cache, return True if it was present."""
+        with self._lock:
+            return self._data.pop(key, None) is not None
+
+    def resize(self, maxsize):
+        """Change the maximum number of entries, evicting if needed."""
+        if maxsize < 0:
+            raise ValueError(f'maxsize must not be negative: {maxsize}')
+        with self._lock:
+            self.maxsize = maxsize
+            while len(self._data) > maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        """Remove all entries and reset the statistics."""
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        """Return cache statistics as a CacheInfo named tuple."""
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._data))
+
+
+class TrackedList(list):
+    """
+    List that reports in-place modifications to its owner, so that
+    cached serializations of the owner can be invalidated.
+
+    args:
+        items: initial items, copied into the list
+        owner: object whose `_changed()` method is called after every
+            modification; only a weak reference to it is kept
+
+    Pickled and copied lists are plain lists, which the owner wraps
+    again with `track_lists` when it is loaded.
+    """
+    __slots__ = ('_owner',)
+
+    def __init__(self, items, owner):
+        super().__init__(items)
+        self._owner = weakref.ref(owner)
+
+    def __reduce_ex__(self, protocol):
+        # the weak reference to the owner cannot be pickled
+        return list, (list(self),)
+
+    def _changed(self):
+        owner = self._owner()
+        if owner is not None:
+            owner._changed()
+
+    def __setitem__(self, index, value):
+        super().__setitem__(index, value)
+        self._changed()
+
+    def __delitem__(self, index):
+        super().__delitem__(index)
+        self._changed()
+
+    def __iadd__(self, items):
+        super().__iadd__(items)
+        self._changed()
+        return self
+
+    def __imul__(self, n):
+        super().__imul__(n)
+        self._changed()
+        return self
+
+    def append(self, item):
+        super().append(item)
+        self._changed()
+
+    def extend(self, items):
+        super().extend(items)
+        self._changed()
+
+    def insert(self, index, item):
+        super().insert(index, item)
+        self._changed()
+
+    def pop(self, *args):
+        item = super().pop(*args)
+        self._changed()
+        return item
+
+    def remove(self, item):
+        super().remove(item)
+        self._changed()
+
+    def clear(self):
+        super().clear()
+        self._changed()
+
+    def sort(self, *args, **kwargs):
+        super().sort(*args, **kwargs)
+        self._changed()
+
+    def reverse(self):
+        super().reverse()
+        self._changed()
+
+
+def track_lists(owner, state, names):
+    """
+    Restore the attributes of an object from a pickled state, wrapping
+    the lists of the given attributes in TrackedLists owned by it.
+
+    args:
+        owner: object being unpickled or copied
+        state: dict of the pickled attributes
+        names: names of the attributes holding tracked lists
+    """
+    owner.__dict__.update(state)
+    for name in names:
+        value = state.get(name)
+        if isinstance(value, list):
+            owner.__dict__[name] = TrackedList(value, owner)
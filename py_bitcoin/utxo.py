@@ -0,0 +1,191 @@
+from array import array
+
+from py_bitcoin.script import Script
+from py_bitcoin.transactions import TxOut, iter_tx_ins, iter_tx_outs
+from py_bitcoin.utils import int_to_little_endian
+
+
+COINBASE_PREV_TX = b'\x00' * 32
+COINBASE_PREV_INDEX = 0xffffffff
+
+
+def outpoint_key(prev_tx, prev_index):
+    """Return packed 36-byte key of an outpoint (as serialized in TxIn)."""
+    return prev_tx[::-1] + int_to_little_endian(prev_index, 4)
+
+
+def is_coinbase(tx_ins):
+    """Return True if the list of inputs is the one of a coinbase tx."""
+    return len(tx_ins) == 1 and tx_ins[0].prev_tx == COINBASE_PREV_TX \
+        and tx_ins[0].prev_index == COINBASE_PREV_INDEX
+
+
+class BlockUndo:
+    """Data needed to revert the changes a block made to a UtxoSet."""
+    def __init__(self):
+        # packed outpoint keys of created outputs
+        self.created = []
+        # (key, amount, script_pubkey bytes) of spent outputs
+        self.spent = []
+        # (key, amount, script_pubkey bytes) of unspent outputs replaced
+        # by an output with the same outpoint (BIP30 duplicate txids)
+        self.overwritten = []
+
+
+class UtxoSet:
+    """
+    Set of unspent transaction outputs keyed by outpoint.
+
+    Outputs are not stored as Python objects: each outpoint maps to a
+    slot in flat arrays of amounts and script ids, and identical
+    ScriptPubKeys (e.g. address reuse) are stored once and shared.
+    """
+    def __init__(self):
+        # outpoint key -> slot in the arrays below
+        self._index = {}
+        self._amounts = array('q')
+        self._script_ids = array('I')
+        self._free_slots = array('I')
+        # deduplicated ScriptPubKey storage with reference counts
+        self._scripts = []
+        self._script_index = {}
+        self._script_refs = array('I')
+        self._free_scripts = array('I')
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, outpoint):
+        return outpoint_key(*outpoint) in self._index
+
+    def _store_script(self, script):
+        """Return the id of a script, adding it if not stored yet."""
+        script_id = self._script_index.get(script)
+        if script_id is not None:
+            self._script_refs[script_id] += 1
+            return script_id
+        if self._free_scripts:
+            script_id = self._free_scripts.pop()
+            self._scripts[script_id] = script
+            self._script_refs[script_id] = 1
+        else:
+            script_id = len(self._scripts)
+            self._scripts.append(script)
+            self._script_refs.append(1)
+        self._script_index[script] = script_id
+        return script_id
+
+    def _release_script(self, script_id):
+        """Drop a reference to a script, freeing it if unused."""
+        self._script_refs[script_id] -= 1
+        if not self._script_refs[script_id]:
+            del self._script_index[self._scripts[script_id]]
+            self._scripts[script_id] = None
+            self._free_scripts.append(script_id)
+
+    def _add(self, key, amount, script):
+        """Add an output by packed key and raw ScriptPubKey."""
+        if key in self._index:
+            raise ValueError(f'Output already exists: {key.hex()}')
+        script_id = self._store_script(script)
+        if self._free_slots:
+            slot = self._free_slots.pop()
+            self._amounts[slot] = amount
+            self._script_ids[slot] = script_id
+        else:
+            slot = len(self._amounts)
+            self._amounts.append(amount)
+            self._script_ids.append(script_id)
+        self._index[key] = slot
+
+    def _remove(self, key):
+        """Remove an output by packed key, return (amount, script)."""
+        slot = self._index.pop(key)
+        amount = self._amounts[slot]
+        script_id = self._script_ids[slot]
+        script = self._scripts[script_id]
+        self._release_script(script_id)
+        self._free_slots.append(slot)
+        return amount, script
+
+    def add(self, prev_tx, prev_index, tx_out):
+        """Add the output prev_index of transaction prev_tx."""
+        self._add(
+            outpoint_key(prev_tx, prev_index),
+            tx_out.amount,
+            tx_out.script_pubkey.raw_serialize(),
+        )
+
+    def get(self, prev_tx, prev_index, default=None):
+        """Return the unspent output as a TxOut, or default."""
+        slot = self._index.get(outpoint_key(prev_tx, prev_index))
+        if slot is None:
+            return default
+        script = self._scripts[self._script_ids[slot]]
+        return TxOut(self._amounts[slot], Script.from_raw(script))
+
+    def spend(self, prev_tx, prev_index):
+        """
+        Remove an unspent output and return it as a TxOut.
+
+        raises:
+            KeyError: if the output is not in the set
+        """
+        amount, script = self._remove(outpoint_key(prev_tx, prev_index))
+        return TxOut(amount, Script.from_raw(script))
+
+    def apply_block(self, txs):
+        """
+        Spend the inputs and add the outputs of the transactions of a
+        block, in order. The set is left unchanged if an input spends an
+        output that is missing.
+
+        An output whose outpoint is already unspent replaces the old one,
+        as happened with the duplicate coinbase transactions of blocks
+        91842 and 91880; the old output is restored by `undo_block`.
+
+        args:
+            txs: Tx or LazyTx objects of the block
+
+        returns:
+            BlockUndo to pass to `undo_block`
+        """
+        undo = BlockUndo()
+        try:
+            for tx in txs:
+                tx_ins = list(iter_tx_ins(tx))
+                if not is_coinbase(tx_ins):
+                    for tx_in in tx_ins:
+                        key = outpoint_key(tx_in.prev_tx, tx_in.prev_index)
+                        try:
+                            amount, script = self._remove(key)
+                        except KeyError:
+                            raise ValueError(f'Missing output: {tx_in}')
+                        undo.spent.append((key, amount, script))
+                tx_hash = tx.hash()
+                for index, tx_out in enumerate(iter_tx_outs(tx)):
+                    key = outpoint_key(tx_hash, index)
+                    if key in self._index:
+                        amount, script = self._remove(key)
+                        undo.overwritten.append((key, amount, script))
+                    self._add(
+                        key,
+                        tx_out.amount,
+                        tx_out.script_pubkey.raw_serialize(),
+                    )
+                    undo.created.append(key)
+        except Exception:
+            self.undo_block(undo)
+            raise
+        return undo
+
+    def undo_block(self, undo):
+        """Revert the changes recorded by `apply_block`."""
+        # spent outputs come back first: some of them may have been
+        # created by the same block, and are removed again below
+        for key, amount, script in reversed(undo.spent):
+            self._add(key, amount, script)
+        for key in reversed(undo.created):
+            self._remove(key)
+        for key, amount, script in reversed(undo.overwritten):
+            self._add(key, amount, script)
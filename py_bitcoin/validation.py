@@ -0,0 +1,287 @@
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    wait,
+)
+import os
+
+from py_bitcoin.ecc import S256Point
+from py_bitcoin.script import Script
+from py_bitcoin.sigcache import SignatureCache, SignatureCacheMiss
+from py_bitcoin.transactions import Tx
+from py_bitcoin.utxo import is_coinbase, outpoint_key
+
+
+def _check_tx_inputs(job):
+    """
+    Verify the inputs of one transaction.
+
+    args:
+        job: (raw transaction, list of (input index, raw ScriptPubKey,
+            amount) of the inputs to check)
+
+    returns:
+        index of the first invalid input, or None if all are valid
+    """
+    raw_tx, inputs = job
+    tx = Tx.parse(raw_tx)
+    for input_index, script_pubkey, amount in inputs:
+        if not tx.verify_input(
+                input_index, Script.from_raw(script_pubkey), amount
+        ):
+            return input_index
+    return None
+
+
+class _RecordingCache:
+    """
+    Signature cache of a worker process: it holds nothing, and records
+    the keys of the valid signatures for the cache of the parent.
+    """
+    key = SignatureCache.key
+
+    def __init__(self, salt):
+        self.salt = salt
+        self.added = []
+
+    def contains(self, key):
+        return False
+
+    def add(self, key):
+        self.added.append(key)
+
+
+def _check_chunk(chunk, salt=None):
+    """
+    Verify the inputs of a chunk of transactions in a worker process.
+
+    args:
+        chunk: list of (txid, job) for `_check_tx_inputs`
+        salt: salt of the parent signature cache, None if there is none
+
+    returns:
+        ((txid, input index) of the first invalid input or None,
+        signature cache keys of the signatures found valid)
+    """
+    if salt is None:
+        # in the current process, or no cache: verify as usual
+        for txid, job in chunk:
+            input_index = _check_tx_inputs(job)
+            if input_index is not None:
+                return (txid, input_index), []
+        return None, []
+    previous = S256Point.signature_cache
+    S256Point.signature_cache = cache = _RecordingCache(salt)
+    try:
+        return _check_chunk(chunk)[0], cache.added
+    finally:
+        S256Point.signature_cache = previous
+
+
+def _check_cached(job, cache):
+    """
+    Check the inputs of a transaction whose signatures are all in the
+    signature cache, without verifying any signature.
+
+    returns:
+        (index of the first invalid input or None, job of the inputs
+        with uncached signatures, or None if there are none)
+    """
+    raw_tx, inputs = job
+    tx = Tx.parse(raw_tx)
+    uncached = []
+    with cache.lookup_only():
+        for input_index, script_pubkey, amount in inputs:
+            try:
+                valid = tx.verify_input(
+                    input_index, Script.from_raw(script_pubkey), amount
+                )
+            except SignatureCacheMiss:
+                uncached.append((input_index, script_pubkey, amount))
+                continue
+            # invalid signatures are never cached, so this input fails
+            # whatever its signatures
+            if not valid:
+                return input_index, None
+    return None, (raw_tx, uncached) if uncached else None
+
+
+class BlockValidator:
+    """
+    Block validation pipeline over a UtxoSet.
+
+    A block goes through four stages:
+        parse: transactions are parsed from the block
+        lookup: spent outputs are resolved from the UTXO set, or from
+            outputs created earlier in the same block
+        check: scripts and signatures of all inputs are verified, in
+            small chunks of transactions spread over a process pool;
+            idle workers take the next chunk, and the remaining chunks
+            are cancelled as soon as one of them fails
+        commit: the block is applied to the UTXO set
+
+    The process pool is kept across blocks; use the validator as a
+    context manager or call `close` when done.
+
+    args:
+        utxos: UtxoSet to validate against and update
+        workers: number of worker processes, defaults to the number
+            of CPUs; 1 checks everything in the current process
+        chunk_size: number of transactions per unit of work
+    """
+    def __init__(self, utxos, workers=None, chunk_size=8):
+        if chunk_size < 1:
+            raise ValueError(f'chunk_size must be positive: {chunk_size}')
+        self.utxos = utxos
+        if workers is None:
+            workers = os.cpu_count() or 1
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Shut down the worker processes."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def validate(self, block):
+        """
+        Validate a block and apply it to the UTXO set.
+
+        args:
+            block: py_bitcoin.block.Block, or a list of Tx objects
+
+        returns:
+            BlockUndo to revert the block with `UtxoSet.undo_block`
+
+        raises:
+            ValueError: if the block is invalid; the UTXO set is then
+                left unchanged
+        """
+        txs = self.parse(block)
+        jobs = self.lookup(txs)
+        self.check(jobs)
+        return self.commit(txs)
+
+    def parse(self, block):
+        """Parse stage: return the transactions of the block as Tx."""
+        if hasattr(block, 'txs'):
+            return [lazy_tx.materialize() for lazy_tx in block.txs()]
+        return list(block)
+
+    def lookup(self, txs):
+        """
+        Lookup stage: resolve the outputs spent by each transaction.
+
+        returns:
+            list of (txid, job) for `_check_chunk`
+        """
+        # outputs created in this block: key -> (raw script, amount)
+        created = {}
+        spent = set()
+        jobs = []
+        for tx in txs:
+            tx_hash = tx.hash()
+            if not is_coinbase(tx.tx_ins):
+                inputs = []
+                total_in = 0
+                for index, tx_in in enumerate(tx.tx_ins):
+                    key = outpoint_key(tx_in.prev_tx, tx_in.prev_index)
+                    if key in spent:
+                        raise ValueError(f'Double spend of {tx_in}')
+                    spent.add(key)
+                    if key in created:
+                        script, amount = created[key]
+                    else:
+                        tx_out = self.utxos.get(
+                            tx_in.prev_tx, tx_in.prev_index
+                        )
+                        if tx_out is None:
+                            raise ValueError(f'Missing output: {tx_in}')
+                        script = tx_out.script_pubkey.raw_serialize()
+                        amount = tx_out.amount
+                    inputs.append((index, script, amount))
+                    total_in += amount
+                if sum(o.amount for o in tx.tx_outs) > total_in:
+                    raise ValueError(f'Outputs exceed inputs in {tx.id()}')
+                jobs.append((tx.id(), (tx.serialize(), inputs)))
+            for index, tx_out in enumerate(tx.tx_outs):
+                created[outpoint_key(tx_hash, index)] = (
+                    tx_out.script_pubkey.raw_serialize(), tx_out.amount,
+                )
+        return jobs
+
+    def check(self, jobs):
+        """
+        Check stage: verify scripts and signatures of all inputs.
+
+        In-process checks use `S256Point.signature_cache` directly. With
+        worker processes, inputs whose signatures are all cached (e.g.
+        verified when the transaction entered the mempool) are checked
+        here without verification, only the others are sent to the
+        workers, and the signatures the workers find valid are added to
+        the cache.
+
+        raises:
+            ValueError: for the first invalid input found
+        """
+        if self.workers <= 1 or len(jobs) <= self.chunk_size:
+            failure = next(
+                filter(None, (_check_chunk([job])[0] for job in jobs)), None
+            )
+        else:
+            failure = self._check_parallel(jobs)
+        if failure is not None:
+            txid, input_index = failure
+            raise ValueError(f'Invalid input {txid}:{input_index}')
+
+    def _check_parallel(self, jobs):
+        """Return the first failure, cancelling the chunks not started."""
+        cache = S256Point.signature_cache
+        salt = None
+        if cache is not None:
+            salt = cache.salt
+            remaining = []
+            for txid, job in jobs:
+                input_index, job = _check_cached(job, cache)
+                if input_index is not None:
+                    return txid, input_index
+                if job is not None:
+                    remaining.append((txid, job))
+            jobs = remaining
+        if not jobs:
+            return None
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        chunks = [
+            jobs[i:i + self.chunk_size]
+            for i in range(0, len(jobs), self.chunk_size)
+        ]
+        pending = {
+            self._executor.submit(_check_chunk, chunk, salt)
+            for chunk in chunks
+        }
+        try:
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    failure, keys = future.result()
+                    if failure is not None:
+                        return failure
+                    for key in keys:
+                        cache.add(key)
+            return None
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def commit(self, txs):
+        """Commit stage: apply the block to the UTXO set."""
+        return self.utxos.apply_block(txs)
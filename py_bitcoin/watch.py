@@ -0,0 +1,196 @@
+from array import array
+from collections import namedtuple
+import math
+
+from py_bitcoin.script import Script
+from py_bitcoin.transactions import iter_tx_outs
+
+
+WatchHit = namedtuple('WatchHit', ['txid', 'index', 'tx_out', 'key'])
+
+
+class BloomFilter:
+    """
+    Bloom filter over hashes such as hash160 values.
+
+    The keys are already uniformly distributed, so bit positions are
+    derived from the key bytes by double hashing instead of rehashing.
+
+    args:
+        capacity: expected number of keys
+        fp_rate: target false positive rate
+    """
+    def __init__(self, capacity, fp_rate=0.01):
+        if not 0 < fp_rate < 1:
+            raise ValueError(f'fp_rate must be in (0, 1): {fp_rate}')
+        capacity = max(capacity, 1)
+        self.size = max(
+            8, math.ceil(-capacity * math.log(fp_rate) / math.log(2) ** 2)
+        )
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        h1 = int.from_bytes(key[-8:], 'little')
+        h2 = int.from_bytes(key[-16:-8], 'little') | 1
+        size = self.size
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % size
+
+    def add(self, key):
+        """Add a key of at least 16 bytes to the filter."""
+        bits = self.bits
+        for position in self._positions(key):
+            bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        bits = self.bits
+        for position in self._positions(key):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+
+class SortedHashes:
+    """
+    Compact set of fixed-size hashes.
+
+    Hashes are kept sorted in one bytes object, with an array of bucket
+    offsets indexed by the leading bits. There are about as many buckets
+    as hashes, so a lookup checks one or two entries on average.
+
+    args:
+        hashes: iterable of hashes, all of `size` bytes
+        size: length of the hashes in bytes
+    """
+    def __init__(self, hashes, size):
+        if size < 3:
+            raise ValueError(f'hash size must be at least 3: {size}')
+        hashes = sorted(set(hashes))
+        for h in hashes:
+            if len(h) != size:
+                raise ValueError(f'Expected {size}-byte hash: {h.hex()}')
+        self.size = size
+        self.count = len(hashes)
+        self.data = b''.join(hashes)
+        bits = min(24, max(1, self.count.bit_length()))
+        self.shift = 24 - bits
+        counts = array('I', bytes(4 * ((1 << bits) + 1)))
+        for h in hashes:
+            counts[(int.from_bytes(h[:3], 'big') >> self.shift) + 1] += 1
+        for i in range(1, len(counts)):
+            counts[i] += counts[i - 1]
+        self.offsets = counts
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        size = self.size
+        for start in range(0, len(self.data), size):
+            yield self.data[start:start + size]
+
+    def __contains__(self, h):
+        if len(h) != self.size:
+            return False
+        bucket = int.from_bytes(h[:3], 'big') >> self.shift
+        size = self.size
+        data = self.data
+        for i in range(self.offsets[bucket], self.offsets[bucket + 1]):
+            if data[i * size:(i + 1) * size] == h:
+                return True
+        return False
+
+
+class WatchIndex:
+    """
+    Index of watched hashes and ScriptPubKeys for scanning transactions.
+
+    Standard outputs (P2PKH, P2SH, P2WPKH, P2WSH) are matched by the
+    hash in their ScriptPubKey: a watched hash160 matches every standard
+    output paying to it. Other ScriptPubKeys are matched exactly.
+
+    args:
+        hashes: iterable of 20-byte hash160 or 32-byte P2WSH hashes
+        scripts: iterable of ScriptPubKeys (Script or raw bytes)
+        fp_rate: false positive rate of an optional Bloom filter
+            checked before the exact lookup, None for no prefilter
+    """
+    def __init__(self, hashes=(), scripts=(), fp_rate=None):
+        by_size = {20: [], 32: []}
+        self.scripts = set()
+        for h in hashes:
+            if len(h) not in by_size:
+                raise ValueError(f'Unsupported hash size: {len(h)}')
+            by_size[len(h)].append(bytes(h))
+        for script in scripts:
+            if not isinstance(script, Script):
+                script = Script.from_raw(bytes(script))
+            h = script.template_hash()
+            if h is None:
+                self.scripts.add(script.raw_serialize())
+            else:
+                by_size[len(h)].append(h)
+        self.tables = {
+            size: SortedHashes(values, size)
+            for size, values in by_size.items()
+        }
+        self.prefilter = None
+        if fp_rate is not None:
+            count = sum(map(len, self.tables.values()))
+            self.prefilter = BloomFilter(count, fp_rate)
+            for table in self.tables.values():
+                for h in table:
+                    self.prefilter.add(h)
+
+    @classmethod
+    def from_points(cls, points, compressed=True, **kwargs):
+        """Create an index watching the hash160 of S256Points."""
+        hashes = (point.hash160(compressed) for point in points)
+        return cls(hashes, **kwargs)
+
+    def __len__(self):
+        return sum(map(len, self.tables.values())) + len(self.scripts)
+
+    def __contains__(self, h):
+        prefilter = self.prefilter
+        if prefilter is not None and h not in prefilter:
+            return False
+        table = self.tables.get(len(h))
+        return table is not None and h in table
+
+    def match(self, script_pubkey):
+        """
+        Match a ScriptPubKey against the index.
+
+        returns:
+            watched hash or raw ScriptPubKey it matches, None otherwise
+        """
+        h = script_pubkey.template_hash()
+        if h is not None:
+            return h if h in self else None
+        if self.scripts:
+            raw = script_pubkey.raw_serialize()
+            if raw in self.scripts:
+                return raw
+        return None
+
+    def scan(self, txs):
+        """
+        Yield the watched outputs of a stream of transactions.
+
+        args:
+            txs: iterable of Tx or LazyTx, e.g. `Block.txs()`
+
+        returns:
+            generator of WatchHit(txid, index, tx_out, key)
+        """
+        match = self.match
+        for tx in txs:
+            txid = None
+            for index, tx_out in enumerate(iter_tx_outs(tx)):
+                key = match(tx_out.script_pubkey)
+                if key is not None:
+                    if txid is None:
+                        txid = tx.id()
+                    yield WatchHit(txid, index, tx_out, key)
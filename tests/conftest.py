@@ -0,0 +1,26 @@
+import os
+import shutil
+import tempfile
+
+
+# Point tables are also built while collecting the test modules, so the
+# cache directory is set up before any of them is imported.
+_saved_cache_dir = None
+_table_cache_dir = None
+
+
+def pytest_configure(config):
+    """Keep the point tables out of the user's cache directory."""
+    global _saved_cache_dir, _table_cache_dir
+    _saved_cache_dir = os.environ.get('PY_BITCOIN_CACHE_DIR')
+    _table_cache_dir = tempfile.mkdtemp(prefix='py_bitcoin_cache')
+    os.environ['PY_BITCOIN_CACHE_DIR'] = _table_cache_dir
+
+
+def pytest_unconfigure(config):
+    """Restore the cache directory setting and remove the tables."""
+    if _saved_cache_dir is None:
+        os.environ.pop('PY_BITCOIN_CACHE_DIR', None)
+    else:
+        os.environ['PY_BITCOIN_CACHE_DIR'] = _saved_cache_dir
+    shutil.rmtree(_table_cache_dir, ignore_errors=True)
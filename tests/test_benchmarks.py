@@ -0,0 +1,17 @@
+from benchmarks.bench import BENCHMARKS, compare, run
+
+
+def test_benchmark_run_and_compare():
+    """Testing the benchmark runner and baseline comparison."""
+    current = run(['varint.encode'], repeat=1, min_time=0.001)
+    assert list(current['results']) == ['varint.encode']
+    assert current['results']['varint.encode']['seconds'] > 0
+    baseline = {'results': {
+        'varint.encode': {'seconds': 1e-12},
+        'removed': {'seconds': 1.0},
+    }}
+    [(name, _, _, ratio, regressed)] = compare(current, baseline)
+    assert name == 'varint.encode' and ratio > 1 and regressed
+    # every registered setup returns something callable
+    for setup in BENCHMARKS.values():
+        assert callable(setup())
@@ -0,0 +1,139 @@
+import pytest
+
+from py_bitcoin.block import (
+    MAINNET_MAGIC,
+    TESTNET_MAGIC,
+    Block,
+    BlockHeader,
+    read_block_file,
+    scan_block_files,
+)
+from py_bitcoin.script import Script
+from py_bitcoin.transactions import Tx, TxIn, TxOut
+
+
+GENESIS_HEADER = bytes.fromhex(
+    '0100000000000000000000000000000000000000000000000000000000000000'
+    '000000003ba3edfd7a7b12b27ac72c3e67768f617fc81bc3888a51323a9fb8aa'
+    '4b1e5e4a29ab5f49ffff001d1dac2b7c'
+)
+GENESIS_COINBASE = bytes.fromhex(
+    '01000000010000000000000000000000000000000000000000000000000000000000'
+    '000000ffffffff4d04ffff001d0104455468652054696d65732030332f4a616e2f32'
+    '303039204368616e63656c6c6f72206f6e206272696e6b206f66207365636f6e6420'
+    '6261696c6f757420666f722062616e6b73ffffffff0100f2052a0100000043410467'
+    '8afdb0fe5548271967f1a67130b7105cd6a828e03909a67962e0ea1f61deb649f6bc'
+    '3f4cef38c4f35504e51ec112de5c384df7ba0b8d578a4c702b6bf11d5fac00000000'
+)
+GENESIS_BLOCK = GENESIS_HEADER + b'\x01' + GENESIS_COINBASE
+GENESIS_ID = '000000000019d6689c085ae165831e934ff763ae46a2a6c172b3f1b60a8ce26f'
+
+
+def write_block_file(path, blocks, padding=0):
+    """Write blocks in blk*.dat format, with zero padding at the end."""
+    with open(path, 'wb') as f:
+        for block in blocks:
+            f.write(MAINNET_MAGIC + len(block).to_bytes(4, 'little') + block)
+        f.write(b'\x00' * padding)
+
+
+def count_txs(blocks):
+    """Return the block hashes and number of transactions of a file."""
+    ids = []
+    count = 0
+    for block in blocks:
+        ids.append(block.id())
+        count += sum(1 for _ in block.txs())
+    return ids, count
+
+
+def test_block_header():
+    """Testing block header parsing and hashing."""
+    header = BlockHeader.parse_from(GENESIS_HEADER)[0]
+    assert header.id() == GENESIS_ID
+    assert header.timestamp == 1231006505
+    assert header.serialize() == GENESIS_HEADER
+    assert header.merkle_root == Tx.parse(GENESIS_COINBASE).hash()
+
+
+def test_block_txs():
+    """Testing lazy transactions of a block with several transactions."""
+    coinbase = Tx.parse(GENESIS_COINBASE)
+    spend = Tx(
+        1,
+        [TxIn(coinbase.hash(), 0, Script([b'\x01' * 71]))],
+        [TxOut(4000000000, Script([0x51])), TxOut(1000000000, Script())],
+        0,
+    )
+    raw_txs = GENESIS_COINBASE + spend.serialize()
+    block = Block(GENESIS_HEADER + b'\x02' + raw_txs)
+    assert block.id() == GENESIS_ID
+    assert block.tx_count == 2
+    txs = list(block.txs())
+    assert [tx.id() for tx in txs] == [coinbase.id(), spend.id()]
+    assert [o.amount for o in txs[0].tx_outs()] == [5000000000]
+    assert [o.amount for o in txs[1].tx_outs()] == [4000000000, 1000000000]
+    assert txs[1].end == len(block.buf)
+
+
+def test_block_trailing_data():
+    """Bytes after the last transaction of a block are not parsed."""
+    coinbase = Tx.parse(GENESIS_COINBASE)
+    # a truncated copy of the coinbase after the block is ignored
+    block = Block(GENESIS_BLOCK + GENESIS_COINBASE[:-4])
+    txs = list(block.txs())
+    assert [tx.id() for tx in txs] == [coinbase.id()]
+    assert txs[0].end == len(GENESIS_BLOCK)
+
+
+def test_read_block_file(tmp_path):
+    """Testing reading and scanning of blk*.dat files."""
+    path = tmp_path / 'blk00000.dat'
+    write_block_file(path, [GENESIS_BLOCK, GENESIS_BLOCK], padding=100)
+    blocks = list(read_block_file(path))
+    assert [block.id() for block in blocks] == [GENESIS_ID, GENESIS_ID]
+
+    empty = tmp_path / 'blk00001.dat'
+    write_block_file(empty, [])
+    assert list(read_block_file(empty)) == []
+
+    paths = [path, empty]
+    expected = [(path, ([GENESIS_ID] * 2, 2)), (empty, ([], 0))]
+    assert list(scan_block_files(paths, count_txs, workers=1)) == expected
+    assert list(scan_block_files(paths, count_txs, workers=2)) == expected
+
+
+
+def test_read_block_file_trailing_data(tmp_path):
+    """Zero padding ends a blk*.dat file, other trailing data is invalid."""
+    padded = tmp_path / 'blk00000.dat'
+    write_block_file(padded, [GENESIS_BLOCK], padding=100)
+    assert [block.id() for block in read_block_file(padded)] == [GENESIS_ID]
+
+    garbage = tmp_path / 'blk00001.dat'
+    write_block_file(garbage, [GENESIS_BLOCK])
+    with open(garbage, 'ab') as f:
+        f.write(b'\x01\x02\x03\x04' + bytes(100))
+    blocks = read_block_file(garbage)
+    assert next(blocks).id() == GENESIS_ID
+    with pytest.raises(SyntaxError):
+        next(blocks)
+
+    truncated = tmp_path / 'blk00002.dat'
+    write_block_file(truncated, [GENESIS_BLOCK])
+    with open(truncated, 'r+b') as f:
+        f.truncate(len(GENESIS_BLOCK))
+    with pytest.raises(SyntaxError):
+        list(read_block_file(truncated))
+
+
+def test_read_block_file_wrong_magic(tmp_path):
+    """Blocks of another network are rejected."""
+    path = tmp_path / 'blk00000.dat'
+    write_block_file(path, [GENESIS_BLOCK])
+    with pytest.raises(SyntaxError):
+        list(read_block_file(path, magic=TESTNET_MAGIC))
+    with open(path, 'r+b') as f:
+        f.write(b'\x01\x02\x03\x04')
+    with pytest.raises(SyntaxError):
+        list(read_block_file(path))
@@ -1,5 +1,5 @@
 import pytest
-from py_bitcoin.ecc import FieldElement
+from py_bitcoin.ecc import P, FieldElement, S256Field
 
 
 def test_field_element_not_in_range():
@@ -96,3 +96,23 @@ def test_field_element_div():
     b = FieldElement(11, 31)
     assert (a**-4 * b == FieldElement(13, 31))
 
+
+def test_s256_field_element():
+    """Testing secp256k1 field elements and their compact representation."""
+    with pytest.raises(ValueError):
+        S256Field(P)
+    with pytest.raises(ValueError):
+        S256Field(-1)
+    with pytest.raises(TypeError):
+        S256Field(2) + FieldElement(3, 31)
+    a = S256Field(P - 1)
+    b = S256Field(5)
+    assert a + b == S256Field(4)
+    assert b - a == S256Field(6)
+    assert a * b == S256Field(P - 5)
+    assert (b / a) * a == b
+    assert b**-1 * b == S256Field(1)
+    assert 3 * b == S256Field(15)
+    assert type(a + b) is S256Field
+    # elements carry no per-instance __dict__
+    assert not hasattr(a, '__dict__')
@@ -0,0 +1,84 @@
+from py_bitcoin import ecc
+from py_bitcoin.ecc import FieldElement, PrivateKey
+from py_bitcoin.instrumentation import (
+    Histogram,
+    Stats,
+    disable,
+    enable,
+    instrument,
+    is_enabled,
+)
+
+
+def test_instrument_sign_verify():
+    """Testing operation counters and timings of sign and verify."""
+    original = ecc._jacobian_double
+    key = PrivateKey(12345)
+    events = []
+    with instrument(hook=lambda name, seconds: events.append(name)) as s:
+        assert is_enabled()
+        assert ecc._jacobian_double is not original
+        sig = key.sign(1)
+        assert key.point.verify(1, sig)
+        prime = 223
+        a = FieldElement(1, prime)
+        assert 2 * (a / FieldElement(2, prime)) == a
+    assert not is_enabled()
+    assert ecc._jacobian_double is original
+    assert s.counters['sign'] == 1
+    assert s.counters['verify'] == 1
+    assert s.counters['jacobian.double'] > 0
+    assert s.counters['field.div'] == 1
+    assert s.histograms['sign'].count == 1
+    assert events.count('sign') == 1 and events.count('verify') == 1
+    # nothing is recorded once disabled
+    key.sign(2)
+    assert s.counters['sign'] == 1
+    assert 'sign' in s.to_dict()['histograms']
+
+
+def test_instrument_counts_once():
+    """Inversions and mixed additions are each counted once."""
+    key = PrivateKey(12345)
+    sig = key.sign(1)
+    with instrument() as s:
+        key.sign(1)
+    # k*G back to affine and the inverse of k
+    assert s.counters['inversion'] == 2
+    with instrument() as s:
+        key.point.verify(1, sig)
+        key.point + key.point
+    # the inverse of s, and the slope of the doubling
+    assert s.counters['inversion'] == 2
+    with instrument() as s:
+        p = (ecc.GX, ecc.GY, 1)
+        q = ecc._jacobian_double(p)
+        ecc._jacobian_add(q, p)
+        ecc._jacobian_add(p, q)
+    assert s.counters['jacobian.add'] == 2
+
+
+def test_enable_disable_nested():
+    """Wrappers stay installed while any Stats is enabled."""
+    first = enable()
+    second = enable(Stats())
+    PrivateKey(3).sign(1)
+    disable(first)
+    assert is_enabled()
+    PrivateKey(3).sign(1)
+    disable(second)
+    assert not is_enabled()
+    assert first.counters['sign'] == 1
+    assert second.counters['sign'] == 2
+
+
+def test_histogram():
+    """Testing histogram buckets and percentiles."""
+    histogram = Histogram()
+    for seconds in (1e-6, 3e-6, 3e-6, 1e-3):
+        histogram.add(seconds)
+    assert histogram.count == 4
+    assert histogram.min == 1e-6 and histogram.max == 1e-3
+    assert histogram.percentile(0.5) == 4e-6
+    assert histogram.percentile(1) == 1e-3
+    assert Histogram().percentile(0.5) == 0.0
@@ -1,7 +1,11 @@
 import pytest
 from random import randint
 
-from py_bitcoin.ecc import A, B, G, N, S256Field, S256Point, Signature, PrivateKey
+from py_bitcoin import ecc
+from py_bitcoin.ecc import (
+    A, B, G, N, S256Field, S256Point, Signature, PrivateKey, derive_keys,
+    verify_batch,
+)
 
 
 def test_signature_verification():
@@ -114,3 +118,92 @@ def test_address_generation():
     assert point.address(compressed=False, testnet=False) == mainnet_address
     assert point.address(compressed=False, testnet=True) == testnet_address
 
+
+def test_batch_signature_verification():
+    """Testing batch verification in-process and with worker processes."""
+    items = []
+    for secret in (1, 2, randint(1, N), randint(1, N), randint(1, N)):
+        pk = PrivateKey(secret)
+        z = randint(0, 2**256)
+        items.append((pk.point, z, pk.sign(z)))
+    # tamper with one signature hash
+    point, z, sig = items[2]
+    items[2] = (point, z + 1, sig)
+    expected = [True, True, False, True, True]
+    assert verify_batch(items, workers=1) == expected
+    assert verify_batch(items, workers=2, chunksize=2) == expected
+    assert verify_batch([], workers=2) == []
+
+
+def test_bulk_signing():
+    """Bulk signing gives the same signatures as sign."""
+    pk = PrivateKey(randint(1, N))
+    z_list = [randint(0, 2**256) for _ in range(6)] + [N + 1, 1]
+    expected = [(sig.r, sig.s) for sig in map(pk.sign, z_list)]
+    for workers in (1, 2):
+        sigs = pk.sign_many(z_list, workers=workers, chunksize=3)
+        assert [(sig.r, sig.s) for sig in sigs] == expected
+    assert pk.sign_many([]) == []
+
+
+def test_bulk_signing_in_process(monkeypatch):
+    """By default, bulk signing never sends the secret to a process."""
+    def no_pool(*args, **kwargs):
+        raise AssertionError('process pool started')
+
+    monkeypatch.setattr(ecc, 'ProcessPoolExecutor', no_pool)
+    pk = PrivateKey(randint(1, N))
+    z_list = list(range(1, 8))
+    sigs = pk.sign_many(z_list, chunksize=2)
+    assert [(sig.r, sig.s) for sig in sigs] == \
+        [(sig.r, sig.s) for sig in map(pk.sign, z_list)]
+
+
+def test_bulk_key_derivation():
+    """Testing sequential and strided bulk key derivation."""
+    start = randint(1, 2**200)
+    for step, compressed, testnet in ((1, True, False), (7, False, True)):
+        keys = list(derive_keys(
+            start, start + 10 * step, step,
+            compressed=compressed, testnet=testnet, batch_size=3,
+        ))
+        assert len(keys) == 10
+        for i, key in enumerate(keys):
+            secret = start + i * step
+            point = PrivateKey(secret).point
+            assert key.secret == secret
+            assert key.point == point
+            assert key.sec == point.sec(compressed)
+            assert key.hash160 == point.hash160(compressed)
+            assert key.address == point.address(compressed, testnet)
+    with pytest.raises(ValueError):
+        list(derive_keys(0, 10))
+
+
+def test_sec_parse_cache():
+    """Testing the cache of parsed SEC public keys."""
+    S256Point.invalidate_parsed()
+    sec = bytes.fromhex(SEC_TEST_CASES[0][2])
+    point = S256Point.parse(sec)
+    assert S256Point.parse(sec) is point
+    info = S256Point.parse_cache.info()
+    assert (info.hits, info.misses, info.currsize) == (1, 1, 1)
+
+    S256Point.invalidate_parsed(sec)
+    assert S256Point.parse(sec) is not point
+    assert S256Point.parse(sec, trusted=True) == point
+
+    # an unchecked point parsed as trusted is not served to others
+    bad_sec = b'\x04' + (1).to_bytes(32, 'big') * 2
+    S256Point.parse(bad_sec, trusted=True)
+    with pytest.raises(ValueError):
+        S256Point.parse(bad_sec)
+
+    S256Point.configure_parse_cache(0)
+    try:
+        assert S256Point.parse(sec) is not S256Point.parse(sec)
+        # points not on the curve are rejected unless trusted
+        with pytest.raises(ValueError):
+            S256Point.parse(bad_sec)
+    finally:
+        S256Point.configure_parse_cache(4096)
@@ -0,0 +1,173 @@
+import pytest
+from random import randint
+
+from py_bitcoin.ecc import (
+    BETA,
+    G,
+    LAMBDA,
+    N,
+    P,
+    Point,
+    PrivateKey,
+    S256Field,
+    S256Point,
+    Signature,
+    batch_invert,
+    _batch_from_jacobian,
+    _from_jacobian,
+    _generator_multiply,
+    _glv_split,
+    _jacobian_multi_multiply,
+    _jacobian_multiply,
+    _odd_multiples,
+    _to_jacobian,
+    _wnaf,
+)
+
+
+def slow_multiply(coef, point):
+    """Reference scalar multiplication with affine double-and-add."""
+    return Point.__rmul__(point, coef % N)
+
+
+def test_jacobian_scalar_multiplication():
+    """
+    Testing that scalar multiplication in Jacobian coordinates
+    matches the affine double-and-add implementation.
+    """
+    point = 12345 * G
+    for coef in (1, 2, 3, N - 1, randint(1, N), randint(1, N)):
+        assert coef * G == slow_multiply(coef, G)
+        assert coef * point == slow_multiply(coef, point)
+
+
+def test_jacobian_scalar_multiplication_infinity():
+    """Multiplying by 0 or N should return the point at infinity."""
+    infinity = S256Point(None, None)
+    assert 0 * G == infinity
+    assert N * G == infinity
+    assert 5 * infinity == infinity
+
+
+def test_generator_fixed_base_multiplication():
+    """
+    Testing that multiplication of G through the precomputed table
+    matches the generic scalar multiplication.
+    """
+    for coef in (1, 15, 16, 2**252, N - 1, randint(1, N), randint(1, N)):
+        expected = _from_jacobian(_jacobian_multiply(_to_jacobian(G), coef))
+        assert _from_jacobian(_generator_multiply(coef)) == expected
+        assert coef * G == expected
+
+
+def test_wnaf_representation():
+    """Testing that wNAF digits reconstruct the scalar."""
+    for width in (2, 4, 5, 8):
+        coef = randint(1, N)
+        digits = _wnaf(coef, width)
+        assert sum(d << i for i, d in enumerate(digits)) == coef
+        for d in digits:
+            assert d == 0 or (d % 2 == 1 and abs(d) < 2**(width - 1))
+
+
+def test_wnaf_scalar_multiplication():
+    """
+    Testing that wNAF multiplication matches binary double-and-add
+    for arbitrary points and window widths.
+    """
+    point = randint(1, N) * G
+    for coef in (1, 2, 7, N - 1, randint(1, N), randint(1, N)):
+        expected = point.multiply(coef, method='binary')
+        for width in (2, 3, 5, 6):
+            assert point.multiply(coef, method='wnaf', width=width) == expected
+    with pytest.raises(ValueError):
+        point.multiply(3, method='unknown')
+
+
+def test_multi_scalar_multiplication():
+    """
+    Testing that interleaved multiplication u*P + v*Q matches
+    two separate multiplications followed by an addition.
+    """
+    p = randint(1, N) * G
+    q = randint(1, N) * G
+    for u, v in ((1, 1), (0, 5), (randint(1, N), randint(1, N))):
+        terms = [
+            (_odd_multiples(_to_jacobian(p), 5), _wnaf(u, 5)),
+            (_odd_multiples(_to_jacobian(q), 4), _wnaf(v, 4)),
+        ]
+        result = _from_jacobian(_jacobian_multi_multiply(terms))
+        assert result == u * p + v * q
+
+
+def test_verify_rejects_invalid_signature():
+    """Testing that verification fails for tampered signatures."""
+    pk = PrivateKey(randint(1, N))
+    z = randint(0, 2**256)
+    sig = pk.sign(z)
+    assert pk.point.verify(z, sig)
+    assert not pk.point.verify(z + 1, sig)
+    assert not pk.point.verify(z, Signature(sig.r, sig.s + 1))
+    assert not (2 * pk.point).verify(z, sig)
+
+
+def test_glv_endomorphism():
+    """Testing that (BETA*x, y) == LAMBDA * (x, y) on secp256k1."""
+    point = randint(1, N) * G
+    endo = S256Point(BETA * point.x.num % P, point.y.num)
+    assert slow_multiply(LAMBDA, point) == endo
+
+
+def test_glv_scalar_split():
+    """Testing that the GLV split gives two short scalars."""
+    for _ in range(20):
+        coef = randint(1, N)
+        k1, k2 = _glv_split(coef)
+        assert (k1 + k2 * LAMBDA) % N == coef
+        assert abs(k1) < 2**129 and abs(k2) < 2**129
+
+
+def test_glv_scalar_multiplication():
+    """
+    Testing that GLV multiplication matches the affine double-and-add
+    implementation for random points and scalars.
+    """
+    for _ in range(5):
+        point = randint(1, N) * G
+        coef = randint(1, N)
+        expected = slow_multiply(coef, point)
+        assert point.multiply(coef, method='glv') == expected
+        assert coef * point == expected
+
+
+def test_s256_point_addition():
+    """Testing that S256Point addition matches the generic Point addition."""
+    p = randint(1, N) * G
+    q = randint(1, N) * G
+    infinity = S256Point(None, None)
+    assert p + q == Point.__add__(p, q)
+    assert p + p == Point.__add__(p, p)
+    assert p + infinity == p
+    assert infinity + p == p
+    assert p + (N - 1) * p == infinity
+
+
+def test_batch_invert():
+    """Testing batch inversion of secp256k1 field elements."""
+    elements = [S256Field(randint(1, P - 1)) for _ in range(10)]
+    elements.append(S256Field(0))
+    inverses = batch_invert(elements)
+    for element, inverse in zip(elements, inverses):
+        assert inverse == S256Field(1) / element
+    assert batch_invert([]) == []
+
+
+def test_batch_affine_normalization():
+    """Testing batch conversion of Jacobian points to S256Points."""
+    coefs = [randint(1, N) for _ in range(5)]
+    points = [_generator_multiply(coef) for coef in coefs]
+    points.insert(2, _generator_multiply(N))
+    normalized = _batch_from_jacobian(points)
+    assert normalized[2] == S256Point(None, None)
+    del normalized[2]
+    assert normalized == [coef * G for coef in coefs]
@@ -0,0 +1,94 @@
+import hashlib
+
+import pytest
+
+from py_bitcoin.ecc import (
+    PrivateKey,
+    S256Point,
+    SchnorrSignature,
+    verify_schnorr_batch,
+)
+from py_bitcoin.utils import tagged_hash
+
+
+# BIP340 test vectors: secret, x-only public key, aux_rand, message,
+# signature; the last one has no secret and is checked for verification
+VECTORS = [
+    (
+        3,
+        'f9308a019258c31049344f85f89d5229b531c845836f99b08601f113bce036f9',
+        '00' * 32,
+        '00' * 32,
+        'e907831f80848d1069a5371b402410364bdf1c5f8307b0084c55f1ce2dca8215'
+        '25f66a4a85ea8b71e482a74f382d2ce5ebeee8fdb2172f477df4900d310536c0',
+    ),
+    (
+        0xb7e151628aed2a6abf7158809cf4f3c762e7160f38b4da56a784d9045190cfef,
+        'dff1d77f2a671c5f36183726db2341be58feae1da2deced843240f7b502ba659',
+        '00' * 31 + '01',
+        '243f6a8885a308d313198a2e03707344a4093822299f31d0082efa98ec4e6c89',
+        '6896bd60eeae296db48a229ff71dfe071bde413e6d43f917dc8dcf8c78de3341'
+        '8906d11ac976abccb20b091292bff4ea897efcb639ea871cfa95f6de339e4b0a',
+    ),
+    (
+        None,
+        'd69c3509bb99e412e68b0fe8544e72837dfa30746d8be2aa65975f29d22dc7b9',
+        None,
+        '4df3c3f68fcc83b27e9d42c90431a72499f17875c81a599b566c9889b9696703',
+        '00000000000000000000003b78ce563f89a0ed9414f5aa28ad0d96d6795f9c63'
+        '76afb1548af603b3eb45c9f8207dee1060cb71c04e80f593060b07d28308d7f4',
+    ),
+]
+
+
+def test_tagged_hash():
+    """Testing BIP340 tagged hashes."""
+    tag = hashlib.sha256(b'BIP0340/aux').digest()
+    expected = hashlib.sha256(tag + tag + b'msg').digest()
+    assert tagged_hash('BIP0340/aux', b'msg') == expected
+    assert tagged_hash('BIP0340/aux', b'msg') == expected
+
+
+def test_schnorr_vectors():
+    """Testing BIP340 signing and verification test vectors."""
+    items = []
+    for secret, pubkey, aux_rand, msg, sig in VECTORS:
+        pubkey, msg = bytes.fromhex(pubkey), bytes.fromhex(msg)
+        sig = SchnorrSignature.parse(bytes.fromhex(sig))
+        if secret is not None:
+            pk = PrivateKey(secret)
+            assert pk.point.xonly() == pubkey
+            assert pk.sign_schnorr(msg, bytes.fromhex(aux_rand)) == sig
+        point = S256Point.parse_xonly(pubkey)
+        assert point.verify_schnorr(msg, sig)
+        assert not point.verify_schnorr(msg + b'\x00', sig)
+        assert not point.verify_schnorr(msg, SchnorrSignature(sig.r, 0))
+        items.append((point, msg, sig))
+    assert verify_schnorr_batch(items)
+    assert verify_schnorr_batch([])
+    point, msg, sig = items[1]
+    items[1] = (point, msg, SchnorrSignature(sig.r, sig.s + 1))
+    assert not verify_schnorr_batch(items)
+
+
+def test_schnorr_sign_verify():
+    """Odd y keys sign and verify as their even y x-only key."""
+    items = []
+    for secret in range(1, 9):
+        pk = PrivateKey(secret)
+        msg = secret.to_bytes(32, 'big')
+        sig = pk.sign_schnorr(msg)
+        assert SchnorrSignature.parse(sig.serialize()) == sig
+        assert pk.point.verify_schnorr(msg, sig)
+        assert S256Point.parse_xonly(pk.point.xonly()).verify_schnorr(
+            msg, sig
+        )
+        items.append((pk.point, msg, sig))
+    assert verify_schnorr_batch(items)
+    with pytest.raises(SyntaxError):
+        S256Point.parse_xonly(b'\x00' * 31)
+    with pytest.raises(SyntaxError):
+        # x = 5 is not on the curve
+        S256Point.parse_xonly((5).to_bytes(32, 'big'))
+    with pytest.raises(SyntaxError):
+        SchnorrSignature.parse(b'\x00' * 63)
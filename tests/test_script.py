@@ -0,0 +1,174 @@
+import hashlib
+from io import BytesIO
+
+from py_bitcoin.ecc import PrivateKey
+from py_bitcoin.op import decode_num, encode_num
+from py_bitcoin.script import (
+    P2PKH,
+    P2SH,
+    P2WPKH,
+    P2WSH,
+    Script,
+    p2pkh_script,
+    p2sh_script,
+    p2wpkh_script,
+    p2wsh_script,
+    verify_script,
+)
+from py_bitcoin.transactions import SIGHASH_ALL, Tx, TxIn, TxOut
+from py_bitcoin.utils import hash160
+
+
+def test_script_numbers():
+    """Testing script number encoding."""
+    for num in (0, 1, -1, 127, 128, -128, 255, 256, -32768, 2**31):
+        assert decode_num(encode_num(num)) == num
+    assert encode_num(128) == b'\x80\x00'
+    assert encode_num(-1) == b'\x81'
+
+
+def test_generic_evaluation():
+    """Testing the compiled stack machine."""
+    # OP_2 OP_3 OP_ADD OP_5 OP_EQUAL
+    script = Script([0x52, 0x53, 0x93, 0x55, 0x87])
+    program = script.compile()
+    assert script.compile() is program
+    assert script.evaluate(0)
+    assert script.evaluate(0)
+    # OP_IF OP_2 OP_ELSE OP_3 OP_ENDIF OP_3 OP_EQUAL
+    script = Script([0x63, 0x52, 0x67, 0x53, 0x68, 0x53, 0x87])
+    assert script.evaluate(0, [encode_num(0)])
+    assert not script.evaluate(0, [encode_num(1)])
+    # OP_NOTIF OP_0 OP_ENDIF OP_1
+    script = Script([0x64, 0, 0x68, 0x51])
+    assert script.evaluate(0, [encode_num(1)])
+    # unbalanced conditionals and OP_RETURN fail
+    assert not Script([0x63, 0x51]).evaluate(0, [encode_num(1)])
+    assert not Script([0x51, 0x6a]).evaluate(0)
+    # a parsed script round trips and evaluates the same
+    raw = Script([0x52, 0x53, 0x93, 0x55, 0x87]).serialize()
+    assert Script.parse_from(raw)[0].evaluate(0)
+
+
+def test_script_cmds_changes():
+    """Changing the commands of a parsed script drops cached data."""
+    script = Script.parse(BytesIO(bytes.fromhex('025151')))
+    program = script.compile()
+    assert script.template() is None
+    script.cmds.append(0x52)
+    assert script.serialize() == bytes.fromhex('03515152')
+    assert script.compile() is not program
+    script.cmds[:] = [0x76, 0xa9, b'\x01' * 20, 0x88, 0xac]
+    assert script.template() == P2PKH
+    script.cmds = [0x51]
+    assert script.template() is None
+    assert script.serialize() == bytes.fromhex('0151')
+    # the list given to the constructor is copied
+    cmds = [0x51]
+    script = Script(cmds)
+    cmds.append(0x52)
+    assert script.serialize() == bytes.fromhex('0151')
+
+
+def test_templates():
+    """Testing standard template recognition."""
+    h160 = b'\x01' * 20
+    assert p2pkh_script(h160).template() == P2PKH
+    assert p2sh_script(h160).template() == P2SH
+    assert p2wpkh_script(h160).template() == P2WPKH
+    assert p2wsh_script(b'\x02' * 32).template() == P2WSH
+    assert p2pkh_script(h160).template_hash() == h160
+    assert Script([0x51]).template() is None
+    raw = p2pkh_script(h160).serialize()
+    assert Script.parse_from(raw)[0].template() == P2PKH
+
+
+def unsigned_tx(script_pubkeys, amount=10000):
+    """Build a transaction spending one output per script_pubkey."""
+    tx_ins = [
+        TxIn(bytes([i + 1]) * 32, i) for i in range(len(script_pubkeys))
+    ]
+    tx_outs = [TxOut(amount - 1000, p2pkh_script(b'\x00' * 20))]
+    return Tx(1, tx_ins, tx_outs, 0, segwit=True)
+
+
+def test_verify_inputs():
+    """Testing input verification for the standard templates."""
+    key = PrivateKey(8675309)
+    sec = key.point.sec()
+    h160 = hash160(sec)
+    multisig = Script([0x51, sec, PrivateKey(42).point.sec(), 0x52, 0xae])
+    script_pubkeys = [
+        p2pkh_script(h160),
+        p2wpkh_script(h160),
+        p2sh_script(hash160(multisig.raw_serialize())),
+        p2sh_script(hash160(p2wpkh_script(h160).raw_serialize())),
+        # generic: <sig> <sec> OP_CHECKSIG
+        Script([sec, 0xac]),
+    ]
+    amount = 10000
+    tx = unsigned_tx(script_pubkeys, amount)
+
+    def sign(z):
+        return key.sign(z).der() + bytes([SIGHASH_ALL])
+
+    sig = sign(tx.sig_hash(0, script_pubkeys[0]))
+    tx.tx_ins[0].script_sig = Script([sig, sec])
+    sig = sign(tx.sig_hash_bip143(1, script_pubkeys[0], amount))
+    tx.tx_ins[1].witness = [sig, sec]
+    sig = sign(tx.sig_hash(2, multisig))
+    tx.tx_ins[2].script_sig = Script([0, sig, multisig.raw_serialize()])
+    sig = sign(tx.sig_hash_bip143(3, script_pubkeys[0], amount))
+    tx.tx_ins[3].script_sig = Script([p2wpkh_script(h160).raw_serialize()])
+    tx.tx_ins[3].witness = [sig, sec]
+    sig = sign(tx.sig_hash(4, script_pubkeys[4]))
+    tx.tx_ins[4].script_sig = Script([sig])
+
+    for i, script_pubkey in enumerate(script_pubkeys):
+        assert tx.verify_input(i, script_pubkey, amount)
+    # signatures commit to the amount and to the transaction
+    assert not tx.verify_input(1, script_pubkeys[1], amount + 1)
+    tx.locktime = 1
+    for i, script_pubkey in enumerate(script_pubkeys):
+        assert not tx.verify_input(i, script_pubkey, amount)
+    # wrong key hash
+    assert not verify_script(
+        tx.tx_ins[0].script_sig, p2pkh_script(b'\x00' * 20), 0
+    )
+
+
+def test_verify_witness_program_failures():
+    """Witness programs reject extra ScriptSig data and unclean stacks."""
+    key = PrivateKey(8675309)
+    sec = key.point.sec()
+    redeem = p2wpkh_script(hash160(sec)).raw_serialize()
+    p2sh = p2sh_script(hash160(redeem))
+    # a witness program as redeem script needs the witness, whatever the
+    # rest of the ScriptSig contains
+    assert not verify_script(Script([redeem]), p2sh, 1, [])
+    assert not verify_script(Script([b'junk', redeem]), p2sh, 1, [])
+    assert not verify_script(Script([0, redeem]), p2sh, 1, [])
+    # native witness programs need an empty ScriptSig
+    assert not verify_script(Script([b'junk']), Script.from_raw(redeem), 1)
+    # P2WSH witness scripts must leave a single true element
+    witness_script = Script([0x51]).raw_serialize()
+    p2wsh = p2wsh_script(hashlib.sha256(witness_script).digest())
+    assert verify_script(Script([]), p2wsh, 1, [witness_script])
+    assert not verify_script(
+        Script([]), p2wsh, 1, [encode_num(1), witness_script]
+    )
+    assert not verify_script(Script([]), p2wsh, 1, [b'\x01'])
+
+
+def test_verify_p2sh_small_numbers():
+    """P2SH ScriptSigs may push small numbers with OP_1NEGATE..OP_16."""
+    # OP_ADD OP_3 OP_EQUAL
+    redeem = Script([0x93, 0x53, 0x87]).raw_serialize()
+    p2sh = p2sh_script(hash160(redeem))
+    assert Script([0x4f, 0x51, 0x60, redeem]).is_push_only()
+    assert verify_script(Script([0x51, 0x52, redeem]), p2sh, 1)
+    assert verify_script(Script([0x4f, 0x54, redeem]), p2sh, 1)
+    assert not verify_script(Script([0x51, 0x51, redeem]), p2sh, 1)
+    # other opcodes, even OP_NOP, are not allowed in a P2SH ScriptSig
+    assert not Script([0x51, 0x61, 0x52, redeem]).is_push_only()
+    assert not verify_script(Script([0x51, 0x61, 0x52, redeem]), p2sh, 1)
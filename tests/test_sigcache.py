@@ -0,0 +1,58 @@
+from random import randint
+
+import pytest
+
+from py_bitcoin.ecc import N, PrivateKey, S256Point, verify_batch
+from py_bitcoin.sigcache import SignatureCache, SignatureCacheMiss
+
+
+def test_signature_cache():
+    """Testing that verify uses and fills the signature cache."""
+    cache = SignatureCache(max_bytes=SignatureCache.ENTRY_SIZE * 2)
+    pk = PrivateKey(randint(1, N))
+    sigs = [(z, pk.sign(z)) for z in (1, 2, 3)]
+    S256Point.signature_cache = cache
+    try:
+        z, sig = sigs[0]
+        assert pk.point.verify(z, sig)
+        assert len(cache) == 1
+        assert pk.point.verify(z, sig)
+        assert cache.info().hits == 1
+        # invalid signatures are never cached
+        assert not pk.point.verify(z + 1, sig)
+        assert len(cache) == 1
+        # the oldest entry is evicted when the budget is reached
+        for z, sig in sigs[1:]:
+            assert pk.point.verify(z, sig)
+        assert len(cache) == 2
+        assert not cache.contains(
+            cache.key(pk.point.sec(), 1, sigs[0][1].der())
+        )
+        # batch verification skips cached signatures and fills the cache
+        cache.clear()
+        items = [(pk.point, z, sig) for z, sig in sigs[:2]]
+        assert verify_batch(items, workers=1) == [True, True]
+        assert verify_batch(items, workers=1) == [True, True]
+        assert cache.info().hits == 2
+        assert 0 < cache.hit_rate < 1
+    finally:
+        S256Point.signature_cache = None
+
+
+def test_signature_cache_salt():
+    """Keys depend on the salt of the cache."""
+    args = (b'\x02' * 33, 5, b'\x30' * 70)
+    assert SignatureCache(salt=b'a').key(*args) == \
+        SignatureCache(salt=b'a').key(*args)
+    assert SignatureCache().key(*args) != SignatureCache().key(*args)
+
+
+def test_signature_cache_lookup_only():
+    """In lookup-only mode a miss raises instead of returning False."""
+    cache = SignatureCache()
+    cache.add(b'cached')
+    with cache.lookup_only():
+        assert cache.contains(b'cached')
+        with pytest.raises(SignatureCacheMiss):
+            cache.contains(b'missing')
+    assert not cache.contains(b'missing')
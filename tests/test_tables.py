@@ -0,0 +1,69 @@
+import os
+
+import pytest
+
+from py_bitcoin.ecc import GX, GY, _build_generator_odd_multiples
+from py_bitcoin.tables import (
+    HEADER,
+    PointTable,
+    load_point_table,
+    parse_point_table,
+    serialize_points,
+)
+
+
+POINTS = [(GX, GY), (1, 2), (2**256 - 1, 0)]
+
+
+def test_point_table_format():
+    """Testing serialization and validation of point tables."""
+    raw = serialize_points(POINTS)
+    assert len(raw) == HEADER.size + 64 * len(POINTS)
+    table = parse_point_table(raw)
+    assert len(table) == 3
+    assert list(table) == POINTS
+    with pytest.raises(IndexError):
+        table[3]
+    corrupted = bytearray(raw)
+    corrupted[-1] ^= 1
+    for bad in (raw[:10], raw[:-1], b'XXXX' + raw[4:], bytes(corrupted)):
+        with pytest.raises(SyntaxError):
+            parse_point_table(bad)
+
+
+def test_load_point_table(tmp_path):
+    """Tables are built once, then mapped from disk."""
+    calls = []
+
+    def build():
+        calls.append(1)
+        return POINTS
+
+    table = load_point_table('test', build, str(tmp_path))
+    assert isinstance(table, PointTable)
+    assert list(table) == POINTS
+    table = load_point_table('test', build, str(tmp_path))
+    assert list(table) == POINTS
+    assert len(calls) == 1
+
+    # a corrupted file is regenerated
+    path = tmp_path / 'test.bin'
+    corrupted = bytearray(path.read_bytes())
+    corrupted[-1] ^= 1
+    path.write_bytes(bytes(corrupted))
+    assert list(load_point_table('test', build, str(tmp_path))) == POINTS
+    assert len(calls) == 2
+    assert parse_point_table(path.read_bytes())
+
+
+def test_load_point_table_fallback(tmp_path, monkeypatch):
+    """Tables stay in memory when they cannot be persisted."""
+    blocker = tmp_path / 'file'
+    blocker.write_bytes(b'')
+    table = load_point_table('test', lambda: POINTS, str(blocker / 'dir'))
+    assert table == POINTS
+    monkeypatch.setenv('PY_BITCOIN_CACHE_DIR', '')
+    assert load_point_table('test', lambda: POINTS) == POINTS
+    monkeypatch.setenv('PY_BITCOIN_CACHE_DIR', str(tmp_path))
+    load_point_table('odd', _build_generator_odd_multiples)
+    assert os.path.exists(tmp_path / 'odd.bin')
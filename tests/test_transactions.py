@@ -0,0 +1,302 @@
+import copy
+import pickle
+
+import pytest
+from io import BytesIO
+
+from py_bitcoin.ecc import S256Point, Signature
+from py_bitcoin.script import Script
+from py_bitcoin.transactions import (
+    SIGHASH_ALL,
+    SIGHASH_ANYONECANPAY,
+    SIGHASH_NONE,
+    SIGHASH_SINGLE,
+    Tx,
+    TxIn,
+    TxOut,
+    iter_tx_ins,
+    iter_tx_outs,
+)
+from py_bitcoin.utils import hash160, hash256, read_varint_from
+
+
+RAW_TX = bytes.fromhex(
+    '0100000001813f79011acb80925dfe69b3def355fe914bd1d96a3f5f71bf8303c6a9'
+    '89c7d1000000006b483045022100ed81ff192e75a3fd2304004dcadb746fa5e24c50'
+    '31ccfcf21320b0277457c98f02207a986d955c6e0cb35d446a89d3f56100f4d7f678'
+    '01c31967743a9c8e10615bed01210349fc4e631e3624a545de3f89f5d8684c7b8138'
+    'bd94bdd531d2e213bf016b278afeffffff02a135ef01000000001976a914bc3b654d'
+    'ca7e56b04dca18f2566cdaf02e8d9ada88ac99c39800000000001976a9141c4bc762'
+    'dd5423e332166702cb75f40df79fea1288ac19430600'
+)
+TX_ID = '452c629d67e41baec3ac6f04fe744b4b9617f8f859c63b3002f8684e7a4fee03'
+
+
+def make_segwit_tx():
+    """Build a segwit transaction with two inputs and one output."""
+    tx_ins = [
+        TxIn(bytes(range(32)), 1, witness=[b'\x30' * 71, b'\x02' * 33]),
+        TxIn(bytes(32), 0, Script([b'\x01' * 22]), witness=[]),
+    ]
+    tx_outs = [TxOut(5000, Script([0, b'\x11' * 20]))]
+    return Tx(2, tx_ins, tx_outs, 0x1234, segwit=True)
+
+
+def test_read_varint_from():
+    """Testing reading variable integers from a buffer."""
+    buf = b'\x01\xfd\x00\x01\xfe\x00\x00\x00\x01\xff' + b'\x00' * 7 + b'\x01'
+    assert read_varint_from(buf, 0) == (1, 1)
+    assert read_varint_from(buf, 1) == (0x100, 4)
+    assert read_varint_from(buf, 4) == (0x1000000, 9)
+    assert read_varint_from(buf, 9) == (2**56, 18)
+    with pytest.raises(SyntaxError):
+        read_varint_from(b'\xfd\x00', 0)
+
+
+def test_tx_parse_serialize():
+    """Testing transaction parsing from bytes and streams."""
+    tx = Tx.parse(RAW_TX)
+    assert tx.version == 1
+    assert tx.locktime == 410393
+    assert len(tx.tx_ins) == 1
+    assert tx.tx_ins[0].prev_index == 0
+    assert tx.tx_ins[0].sequence == 0xfffffffe
+    assert [tx_out.amount for tx_out in tx.tx_outs] == [32454049, 10011545]
+    assert tx.tx_outs[0].script_pubkey.cmds[2] == bytes.fromhex(
+        'bc3b654dca7e56b04dca18f2566cdaf02e8d9ada'
+    )
+    assert tx.serialize() == RAW_TX
+    assert tx.id() == TX_ID
+    # scripts are slices of the input buffer, not copies
+    assert isinstance(tx.tx_ins[0].script_sig._raw, memoryview)
+
+    stream = BytesIO(RAW_TX + b'trailing')
+    assert Tx.parse(stream).serialize() == RAW_TX
+    assert stream.read() == b'trailing'
+    with pytest.raises(SyntaxError):
+        Tx.parse(RAW_TX[:-1])
+    with pytest.raises(SyntaxError):
+        Tx.parse(BytesIO(RAW_TX[:-1]))
+
+
+class OneWayStream:
+    """Non-seekable stream that counts the bytes read."""
+    def __init__(self, data):
+        self.stream = BytesIO(data)
+        self.bytes_read = 0
+
+    def read(self, length=-1):
+        data = self.stream.read(length)
+        self.bytes_read += len(data)
+        return data
+
+
+def test_tx_parse_stream():
+    """Streams are read only as far as the parsed objects."""
+    segwit_raw = make_segwit_tx().serialize()
+    data = (RAW_TX + segwit_raw) * 3
+    stream = OneWayStream(data)
+    for _ in range(3):
+        assert Tx.parse(stream).serialize() == RAW_TX
+        assert Tx.parse(stream).serialize() == segwit_raw
+    assert stream.bytes_read == len(data)
+    stream = OneWayStream(RAW_TX + b'trailing')
+    tx = Tx.parse(stream)
+    assert stream.read() == b'trailing'
+    stream = OneWayStream(tx.tx_outs[0].serialize() + b'x')
+    assert TxOut.parse(stream).amount == tx.tx_outs[0].amount
+    assert stream.read() == b'x'
+
+
+def test_segwit_tx_parse_serialize():
+    """Testing segwit transaction serialization round trip."""
+    tx = make_segwit_tx()
+    raw = tx.serialize()
+    assert raw[4:6] == b'\x00\x01'
+    parsed = Tx.parse(raw)
+    assert parsed.segwit
+    assert parsed.serialize() == raw
+    assert parsed.tx_ins[0].witness == tx.tx_ins[0].witness
+    assert parsed.serialize_legacy() == tx.serialize_legacy()
+    assert parsed.id() == tx.id()
+
+
+def test_lazy_tx():
+    """Testing lazy iteration over inputs and outputs."""
+    for raw in (RAW_TX, make_segwit_tx().serialize()):
+        tx = Tx.parse(raw)
+        lazy = Tx.parse_lazy(b'\xaa' + raw + b'\xbb', 1)
+        assert lazy.version == tx.version
+        assert lazy.locktime == tx.locktime
+        assert lazy.end == len(raw) + 1
+        assert bytes(lazy.raw) == raw
+        assert lazy.id() == tx.id()
+        assert [i.serialize() for i in lazy.tx_ins()] == \
+            [i.serialize() for i in tx.tx_ins]
+        assert [i.witness for i in lazy.tx_ins()] == \
+            [i.witness for i in tx.tx_ins]
+        assert [o.serialize() for o in lazy.tx_outs()] == \
+            [o.serialize() for o in tx.tx_outs]
+        for t in (tx, lazy):
+            assert [i.prev_tx for i in iter_tx_ins(t)] == \
+                [i.prev_tx for i in tx.tx_ins]
+            assert [o.amount for o in iter_tx_outs(t)] == \
+                [o.amount for o in tx.tx_outs]
+        assert lazy.materialize().serialize() == raw
+
+
+def test_tx_cache_invalidation():
+    """Testing that cached txid follows changes to the transaction."""
+    tx = Tx.parse(RAW_TX)
+    assert tx.id() == TX_ID
+    assert tx.serialize() is tx.serialize()
+
+    def fresh_id():
+        tx_copy = Tx(
+            tx.version,
+            [TxIn(i.prev_tx, i.prev_index, i.script_sig, i.sequence)
+             for i in tx.tx_ins],
+            [TxOut(o.amount, o.script_pubkey) for o in tx.tx_outs],
+            tx.locktime,
+        )
+        return tx_copy.id()
+
+    tx.locktime = 0
+    assert tx.id() != TX_ID
+    assert tx.id() == fresh_id()
+    tx.tx_outs[0].amount -= 1
+    assert tx.id() == fresh_id()
+    tx.tx_ins[0].script_sig = Script()
+    assert tx.id() == fresh_id()
+    tx.tx_outs.append(TxOut(1, Script([0x6a])))
+    assert tx.id() == fresh_id()
+    # outputs added to the list are tracked too
+    tx.tx_outs[-1].amount = 2
+    assert tx.id() == fresh_id()
+    tx.tx_ins[0].script_sig.cmds.append(b'\x01')
+    tx.invalidate()
+    assert tx.id() == fresh_id()
+
+    # parts shared by several transactions invalidate all of them
+    other = Tx(1, list(tx.tx_ins), list(tx.tx_outs), 0)
+    other_id = other.id()
+    tx.tx_outs[0].amount += 1
+    assert tx.id() == fresh_id()
+    assert other.id() != other_id
+
+    segwit_tx = make_segwit_tx()
+    raw = segwit_tx.serialize()
+    segwit_tx.tx_ins[1].witness.append(b'\x02')
+    assert segwit_tx.serialize() != raw
+    assert Tx.parse(segwit_tx.serialize()).tx_ins[1].witness == [b'\x02']
+
+
+def test_tx_pickle_and_copy():
+    """Pickled and copied transactions track their changes again."""
+    tx = make_segwit_tx()
+    tx_ins = tx.tx_ins
+    tx.tx_ins = tx_ins
+    # assigned lists are copied, not shared
+    assert tx.tx_ins is not tx_ins
+    raw = tx.serialize()
+    for clone in (
+        pickle.loads(pickle.dumps(tx)),
+        copy.deepcopy(tx),
+    ):
+        assert clone.serialize() == raw
+        assert clone.id() == tx.id()
+        clone.tx_outs.append(TxOut(1, Script([0x6a])))
+        clone.tx_ins[1].witness.append(b'\x02')
+        assert clone.serialize() != raw
+        assert Tx.parse(clone.serialize()).serialize() == clone.serialize()
+        assert tx.serialize() == raw
+
+
+def test_parsed_tx_pickle():
+    """Parsed transactions are pickled without their buffer."""
+    buf = bytearray(RAW_TX)
+    tx = Tx.parse(buf)
+    tx.sig_hash(0, tx.tx_ins[0].script_sig)
+    clones = [pickle.loads(pickle.dumps(tx)), copy.deepcopy(tx)]
+    buf[:] = bytes(len(buf))
+    for clone in clones:
+        assert clone.id() == TX_ID
+        assert clone.serialize() == RAW_TX
+        assert clone.tx_outs[0].script_pubkey.serialize() == \
+            Tx.parse(RAW_TX).tx_outs[0].script_pubkey.serialize()
+
+
+def reference_sig_hash(tx, input_index, script_code, hash_type):
+    """Legacy signature hash computed by modifying a copy of the tx."""
+    base_type = hash_type & 0x1f
+    tx_ins = []
+    for i, tx_in in enumerate(tx.tx_ins):
+        script = script_code if i == input_index else Script()
+        sequence = tx_in.sequence
+        if i != input_index and base_type in (SIGHASH_NONE, SIGHASH_SINGLE):
+            sequence = 0
+        tx_ins.append(TxIn(tx_in.prev_tx, tx_in.prev_index, script, sequence))
+    tx_outs = list(tx.tx_outs)
+    if hash_type & SIGHASH_ANYONECANPAY:
+        tx_ins = [tx_ins[input_index]]
+    if base_type == SIGHASH_NONE:
+        tx_outs = []
+    elif base_type == SIGHASH_SINGLE:
+        tx_outs = [TxOut(2**64 - 1, Script())] * input_index + \
+            [tx_outs[input_index]]
+    modified = Tx(tx.version, tx_ins, tx_outs, tx.locktime)
+    preimage = modified.serialize() + hash_type.to_bytes(4, 'little')
+    return int.from_bytes(hash256(preimage), 'big')
+
+
+def test_legacy_sig_hash():
+    """Testing legacy signature hashes against signed transaction data."""
+    tx = Tx.parse(RAW_TX)
+    sig_der, sec = tx.tx_ins[0].script_sig.cmds
+    point = S256Point.parse(sec)
+    script_pubkey = Script([0x76, 0xa9, hash160(sec), 0x88, 0xac])
+    z = tx.sig_hash(0, script_pubkey, sig_der[-1])
+    assert z == \
+        0x27e0c5994dec7824e56dec6b2fcb342eb7cdb0d0957c2fce9882f715e85d81a6
+    assert point.verify(z, Signature.parse(sig_der[:-1]))
+
+    tx_ins = [TxIn(bytes([i]) * 32, i, sequence=i) for i in range(4)]
+    tx_outs = [TxOut(i * 1000, Script([0x6a, bytes([i])])) for i in range(3)]
+    tx = Tx(1, tx_ins, tx_outs, 7)
+    # unknown base types like 0 and 4 are treated as SIGHASH_ALL
+    for base_type in (SIGHASH_ALL, SIGHASH_NONE, SIGHASH_SINGLE, 0, 4):
+        for hash_type in (base_type, base_type | SIGHASH_ANYONECANPAY):
+            for i in range(3):
+                assert tx.sig_hash(i, script_pubkey, hash_type) == \
+                    reference_sig_hash(tx, i, script_pubkey, hash_type)
+    # SIGHASH_SINGLE without matching output
+    assert tx.sig_hash(3, script_pubkey, SIGHASH_SINGLE) == 1
+
+
+def test_bip143_sig_hash():
+    """Testing BIP143 signature hash with the native P2WPKH example."""
+    tx = Tx.parse(bytes.fromhex(
+        '0100000002fff7f7881a8099afa6940d42d1e7f6362bec38171ea3edf433541d'
+        'b4e4ad969f0000000000eeffffffef51e1b804cc89d182d279655c3aa89e815b'
+        '1b309fe287d9b2b55d57b90ec68a0100000000ffffffff02202cb20600000000'
+        '1976a9148280b37df378db99f66f85c95a783a76ac7a6d5988ac9093510d0000'
+        '00001976a9143bde42dbee7e4dbe6a21b2d50ce2f0167faa815988ac11000000'
+    ))
+    hasher = tx.sig_hasher()
+    assert hasher.hash_prevouts.hex() == \
+        '96b827c8483d4e9b96712b6713a7b68d6e8003a781feba36c31143470b4efd37'
+    assert hasher.hash_sequence.hex() == \
+        '52b0a642eea2fb7ae638c36f6252b6750293dbe574a806984b8e4d8548339a3b'
+    assert hasher.hash_outputs.hex() == \
+        '863ef3e1a92afbfdb97f31ad0fc7683ee943e9abcf2501590ff8f6551f47e5e5'
+    script_code = Script([
+        0x76, 0xa9, bytes.fromhex('1d0f172a0ecb48aee1be1f2687d2963ae33f71a1'),
+        0x88, 0xac,
+    ])
+    z = tx.sig_hash_bip143(1, script_code, 600000000)
+    assert z == \
+        0xc37af31116d1b27caf68aae9e3ac82f1477929014d5b917657d0eb49478cb670
+    # the shared precomputation is dropped when the tx changes
+    tx.locktime = 0
+    assert tx.sig_hasher() is not hasher
+    assert tx.sig_hash_bip143(1, script_code, 600000000) != z
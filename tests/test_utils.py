@@ -0,0 +1,72 @@
+import pytest
+from random import randint
+
+from py_bitcoin.ecc import PrivateKey
+from py_bitcoin.utils import (
+    LRUCache,
+    decode_base58,
+    decode_base58_checksum,
+    decode_base58_checksum_many,
+    encode_base58,
+    encode_base58_checksum,
+    encode_base58_checksum_many,
+)
+
+
+def test_lru_cache():
+    """Testing eviction order and statistics of LRUCache."""
+    cache = LRUCache(maxsize=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)  # evicts 'b', the least recently used
+    assert cache.get('b') is None
+    assert cache.get('c') == 3
+    assert cache.info() == (2, 1, 2, 2)
+    assert cache.invalidate('a')
+    assert not cache.invalidate('a')
+    cache.resize(0)
+    cache.put('d', 4)
+    assert len(cache) == 0
+
+
+def test_base58_encoding():
+    """Testing BASE58 encoding and decoding round trips."""
+    test_cases = (
+        (b'', ''),
+        (b'\x00', '1'),
+        (b'\x00\x00\x01', '112'),
+        (b'\x3a', '21'),
+        (bytes.fromhex('7c076ff316692a3d7eb3c3bb0f8b1488cf72e1afcd929e2930'
+                       '7032997a838a3d'),
+         '9MA8fRQrT4u8Zj8ZRd6MAiiyaxb2Y1CMpvVkHQu5hVM6'),
+    )
+    for raw, encoded in test_cases:
+        assert encode_base58(raw) == encoded
+        assert decode_base58(encoded) == raw
+    for _ in range(20):
+        raw = bytes(randint(0, 3)) + bytes(
+            randint(0, 255) for _ in range(randint(0, 40))
+        )
+        assert decode_base58(encode_base58(raw)) == raw
+    for invalid in ('0OIl', '1\u00e9', '12 3'):
+        with pytest.raises(ValueError):
+            decode_base58(invalid)
+
+
+def test_base58_checksum_decoding():
+    """Testing BASE58 checksum verification of addresses and WIF."""
+    pk = PrivateKey(5003)
+    wif = pk.wif(compressed=True, testnet=True)
+    assert wif == 'cMahea7zqjxrtgAbB7LSGbcQUr1uX1ojuat9jZodMN8rFTv2sfUK'
+    payload = decode_base58_checksum(wif)
+    assert payload == b'\xef' + pk.secret.to_bytes(32, 'big') + b'\x01'
+    address = pk.point.address()
+    assert decode_base58_checksum(address) == b'\x00' + pk.point.hash160()
+    corrupted = address[:-1] + ('2' if address[-1] != '2' else '3')
+    with pytest.raises(ValueError):
+        decode_base58_checksum(corrupted)
+    payloads = [bytes([i]) * 21 for i in range(5)]
+    encoded = encode_base58_checksum_many(payloads)
+    assert encoded == [encode_base58_checksum(p) for p in payloads]
+    assert decode_base58_checksum_many(encoded) == payloads
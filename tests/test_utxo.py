@@ -0,0 +1,96 @@
+import pytest
+
+from py_bitcoin.script import Script
+from py_bitcoin.transactions import Tx, TxIn, TxOut
+from py_bitcoin.utxo import UtxoSet
+
+
+P2PKH = Script([0x76, 0xa9, b'\x01' * 20, 0x88, 0xac])
+
+
+def coinbase(tag):
+    """Build a coinbase transaction with two outputs."""
+    tx_in = TxIn(b'\x00' * 32, 0xffffffff, Script([tag]))
+    return Tx(1, [tx_in], [TxOut(50, P2PKH), TxOut(25, P2PKH)], 0)
+
+
+def spend(*outpoints, amounts=(10,)):
+    """Build a transaction spending outpoints to P2PKH outputs."""
+    tx_ins = [TxIn(prev_tx, index) for prev_tx, index in outpoints]
+    tx_outs = [TxOut(amount, P2PKH) for amount in amounts]
+    return Tx(1, tx_ins, tx_outs, 0)
+
+
+def snapshot(utxos, outpoints):
+    """Return amounts of outpoints present in the set."""
+    result = {}
+    for outpoint in outpoints:
+        tx_out = utxos.get(*outpoint)
+        if tx_out is not None:
+            result[outpoint] = tx_out.amount
+    return result
+
+
+def test_utxo_set_apply_undo():
+    """Testing applying and undoing blocks on the UTXO set."""
+    utxos = UtxoSet()
+    cb1 = coinbase(b'\x01')
+    undo1 = utxos.apply_block([cb1])
+    assert len(utxos) == 2
+    assert utxos.get(cb1.hash(), 0).amount == 50
+    assert utxos.get(cb1.hash(), 0).script_pubkey.cmds == P2PKH.cmds
+    # identical scripts are stored once
+    assert len(utxos._script_index) == 1
+
+    cb2 = coinbase(b'\x02')
+    tx1 = spend((cb1.hash(), 0), amounts=(30, 20))
+    # tx2 spends an output created in the same block
+    tx2 = spend((tx1.hash(), 1), (cb1.hash(), 1), amounts=(45,))
+    outpoints = [
+        (tx.hash(), i) for tx in (cb1, cb2, tx1, tx2) for i in range(2)
+    ]
+    before = snapshot(utxos, outpoints)
+    undo2 = utxos.apply_block([cb2, tx1, tx2])
+    assert (cb1.hash(), 0) not in utxos
+    assert (tx1.hash(), 1) not in utxos
+    assert utxos.get(tx2.hash(), 0).amount == 45
+    assert len(utxos) == 4
+
+    utxos.undo_block(undo2)
+    assert snapshot(utxos, outpoints) == before
+    utxos.undo_block(undo1)
+    assert len(utxos) == 0
+    assert not utxos._script_index
+
+
+def test_utxo_set_missing_input():
+    """Applying a block with a missing input leaves the set unchanged."""
+    utxos = UtxoSet()
+    cb = coinbase(b'\x01')
+    utxos.apply_block([cb])
+    tx1 = spend((cb.hash(), 0))
+    tx2 = spend((b'\xff' * 32, 0))
+    with pytest.raises(ValueError):
+        utxos.apply_block([coinbase(b'\x02'), tx1, tx2])
+    assert len(utxos) == 2
+    assert utxos.get(cb.hash(), 0).amount == 50
+    assert utxos.spend(cb.hash(), 1).amount == 25
+    with pytest.raises(KeyError):
+        utxos.spend(cb.hash(), 1)
+
+
+def test_utxo_set_duplicate_coinbase():
+    """A duplicate txid overwrites its unspent outputs (BIP30)."""
+    utxos = UtxoSet()
+    cb = coinbase(b'\x01')
+    utxos.apply_block([cb])
+    utxos.spend(cb.hash(), 1)
+    duplicate = coinbase(b'\x01')
+    assert duplicate.hash() == cb.hash()
+    undo = utxos.apply_block([duplicate])
+    assert len(utxos) == 2
+    assert utxos.get(cb.hash(), 1).amount == 25
+    utxos.undo_block(undo)
+    assert len(utxos) == 1
+    assert utxos.get(cb.hash(), 0).amount == 50
+    assert (cb.hash(), 1) not in utxos
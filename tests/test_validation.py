@@ -0,0 +1,96 @@
+import pytest
+
+from py_bitcoin.ecc import PrivateKey, S256Point
+from py_bitcoin.script import Script, p2pkh_script
+from py_bitcoin.sigcache import SignatureCache
+from py_bitcoin.transactions import SIGHASH_ALL, Tx, TxIn, TxOut
+from py_bitcoin.utxo import UtxoSet
+from py_bitcoin.validation import BlockValidator
+
+
+KEY = PrivateKey(8675309)
+SCRIPT_PUBKEY = p2pkh_script(KEY.point.hash160())
+
+
+def coinbase(tag, amount=5000):
+    """Build a coinbase transaction paying to KEY."""
+    tx_in = TxIn(b'\x00' * 32, 0xffffffff, Script([tag]))
+    return Tx(1, [tx_in], [TxOut(amount, SCRIPT_PUBKEY)], 0)
+
+
+def signed_spend(*outpoints, amount=1000, key=KEY):
+    """Build a transaction spending P2PKH outpoints signed with key."""
+    tx_ins = [TxIn(prev_tx, index) for prev_tx, index in outpoints]
+    tx = Tx(1, tx_ins, [TxOut(amount, SCRIPT_PUBKEY)], 0)
+    for i, tx_in in enumerate(tx.tx_ins):
+        z = tx.sig_hash(i, SCRIPT_PUBKEY, SIGHASH_ALL)
+        sig = key.sign(z).der() + bytes([SIGHASH_ALL])
+        tx_in.script_sig = Script([sig, key.point.sec()])
+    return tx
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_block_validator(workers):
+    """Testing the validation pipeline with and without workers."""
+    utxos = UtxoSet()
+    coinbases = [coinbase(bytes([i + 1])) for i in range(6)]
+    with BlockValidator(utxos, workers=workers, chunk_size=2) as validator:
+        validator.validate(coinbases)
+        assert len(utxos) == 6
+        txs = [signed_spend((cb.hash(), 0)) for cb in coinbases[:5]]
+        # spends an output created earlier in the same block
+        txs.append(signed_spend((txs[0].hash(), 0), amount=900))
+        undo = validator.validate([coinbase(b'\x10')] + txs)
+        assert utxos.get(txs[-1].hash(), 0).amount == 900
+        assert (txs[0].hash(), 0) not in utxos
+        utxos.undo_block(undo)
+        assert len(utxos) == 6
+
+        # a bad signature fails the block and leaves the set unchanged
+        bad = signed_spend((coinbases[5].hash(), 0), key=PrivateKey(2))
+        with pytest.raises(ValueError, match='Invalid input'):
+            validator.validate([coinbase(b'\x11')] + txs + [bad])
+        assert len(utxos) == 6
+        assert (coinbases[0].hash(), 0) in utxos
+
+
+def test_block_validator_lookup():
+    """Lookup failures are reported before any script is checked."""
+    utxos = UtxoSet()
+    cb = coinbase(b'\x01')
+    validator = BlockValidator(utxos, workers=1)
+    validator.validate([cb])
+    with pytest.raises(ValueError, match='Missing output'):
+        validator.validate([signed_spend((b'\xff' * 32, 0))])
+    with pytest.raises(ValueError, match='Double spend'):
+        validator.validate([
+            signed_spend((cb.hash(), 0)),
+            signed_spend((cb.hash(), 0), amount=999),
+        ])
+    with pytest.raises(ValueError, match='Outputs exceed inputs'):
+        validator.validate([signed_spend((cb.hash(), 0), amount=5001)])
+    assert utxos.get(cb.hash(), 0).amount == 5000
+
+
+def test_block_validator_signature_cache():
+    """Worker processes share the signature cache of the parent."""
+    utxos = UtxoSet()
+    coinbases = [coinbase(bytes([i + 1])) for i in range(4)]
+    cache = SignatureCache()
+    S256Point.signature_cache = cache
+    try:
+        with BlockValidator(utxos, workers=2, chunk_size=1) as validator:
+            validator.validate(coinbases)
+            txs = [signed_spend((cb.hash(), 0)) for cb in coinbases]
+            # signatures verified by the workers are cached in the parent
+            undo = validator.validate([coinbase(b'\x10')] + txs)
+            assert len(cache) == 4
+            utxos.undo_block(undo)
+            # cached signatures are not sent to the workers again
+            validator.close()
+            hits = cache.info().hits
+            validator.validate([coinbase(b'\x10')] + txs)
+            assert validator._executor is None
+            assert cache.info().hits == hits + 4
+    finally:
+        S256Point.signature_cache = None
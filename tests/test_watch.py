@@ -0,0 +1,92 @@
+import pytest
+
+from py_bitcoin.ecc import PrivateKey
+from py_bitcoin.script import (
+    Script,
+    p2pkh_script,
+    p2sh_script,
+    p2wpkh_script,
+    p2wsh_script,
+)
+from py_bitcoin.transactions import LazyTx, Tx, TxIn, TxOut
+from py_bitcoin.utils import hash256
+from py_bitcoin.watch import BloomFilter, SortedHashes, WatchIndex
+
+
+def test_sorted_hashes():
+    """Testing the compact sorted hash set."""
+    hashes = [hash256(i.to_bytes(2, 'big'))[:20] for i in range(300)]
+    table = SortedHashes(hashes + hashes[:10], 20)
+    assert len(table) == 300
+    assert sorted(table) == sorted(hashes)
+    for h in hashes:
+        assert h in table
+    assert hash256(b'other')[:20] not in table
+    assert b'\x00' * 32 not in table
+    assert b'\x00' * 20 not in SortedHashes([], 20)
+    with pytest.raises(ValueError):
+        SortedHashes([b'\x00' * 19], 20)
+
+
+def test_bloom_filter():
+    """A Bloom filter has no false negatives and few false positives."""
+    bloom = BloomFilter(1000, 0.01)
+    keys = [hash256(i.to_bytes(4, 'big'))[:20] for i in range(1000)]
+    for key in keys:
+        bloom.add(key)
+    assert all(key in bloom for key in keys)
+    others = [hash256(b'x' + i.to_bytes(4, 'big')) for i in range(2000)]
+    assert sum(key in bloom for key in others) < 100
+
+
+@pytest.mark.parametrize('fp_rate', [None, 0.01])
+def test_watch_index_scan(fp_rate):
+    """Testing matching of outputs in a stream of transactions."""
+    points = [PrivateKey(secret).point for secret in (1, 2, 3)]
+    bare = Script([0x51])
+    witness_hash = hash256(b'witness script')
+    h1, h2, h3 = (point.hash160() for point in points)
+    index = WatchIndex([h1, h2, h3, witness_hash], [bare], fp_rate=fp_rate)
+    assert len(index) == 5
+    assert h3 in WatchIndex.from_points(points, fp_rate=fp_rate)
+    other = hash256(b'other')[:20]
+    tx_outs = [
+        TxOut(1, p2pkh_script(h1)),
+        TxOut(2, p2pkh_script(other)),
+        TxOut(3, p2wpkh_script(h2)),
+        TxOut(4, p2sh_script(h3)),
+        TxOut(5, p2wsh_script(witness_hash)),
+        TxOut(6, bare),
+        TxOut(7, Script([0x52])),
+    ]
+    txs = [
+        Tx(1, [TxIn(b'\x01' * 32, 0)], tx_outs[:4], 0),
+        Tx(1, [TxIn(b'\x02' * 32, 0)], [TxOut(8, p2pkh_script(other))], 0),
+        Tx(1, [TxIn(b'\x03' * 32, 0)], tx_outs[4:], 0),
+    ]
+    expected = [
+        (txs[0].id(), 0, 1, h1),
+        (txs[0].id(), 2, 3, h2),
+        (txs[0].id(), 3, 4, h3),
+        (txs[2].id(), 0, 5, witness_hash),
+        (txs[2].id(), 1, 6, bare.raw_serialize()),
+    ]
+    hits = [
+        (hit.txid, hit.index, hit.tx_out.amount, hit.key)
+        for hit in index.scan(txs)
+    ]
+    assert hits == expected
+    # parsed and lazily parsed transactions give the same hits
+    raw = b''.join(tx.serialize() for tx in txs)
+    lazy, offset = [], 0
+    while offset < len(raw):
+        tx = LazyTx(raw, offset)
+        lazy.append(tx)
+        offset = tx.end
+    hits = [
+        (hit.txid, hit.index, hit.tx_out.amount, hit.key)
+        for hit in index.scan(lazy)
+    ]
+    assert hits == expected
+    with pytest.raises(ValueError):
+        WatchIndex([b'\x00' * 21])